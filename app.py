@@ -1,10 +1,220 @@
-from flask import Flask, render_template
+import json
+import threading
+
+from flask import Flask, Response, jsonify, request
+
+import startup
+from errors import ApiError
+
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSockets are optional; clients can long-poll instead
+    Sock = None
 
 app = Flask(__name__)
 
+
+def lazy(factory):
+    """Returns a function that calls ``factory`` the first time it is
+    called and returns the same result ever after.
+
+    Serverless instances start often and most requests need only some of
+    the app, so the game engine, the stores and the rendered page are
+    built on first use instead of at import.
+    """
+    lock = threading.Lock()
+    built = []
+
+    def get():
+        if not built:
+            with lock:
+                if not built:
+                    with startup.step(factory.__name__):
+                        built.append(factory())
+        return built[0]
+    return get
+
+
+@lazy
+def room_manager():
+    from rooms import RoomManager
+    return RoomManager()
+
+
+@lazy
+def match_store():
+    from matches import MatchStore
+    return MatchStore()
+
+
+@lazy
+def site():
+    # Static files get content-hashed URLs and precompressed bodies, and
+    # the page that links them is rendered once rather than per request.
+    # Returns (assets, index page).
+    from assets import AssetBundle
+    assets = AssetBundle(app)
+    app.jinja_env.globals['asset_url'] = assets.url
+    return assets, assets.render(app, 'index.html')
+
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return site()[1].response()
+
+@app.route('/assets/<path:name>')
+def asset(name):
+    return site()[0].serve(name)
+
+@app.errorhandler(ApiError)
+def api_error(error):
+    return jsonify(error=str(error)), error.status
+
+def json_body():
+    # The request's JSON object; a missing or unparsable body counts as {}
+    body = request.get_json(silent=True)
+    if body is None:
+        return {}
+    if not isinstance(body, dict):
+        raise ApiError("request body must be a JSON object")
+    return body
+
+@app.route('/rooms', methods=['POST'])
+def create_room():
+    body = json_body()
+    room = room_manager().create(body.get('mode', 'cpu'))
+    return jsonify(room=room.id, player=room.seats['left'], side='left'), 201
+
+@app.route('/rooms/<room_id>/join', methods=['POST'])
+def join_room(room_id):
+    token = room_manager().get(room_id).join()
+    return jsonify(room=room_id, player=token, side='right')
+
+@app.route('/rooms/<room_id>/input', methods=['POST'])
+def room_input(room_id):
+    body = json_body()
+    room_manager().get(room_id).set_inputs(body.get('player', ''), body.get('inputs', 0))
+    return '', 204
+
+@app.route('/rooms/<room_id>/pause', methods=['POST'])
+def pause_room(room_id):
+    body = json_body()
+    room_manager().get(room_id).set_paused(body.get('player', ''), body.get('paused', True))
+    return '', 204
+
+@app.route('/rooms/<room_id>/state')
+def room_state(room_id):
+    # Long-poll: returns as soon as the room is newer than ?since=
+    room = room_manager().get(room_id)
+    since = request.args.get('since', -1, type=int)
+    _, payload = room.wait(since)
+    return Response(payload, mimetype='application/json')
+
+@app.route('/rooms/<room_id>/snapshot')
+def room_snapshot(room_id):
+    # Binary long-poll (see snapshot.py); ?ack= is the last tick decoded
+    room = room_manager().get(room_id)
+    since = request.args.get('since', -1, type=int)
+    ack = request.args.get('ack', None, type=int)
+    room.wait_for_version(since)
+    version, snapshot = room.snapshot(ack)
+    return Response(snapshot, mimetype='application/octet-stream',
+                    headers={'X-Room-Version': str(version)})
+
+@app.route('/matches', methods=['POST'])
+def create_match():
+    body = json_body()
+    payload = match_store().create(body.get('player1'), body.get('player2'), body.get('format'))
+    return Response(payload, status=201, mimetype='application/json')
+
+@app.route('/matches/<match_id>')
+def match_score(match_id):
+    return Response(match_store().payload(match_id), mimetype='application/json')
+
+@app.route('/matches/<match_id>/points', methods=['POST'])
+def match_points(match_id):
+    # {"winner": 1} for one point or {"points": [1, 2, ...]} for a batch
+    body = json_body()
+    points = body['points'] if 'points' in body else body.get('winner')
+    return Response(match_store().add_points(match_id, points), mimetype='application/json')
+
+def event_stream(broadcast):
+    # SSE response; a reconnecting client's Last-Event-ID skips frames it has seen
+    since = request.headers.get('Last-Event-ID', 0, type=int)
+    return Response(broadcast.stream(since), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/matches/<match_id>/events')
+def match_events(match_id):
+    return event_stream(match_store().broadcast(match_id))
+
+@app.route('/rooms/<room_id>/events')
+def room_events(room_id):
+    return event_stream(room_manager().get(room_id).broadcast)
+
+@app.route('/matches/<match_id>', methods=['DELETE'])
+def delete_match(match_id):
+    match_store().remove(match_id)
+    return '', 204
+
+def socket_message(text):
+    # (inputs, ack) from a WebSocket message, None for each one missing or
+    # not an integer; anything malformed is ignored rather than ending the
+    # connection
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return None, None
+    if not isinstance(message, dict):
+        return None, None
+    inputs = message.get('inputs')
+    ack = message.get('ack')
+    return (inputs if type(inputs) is int else None,
+            ack if type(ack) is int else None)
+
+if Sock is not None:
+    sock = Sock(app)
+
+    @sock.route('/rooms/<room_id>/ws')
+    def room_socket(ws, room_id):
+        # Client sends {"inputs": mask} messages; server pushes each new
+        # state once. With ?format=binary the states are snapshots and
+        # messages may also carry {"ack": tick}. The socket closes after
+        # the final state of a finished game or when the room is removed.
+        # Only inputs keep the room alive, not the open socket.
+        room = room_manager().get(room_id)
+        token = request.args.get('player', '')
+        binary = request.args.get('format') == 'binary'
+        room.side_of(token)
+        version = -1
+        ack = None
+        while True:
+            message = ws.receive(timeout=0)
+            while message is not None:
+                inputs, message_ack = socket_message(message)
+                if inputs is not None:
+                    try:
+                        room.set_inputs(token, inputs)
+                    except ApiError:
+                        pass  # not a 4-bit mask
+                if message_ack is not None:
+                    ack = message_ack
+                message = ws.receive(timeout=0)
+            if not room.wait_for_version(version, timeout=1, keep_alive=False):
+                continue
+            if room.closed:
+                break
+            # Read before the state, so the last state sent is the final one
+            done = room.finished
+            if binary:
+                version, snapshot = room.snapshot(ack)
+                ws.send(snapshot)
+            else:
+                version, payload = room.payload()
+                ws.send(payload)
+            if done:
+                break
+        ws.close()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
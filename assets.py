@@ -0,0 +1,125 @@
+"""
+Fingerprinted, precompressed static assets and pre-rendered pages.
+
+``AssetBundle`` reads every file under the app's static folder once,
+names it by a hash of its content (``css/style.3f2a9c1e0b7d.css``) and
+keeps gzip and, when the ``brotli`` package is installed, brotli copies.
+Fingerprinted URLs never change meaning, so they are served with
+``Cache-Control: immutable``; pages rendered by ``render`` keep their
+URL and are revalidated with their ETag instead.
+
+Usage: python assets.py   (prints the asset manifest)
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response, render_template, request
+
+try:
+    import brotli
+except ImportError:  # gzip alone is fine; brotli just saves a few more bytes
+    brotli = None
+
+FINGERPRINT_LENGTH = 12
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Smaller files are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+
+class Asset:
+    """One response body with its precompressed variants and ETags."""
+
+    def __init__(self, body, mimetype, cache_control):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.fingerprint = hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH]
+        # encoding -> (body, etag); an encoding is kept only if it is smaller
+        self.variants = {None: (body, self.fingerprint)}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            compressed = {"gzip": gzip.compress(body, 9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            for encoding, data in compressed.items():
+                if len(data) < len(body):
+                    self.variants[encoding] = (data, f"{self.fingerprint}-{encoding}")
+
+    def choose(self, accept_encodings):
+        # Smallest variant the client accepts
+        best = None
+        for encoding, (data, _) in self.variants.items():
+            if encoding is not None and not accept_encodings.quality(encoding):
+                continue
+            if best is None or len(data) < len(self.variants[best][0]):
+                best = encoding
+        return best
+
+    def response(self):
+        encoding = self.choose(request.accept_encodings)
+        body, etag = self.variants[encoding]
+        headers = {"ETag": f'"{etag}"', "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        if request.if_none_match.contains(etag) or request.if_none_match.star_tag:
+            return Response(status=304, headers=headers)
+        return Response(body, mimetype=self.mimetype, headers=headers)
+
+
+class AssetBundle:
+    """Every static file of ``app`` under a fingerprinted name.
+
+    ``url(filename)`` gives the fingerprinted URL of ``static/filename``
+    (it is also the ``asset_url`` template global); ``serve`` answers
+    requests for those URLs.
+    """
+
+    def __init__(self, app, url_prefix="/assets"):
+        self.url_prefix = url_prefix
+        self.urls = {}
+        self.assets = {}
+        root = app.static_folder
+        for directory, _, files in os.walk(root):
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                filename = os.path.relpath(path, root).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    body = f.read()
+                mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                asset = Asset(body, mimetype, IMMUTABLE)
+                stem, extension = os.path.splitext(filename)
+                fingerprinted = f"{stem}.{asset.fingerprint}{extension}"
+                self.assets[fingerprinted] = asset
+                self.urls[filename] = f"{url_prefix}/{fingerprinted}"
+
+    def url(self, filename):
+        return self.urls[filename]
+
+    def serve(self, name):
+        asset = self.assets.get(name)
+        if asset is None:
+            return Response("not found", status=404, mimetype="text/plain")
+        return asset.response()
+
+    def render(self, app, template, **context):
+        """Renders ``template`` once, outside any request, as an ``Asset``."""
+        with app.test_request_context("/"):
+            body = render_template(template, **context).encode()
+        return Asset(body, "text/html", REVALIDATE)
+
+
+def main():
+    from app import app
+
+    bundle = AssetBundle(app)
+    for filename, url in sorted(bundle.urls.items()):
+        asset = bundle.assets[url[len(bundle.url_prefix) + 1:]]
+        sizes = ", ".join(f"{encoding or 'identity'} {len(body)}"
+                          for encoding, (body, _) in asset.variants.items())
+        print(f"{filename} -> {url} ({sizes})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for batched simulation
+    np = None
+
+from tennis_engine import (
+    GameState, FLOAT_FIELDS, INT_FIELDS,
+    CANVAS_WIDTH, CANVAS_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE,
+    PLAYER_SPEED, BALL_SPEED, SERVE_DY_CHOICES, HIT_ANGLE_SPEED,
+    SMASH_EFFECT_TIME, MAX_CHARGE, CHARGE_DRAIN_RATE, TIME_EPSILON,
+    DEFAULT_TICK_RATE, WIN_SCORE, WALL_TOP, WALL_BOTTOM, MAX_SUBSTEP_DISTANCE, MAX_SUBSTEPS,
+    MAX_CONTACTS,
+    DEFAULT_DIFFICULTY, CPU_DEADZONE, SMASH_RUNUP, get_difficulty,
+    UP, DOWN, LEFT, RIGHT,
+)
+
+# Side codes used in the per-step event arrays
+NOBODY = 0
+PLAYER = 1
+CPU = 2
+
+# cpu_inputs entry for matches whose right paddle is the built-in CPU
+AI_CONTROLLED = -1
+
+# Every per-match array, as copied by BatchEngine._take
+ROW_FIELDS = FLOAT_FIELDS + INT_FIELDS + ("game_over", "paused", "winner")
+# Per-sub-step values that _sweep updates
+SWEPT_FIELDS = (
+    "x", "y", "dx", "dy", "move_mult", "mult", "effect",
+    "player_charge", "cpu_charge", "player_smashes", "cpu_smashes", "smashed",
+)
+
+
+class BatchEngine:
+    """Steps ``n`` independent Action Tennis matches at once.
+
+    Uses the same rules as ``TennisEngine`` with every field of
+    ``GameState`` (except the purely visual trail and particles) held in
+    a NumPy array of length ``n``. ``step`` returns two int8 arrays,
+    ``(scored, smashed)``, holding ``PLAYER``/``CPU``/``NOBODY`` per match.
+    Finished matches stay frozen until ``reset`` is called for them, and
+    so do matches whose ``paused`` flag is set.
+
+    ``cpu_inputs`` may be None (built-in CPU everywhere) or a bitmask per
+    match, where ``AI_CONTROLLED`` hands that match to the built-in CPU.
+    Every match's CPU plays at ``difficulty`` and plans its shots exactly
+    as ``TennisEngine.plan_cpu`` does, drawing its errors from ``rng``.
+    """
+
+    def __init__(self, n, seed=None, tick_rate=DEFAULT_TICK_RATE, difficulty=DEFAULT_DIFFICULTY):
+        if np is None:
+            raise ImportError("BatchEngine requires numpy")
+        self.n = n
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.difficulty = get_difficulty(difficulty)
+        self.rng = np.random.default_rng(seed)
+        for name in FLOAT_FIELDS:
+            setattr(self, name, np.zeros(n, dtype=np.float64))
+        for name in INT_FIELDS:
+            setattr(self, name, np.zeros(n, dtype=np.int64))
+        self.game_over = np.zeros(n, dtype=bool)
+        self.paused = np.zeros(n, dtype=bool)
+        self.winner = np.zeros(n, dtype=np.int8)
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        fresh = GameState()
+        for name in FLOAT_FIELDS + INT_FIELDS:
+            getattr(self, name)[mask] = getattr(fresh, name)
+        self.game_over[mask] = False
+        self.winner[mask] = NOBODY
+        self.reset_ball(mask)
+
+    def reset_ball(self, mask):
+        count = int(np.count_nonzero(mask))
+        if not count:
+            return
+        self.ball_x[mask] = CANVAS_WIDTH // 2
+        self.ball_y[mask] = CANVAS_HEIGHT // 2
+        self.ball_dx[mask] = np.where(self.rng.random(count) < 0.5, BALL_SPEED, -BALL_SPEED)
+        self.ball_dy[mask] = self.rng.choice(np.array(SERVE_DY_CHOICES), count)
+        self.ball_speed_multiplier[mask] = 1.0
+        self.ball_smash_effect[mask] = 0
+        self.plan_cpu(mask)
+
+    def plan_cpu(self, mask):
+        # Vectorised TennisEngine.plan_cpu for the matches in ``mask``
+        count = int(np.count_nonzero(mask))
+        if not count:
+            return
+        difficulty = self.difficulty
+        x, y = self.ball_x[mask], self.ball_y[mask]
+        dx, dy = self.ball_dx[mask], self.ball_dy[mask]
+        mult, effect = self.ball_speed_multiplier[mask], self.ball_smash_effect[mask]
+        target_y, seconds = _intercept(x, y, dx, dy, mult, effect, self.cpu_x[mask] - BALL_SIZE // 2)
+        target_y = target_y + difficulty.aim_error * mult * self.rng.uniform(-1, 1, count)
+        smash = np.where(target_y > self.cpu_y[mask] + PADDLE_HEIGHT // 2, 1.0, -1.0)
+        smash = np.where(self.rng.random(count) < difficulty.smash_chance, smash, 0.0)
+        coming = dx > 0
+        self.cpu_target_y[mask] = np.where(coming, target_y, CANVAS_HEIGHT / 2)
+        self.cpu_intercept_time[mask] = np.where(coming, seconds, 0.0)
+        self.cpu_smash[mask] = np.where(coming, smash, 0.0)
+        self.cpu_reaction[mask] = difficulty.reaction_time
+
+    def set_row(self, i, state):
+        for name in FLOAT_FIELDS + INT_FIELDS:
+            getattr(self, name)[i] = getattr(state, name)
+        self.game_over[i] = state.game_over
+        self.winner[i] = {None: NOBODY, "Player": PLAYER, "CPU": CPU}[state.winner]
+
+    def get_row(self, i):
+        state = GameState()
+        for name in FLOAT_FIELDS + INT_FIELDS:
+            setattr(state, name, getattr(self, name)[i].item())
+        state.game_over = bool(self.game_over[i])
+        state.winner = {NOBODY: None, PLAYER: "Player", CPU: "CPU"}[int(self.winner[i])]
+        return state
+
+    def step(self, inputs=0, cpu_inputs=None):
+        n = self.n
+        inputs = np.broadcast_to(np.asarray(inputs, dtype=np.int64), (n,))
+        if cpu_inputs is not None:
+            cpu_inputs = np.broadcast_to(np.asarray(cpu_inputs, dtype=np.int64), (n,))
+        live = ~(self.game_over | self.paused)
+        if live.all():
+            return self._step(inputs, cpu_inputs)
+
+        # Paused and finished matches cost nothing: the live ones are
+        # copied out, stepped as a smaller batch and copied back
+        scored = np.zeros(n, dtype=np.int8)
+        smashed = np.zeros(n, dtype=np.int8)
+        idx = np.flatnonzero(live)
+        if not len(idx):
+            return scored, smashed
+        part = self._take(idx)
+        scored[idx], smashed[idx] = part._step(inputs[idx], None if cpu_inputs is None else cpu_inputs[idx])
+        for name in ROW_FIELDS:
+            getattr(self, name)[idx] = getattr(part, name)
+        return scored, smashed
+
+    def _take(self, idx):
+        # A BatchEngine over copies of rows ``idx``, sharing rng and settings
+        part = BatchEngine.__new__(BatchEngine)
+        part.n = len(idx)
+        part.tick_rate = self.tick_rate
+        part.dt = self.dt
+        part.difficulty = self.difficulty
+        part.rng = self.rng
+        for name in ROW_FIELDS:
+            setattr(part, name, getattr(self, name)[idx])
+        return part
+
+    def _step(self, inputs, cpu_inputs):
+        # step() for a batch whose matches are all live
+        n = self.n
+        dt = self.dt
+
+        px, py = self.player_x, self.player_y
+        cx, cy = self.cpu_x, self.cpu_y
+        bx, by = self.ball_x, self.ball_y
+        dx, dy = self.ball_dx, self.ball_dy
+        mult = self.ball_speed_multiplier
+
+        # Player movement (bounds are checked against the old position)
+        step = PLAYER_SPEED * dt
+        new_py = (py + np.where((inputs & DOWN != 0) & (py < CANVAS_HEIGHT - PADDLE_HEIGHT - 5), step, 0)
+                  - np.where((inputs & UP != 0) & (py > 5), step, 0))
+        new_px = (px + np.where((inputs & RIGHT != 0) & (px < CANVAS_WIDTH // 2 - PADDLE_WIDTH - 5), step, 0)
+                  - np.where((inputs & LEFT != 0) & (px > 5), step, 0))
+        player_vx = (new_px - px) * self.tick_rate
+        player_vy = (new_py - py) * self.tick_rate
+        player_charge = _charge(self.player_charge_time, (player_vx != 0) | (player_vy != 0), dt)
+
+        # CPU movement
+        ai = None
+        if cpu_inputs is not None:
+            ai = cpu_inputs == AI_CONTROLLED
+            cpu_step = self.difficulty.speed * dt
+            new_cy = (cy + np.where(cpu_inputs & DOWN != 0, cpu_step, 0)
+                      - np.where(cpu_inputs & UP != 0, cpu_step, 0))
+        cpu_reaction, cpu_intercept_time = self.cpu_reaction, self.cpu_intercept_time
+        if ai is None or ai.any():
+            speed = self.difficulty.speed
+            cpu_intercept_time = cpu_intercept_time - dt
+            waiting = cpu_reaction > TIME_EPSILON
+            runup = np.where(cpu_intercept_time <= SMASH_RUNUP / speed, SMASH_RUNUP, -SMASH_RUNUP)
+            offset = self.cpu_target_y + self.cpu_smash * runup - (cy + PADDLE_HEIGHT // 2)
+            move = np.where(np.abs(offset) > CPU_DEADZONE, np.clip(offset, -speed * dt, speed * dt), 0)
+            ai_cy = np.where(waiting, cy, cy + move)
+            new_cy = ai_cy if ai is None else np.where(ai, ai_cy, new_cy)
+            cpu_reaction = np.where(waiting, cpu_reaction - dt, cpu_reaction)
+            if ai is not None:
+                cpu_reaction = np.where(ai, cpu_reaction, self.cpu_reaction)
+                cpu_intercept_time = np.where(ai, cpu_intercept_time, self.cpu_intercept_time)
+        new_cy = np.clip(new_cy, 5, CANVAS_HEIGHT - PADDLE_HEIGHT - 5)
+        cpu_vy = (new_cy - cy) * self.tick_rate
+        cpu_charge = _charge(self.cpu_charge_time, cpu_vy != 0, dt)
+
+        # Smash effect decay; this tick moves at the multiplier it started with
+        effect = self.ball_smash_effect
+        active = effect > 0
+        new_effect = np.where(active, effect - dt, effect)
+        ended = active & (new_effect <= TIME_EPSILON)
+
+        ball = {
+            "x": bx.copy(), "y": by.copy(), "dx": dx.copy(), "dy": dy.copy(),
+            "move_mult": mult.copy(), "mult": np.where(ended, 1.0, mult),
+            "effect": np.where(ended, 0.0, new_effect),
+            "player_charge": player_charge, "cpu_charge": cpu_charge,
+            "player_smashes": np.zeros(n, dtype=np.int64), "cpu_smashes": np.zeros(n, dtype=np.int64),
+            "smashed": np.zeros(n, dtype=np.int8),
+            "player_x": new_px, "player_y": new_py, "player_vx": player_vx, "player_vy": player_vy,
+            # The CPU smashes when it hits the ball moving at over half its speed
+            "cpu_x": cx, "cpu_y": new_cy, "cpu_fast": np.abs(cpu_vy) > self.difficulty.speed * 0.5,
+        }
+
+        # Swept collision: every match runs its own number of sub-steps.
+        # Most balls need one; the rest carry on as a compacted subset.
+        substeps = np.clip(np.ceil(np.maximum(np.abs(dx), np.abs(dy)) * mult * dt / MAX_SUBSTEP_DISTANCE),
+                           1, MAX_SUBSTEPS)
+        ball["h"] = dt / substeps
+        _sweep(ball, np.ones(n, dtype=bool))
+        if substeps.max() > 1:
+            idx = np.flatnonzero(substeps > 1)
+            fast = {key: value[idx] for key, value in ball.items()}
+            remaining = substeps[idx]
+            for k in range(1, int(remaining.max())):
+                _sweep(fast, remaining > k)
+            for key in SWEPT_FIELDS:
+                ball[key][idx] = fast[key]
+
+        new_bx, new_by = ball["x"], ball["y"]
+        new_dx, new_dy = ball["dx"], ball["dy"]
+        new_mult, new_effect = ball["mult"], ball["effect"]
+        player_charge, cpu_charge = ball["player_charge"], ball["cpu_charge"]
+        player_smashes, cpu_smashes = ball["player_smashes"], ball["cpu_smashes"]
+        smashed = ball["smashed"]
+        scored = np.where(new_bx < 0, CPU, np.where(new_bx > CANVAS_WIDTH, PLAYER, NOBODY)).astype(np.int8)
+        # Paddle hits turn the ball around; serves are planned in reset_ball
+        turned = ((new_dx > 0) != (dx > 0)) & (scored == NOBODY)
+
+        updates = (
+            ("player_x", new_px), ("player_y", new_py),
+            ("player_velocity_x", player_vx), ("player_velocity_y", player_vy),
+            ("player_charge_time", player_charge),
+            ("player_smash_count", self.player_smash_count + player_smashes),
+            ("cpu_y", new_cy), ("cpu_velocity_y", cpu_vy),
+            ("cpu_charge_time", cpu_charge),
+            ("cpu_reaction", cpu_reaction), ("cpu_intercept_time", cpu_intercept_time),
+            ("cpu_smash_count", self.cpu_smash_count + cpu_smashes),
+            ("ball_x", new_bx), ("ball_y", new_by),
+            ("ball_dx", new_dx), ("ball_dy", new_dy),
+            ("ball_speed_multiplier", new_mult), ("ball_smash_effect", new_effect),
+        )
+        for name, value in updates:
+            getattr(self, name)[:] = value
+        self.cpu_velocity_x[:] = 0
+
+        if turned.any():
+            self.plan_cpu(turned)
+
+        point = scored != NOBODY
+        if point.any():
+            self.player_score += scored == PLAYER
+            self.cpu_score += scored == CPU
+            self.reset_ball(point)
+            won = point & ((self.player_score >= WIN_SCORE) | (self.cpu_score >= WIN_SCORE))
+            self.game_over |= won
+            self.winner[won] = scored[won]
+
+        return scored, smashed
+
+
+def _sweep(ball, moving):
+    # One sub-step for every match in ``ball`` (a dict of arrays). Like
+    # TennisEngine.sweep_ball it resolves up to MAX_CONTACTS wall or
+    # paddle contacts, each at its time of impact, sweeping the rest of
+    # the sub-step after each one.
+    h = np.where(moving, ball["h"], 0.0)
+    contact, t = _contact(ball, h)
+    if not contact.any():
+        return
+    # Few balls touch anything, so the rest of their sub-step runs on a
+    # compacted subset, and the full contact test only runs again while
+    # one of them could still reach a wall or paddle
+    idx = np.flatnonzero(contact)
+    rest = {key: value[idx] for key, value in ball.items()}
+    h = h[idx] * (1.0 - t[idx])
+    for _ in range(MAX_CONTACTS - 1):
+        ex = rest["dx"] * rest["move_mult"] * h
+        ey = rest["dy"] * rest["move_mult"] * h
+        if not _may_contact(rest, ex, ey).any():
+            # The same result as a contact test that finds nothing
+            rest["x"] = rest["x"] + ex
+            rest["y"] = rest["y"] + ey
+            break
+        contact, t = _contact(rest, h)
+        if not contact.any():
+            break
+        h = np.where(contact, h * (1.0 - t), 0.0)
+    for key in SWEPT_FIELDS:
+        ball[key][idx] = rest[key]
+
+
+def _may_contact(ball, ex, ey):
+    # True wherever the move (ex, ey) could meet a wall or the paddle it
+    # heads for; a cheap and conservative version of _contact
+    x, y = ball["x"], ball["y"]
+    half = BALL_SIZE // 2
+    safe_ey = np.where(ey == 0, 1.0, ey)
+    wall = (((ey < 0) & ((y <= WALL_TOP) | ((WALL_TOP - y) / safe_ey <= 1.0)))
+            | ((ey > 0) & ((y >= WALL_BOTTOM) | ((WALL_BOTTOM - y) / safe_ey <= 1.0))))
+    player = (ex < 0) & (x + ex <= ball["player_x"] + PADDLE_WIDTH + half)
+    cpu = (ex > 0) & (x + ex >= ball["cpu_x"] - half)
+    return wall | player | cpu
+
+
+def _contact(ball, h):
+    # Moves every ball in ``ball`` for ``h`` seconds up to its first
+    # contact; returns which balls made one and when (a fraction of h)
+    x, y, dx, dy = ball["x"], ball["y"], ball["dx"], ball["dy"]
+    move_mult = ball["move_mult"]
+    ex = dx * move_mult * h
+    ey = dy * move_mult * h
+
+    safe_ey = np.where(ey == 0, 1.0, ey)
+    wall_t = np.where(ey < 0, np.where(y <= WALL_TOP, 0.0, (WALL_TOP - y) / safe_ey),
+                      np.where(ey > 0, np.where(y >= WALL_BOTTOM, 0.0, (WALL_BOTTOM - y) / safe_ey), np.inf))
+    wall = wall_t <= 1.0
+    t = np.where(wall, wall_t, 1.0)
+    paddle_t = _paddle_impact(x, y, ex, ey, ball["player_x"], ball["player_y"])
+    player_hit = (ex < 0) & (paddle_t < t)
+    t = np.where(player_hit, paddle_t, t)
+    paddle_t = _paddle_impact(x, y, ex, ey, ball["cpu_x"], ball["cpu_y"])
+    cpu_hit = (ex > 0) & (paddle_t < t)
+    t = np.where(cpu_hit, paddle_t, t)
+    wall &= ~(player_hit | cpu_hit)
+    player_hit &= ~cpu_hit
+
+    x = x + ex * t
+    y = y + ey * t
+    dy = np.where(wall, -dy, dy)
+    mult = ball["mult"]
+    effect = ball["effect"]
+
+    # Player paddle
+    player_vx, player_vy = ball["player_vx"], ball["player_vy"]
+    charge = ball["player_charge"] / MAX_CHARGE
+    across = ((dy > 0) & (player_vy < 0)) | ((dy < 0) & (player_vy > 0))
+    power = np.where(player_vx > 0, 1.5 + charge * 1.0, 1.0)
+    power = np.where(across, np.maximum(power, 1.3 + charge * 0.7), power)
+    smash = player_hit & ((player_vx > 0) | across)
+    hit_pos = (y - (ball["player_y"] + PADDLE_HEIGHT // 2)) / (PADDLE_HEIGHT // 2)
+    dx = np.where(player_hit, np.abs(dx) * power, dx)
+    dy = np.where(player_hit, hit_pos * HIT_ANGLE_SPEED * power, dy)
+    move_mult = np.where(smash, power, move_mult)
+    mult = np.where(smash, power, mult)
+    effect = np.where(smash, SMASH_EFFECT_TIME, effect)
+    ball["player_charge"] = np.where(smash, 0, ball["player_charge"])
+    ball["player_smashes"] = ball["player_smashes"] + smash
+    ball["smashed"] = np.where(smash, PLAYER, ball["smashed"]).astype(np.int8)
+
+    # CPU paddle (the CPU never moves horizontally)
+    charge = ball["cpu_charge"] / MAX_CHARGE
+    fast = ball["cpu_fast"]
+    power = np.where(fast, 1.2 + charge * 0.4, 1.0)
+    smash = cpu_hit & fast
+    hit_pos = (y - (ball["cpu_y"] + PADDLE_HEIGHT // 2)) / (PADDLE_HEIGHT // 2)
+    dx = np.where(cpu_hit, -np.abs(dx) * power, dx)
+    dy = np.where(cpu_hit, hit_pos * HIT_ANGLE_SPEED * power, dy)
+    move_mult = np.where(smash, power, move_mult)
+    mult = np.where(smash, power, mult)
+    effect = np.where(smash, SMASH_EFFECT_TIME, effect)
+    ball["cpu_charge"] = np.where(smash, 0, ball["cpu_charge"])
+    ball["cpu_smashes"] = ball["cpu_smashes"] + smash
+    ball["smashed"] = np.where(smash, CPU, ball["smashed"]).astype(np.int8)
+
+    ball["x"] = x
+    ball["y"] = y
+    ball["dx"] = dx
+    ball["dy"] = dy
+    ball["move_mult"] = move_mult
+    ball["mult"] = mult
+    ball["effect"] = effect
+    return wall | player_hit | cpu_hit, t
+
+
+def _fold_wall(y):
+    # Vectorised tennis_engine.fold_wall
+    span = WALL_BOTTOM - WALL_TOP
+    y = np.mod(y - WALL_TOP, 2 * span)
+    return WALL_TOP + np.where(y <= span, y, 2 * span - y)
+
+
+def _intercept(x, y, dx, dy, mult, effect, target_x):
+    # Vectorised tennis_engine.intercept
+    distance = target_x - x
+    ahead = distance * dx > 0
+    safe_dx = np.where(ahead, dx, 1.0)
+    speed = np.abs(safe_dx)
+    fast = speed * mult * effect
+    seconds = np.where(np.abs(distance) <= fast, np.abs(distance) / (speed * mult),
+                       effect + (np.abs(distance) - fast) / speed)
+    target_y = _fold_wall(np.where(ahead, y + distance * dy / safe_dx, y))
+    return target_y, np.where(ahead, seconds, 0.0)
+
+
+def _paddle_impact(x0, y0, ex, ey, paddle_x, paddle_y):
+    # Vectorised tennis_engine.paddle_impact; misses come back as inf
+    half = BALL_SIZE // 2
+    t_enter = np.zeros_like(x0)
+    t_exit = np.ones_like(x0)
+    miss = np.zeros(x0.shape, dtype=bool)
+    for p, e, low, high in ((x0, ex, paddle_x - half, paddle_x + PADDLE_WIDTH + half),
+                            (y0, ey, paddle_y - half, paddle_y + PADDLE_HEIGHT + half)):
+        still = e == 0
+        miss |= still & ((p < low) | (p > high))
+        safe = np.where(still, 1.0, e)
+        t1 = (low - p) / safe
+        t2 = (high - p) / safe
+        t_enter = np.maximum(t_enter, np.where(still, -np.inf, np.minimum(t1, t2)))
+        t_exit = np.minimum(t_exit, np.where(still, np.inf, np.maximum(t1, t2)))
+    return np.where(miss | (t_enter > t_exit), np.inf, t_enter)
+
+
+def _charge(charge_time, moving, dt):
+    built = charge_time + dt
+    built = np.where(built > MAX_CHARGE - TIME_EPSILON, MAX_CHARGE, built)
+    drained = charge_time - CHARGE_DRAIN_RATE * dt
+    drained = np.where(drained < TIME_EPSILON, 0.0, drained)
+    return np.where(moving, built, drained)
@@ -0,0 +1,962 @@
+"""
+Performance benchmarks for the headless game code.
+
+Every benchmark uses fixed seeds. ``--json FILE`` writes the results as
+JSON; ``--baseline FILE`` compares them with such a file and exits with
+status 1 when a metric is worse by more than ``--threshold`` (a fraction,
+``DEFAULT_THRESHOLD`` by default). Metrics are compared by name: rates
+and capacities (``..._per_sec``, ``rooms_within_deadline``) must not
+drop; times, sizes and failure counts (``_ms``, ``_us``, ``_ns``,
+``_sec``, ``_kb``, ``_mb``, ``bytes``, ``calls``, ``misses``, ``escapes``,
+``missed_...``, ``..._error``, ``..._sigma``) must not grow, and failure
+counts that were 0 must stay 0. Budgets and other values only describe
+the run.
+
+Usage: python benchmarks.py [name ...] [--json FILE] [--baseline FILE] [--threshold X]
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from tennis_engine import DIFFICULTIES, PADDLE_HEIGHT, TennisEngine, UP, DOWN, LEFT, RIGHT
+
+
+def bench_engine(steps=200000, seed=1):
+    engine = TennisEngine(seed=seed)
+    rng = random.Random(seed)
+    moves = [0, UP, DOWN, LEFT, RIGHT, UP | RIGHT, DOWN | RIGHT, UP | LEFT]
+    inputs = [rng.choice(moves) for _ in range(1024)]
+
+    start = time.perf_counter()
+    for i in range(steps):
+        engine.step(inputs[i & 1023])
+        if engine.state.game_over:
+            engine.reset()
+    elapsed = time.perf_counter() - start
+
+    return {"steps": steps, "steps_per_sec": steps / elapsed}
+
+
+def bench_batch(matches=4096, steps=500, seed=1):
+    import numpy as np
+    from batch_engine import BatchEngine
+
+    batch = BatchEngine(matches, seed=seed)
+    rng = np.random.default_rng(seed)
+    inputs = rng.integers(0, 16, (64, matches))
+
+    start = time.perf_counter()
+    for i in range(steps):
+        batch.step(inputs[i & 63])
+        if batch.game_over.any():
+            batch.reset(batch.game_over)
+    elapsed = time.perf_counter() - start
+
+    return {"matches": matches, "steps": steps, "match_steps_per_sec": matches * steps / elapsed}
+
+
+def bench_parity(matches=32, steps=1000, seed=0):
+    from tests.scenarios import run_parity
+
+    max_error, mismatch = run_parity(matches, steps, seed)
+    assert mismatch is None, mismatch
+    return {"matches": matches, "steps": steps, "max_error": max_error}
+
+
+def bench_cpu_ai(ticks=100000, matches=4096, steps=300, seed=1):
+    # Each difficulty against a player that tracks the ball: how often the
+    # CPU misses a ball coming at it, and what its per-tick update costs.
+    # Smashes compound the ball speed until nobody can reach it, so the
+    # miss rate only counts balls under ``reachable_speed``. Then the batch
+    # engine with every CPU on the built-in AI against the same batch with
+    # the CPUs standing still.
+    import numpy as np
+    from batch_engine import BatchEngine
+    from tennis_engine import BALL_SPEED
+
+    reachable_speed = 3 * BALL_SPEED
+    result = {}
+    miss_rates = []
+    for name in DIFFICULTIES:
+        engine = TennisEngine(seed=seed, difficulty=name)
+        incoming = misses = smashes = 0
+        for _ in range(ticks):
+            s = engine.state
+            center = s.player_y + PADDLE_HEIGHT // 2
+            inputs = DOWN if center < s.ball_y - 8 else UP if center > s.ball_y + 8 else 0
+            coming = 0 < s.ball_dx <= reachable_speed
+            events = engine.step(inputs)
+            for event in events:
+                if event[0] == "point" and event[1] == "Player" and coming:
+                    misses += 1
+                elif event[0] == "smash" and event[1] == "CPU":
+                    smashes += 1
+                elif event[0] == "game_over":
+                    engine.reset()
+            if coming and (engine.state.ball_dx < 0 or events):
+                incoming += 1
+        miss_rates.append(misses / incoming)
+
+        engine = TennisEngine(seed=seed, difficulty=name)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            engine.update_cpu()
+        elapsed = time.perf_counter() - start
+        result[f"{name}_miss_rate"] = misses / incoming
+        result[f"{name}_smash_rate"] = smashes / incoming
+        result[f"{name}_update_ns"] = elapsed / ticks * 1e9
+    assert miss_rates == sorted(miss_rates, reverse=True), "harder CPUs should miss less"
+
+    rng = np.random.default_rng(seed)
+    inputs = rng.integers(0, 16, (64, matches))
+    for label, cpu_inputs in (("ai", None), ("idle", 0)):
+        batch = BatchEngine(matches, seed=seed)
+        start = time.perf_counter()
+        for i in range(steps):
+            batch.step(inputs[i & 63], cpu_inputs)
+            if batch.game_over.any():
+                batch.reset(batch.game_over)
+        result[f"batch_{label}_match_steps_per_sec"] = matches * steps / (time.perf_counter() - start)
+    return result
+
+
+def bench_selfplay(population=4, points=100, seed=1):
+    # Points per second through the process pool with one worker and with
+    # one per core, then checks that a run stopped after one generation
+    # and resumed from its checkpoint ends exactly like an unbroken run
+    import os
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    from selfplay import SelfPlay
+
+    cores = os.cpu_count() or 1
+    result = {"cores": cores}
+    for workers in sorted({1, max(2, cores)}):
+        run = SelfPlay(population=population, points=points, seed=seed)
+        with ProcessPoolExecutor(workers) as executor:
+            run.evaluate(executor, run.population[:1])  # start the workers
+            start = time.perf_counter()
+            run.evaluate(executor, run.population)
+            elapsed = time.perf_counter() - start
+        result[f"points_per_sec_{workers}_workers"] = population * points / elapsed
+
+    with tempfile.TemporaryDirectory() as directory:
+        unbroken = SelfPlay(population=population, points=points, seed=seed)
+        unbroken.run(2)
+        path = os.path.join(directory, "selfplay.json")
+        SelfPlay(population=population, points=points, seed=seed, checkpoint=path).run(1)
+        resumed = SelfPlay(checkpoint=path)
+        assert resumed.generation == 1
+        resumed.run(2)
+        assert resumed.history == unbroken.history, "resumed run diverged"
+        assert resumed.population == unbroken.population, "resumed run diverged"
+    result["best_win_rate"] = unbroken.history[-1]["win_rate"]
+    return result
+
+
+def bench_frame_profiler(steps=200000, seed=1):
+    # Engine steps/sec with the profiler off and on, and what one overlay
+    # refresh (every phase's percentiles over a full ring) costs
+    from frame_profiler import FrameProfiler
+
+    rng = random.Random(seed)
+    moves = [0, UP, DOWN, LEFT, RIGHT, UP | RIGHT, DOWN | RIGHT, UP | LEFT]
+    inputs = [rng.choice(moves) for _ in range(1024)]
+    result = {}
+    profiler = FrameProfiler()
+    for label, attached in (("off", None), ("on", profiler)):
+        engine = TennisEngine(seed=seed)
+        engine.profiler = attached
+        start = time.perf_counter()
+        for i in range(steps):
+            # Two physics steps per frame, as at 60 Hz physics and 30 fps
+            if attached is not None and i % 2 == 0:
+                profiler.begin_frame()
+            engine.step(inputs[i & 1023])
+            if attached is not None and i % 2 == 1:
+                profiler.end_frame()
+            if engine.state.game_over:
+                engine.reset()
+        result[f"steps_per_sec_{label}"] = steps / (time.perf_counter() - start)
+    result["overhead_us_per_step"] = (1 / result["steps_per_sec_on"] - 1 / result["steps_per_sec_off"]) * 1e6
+
+    start = time.perf_counter()
+    for phase in ("frame",) + profiler.phases:
+        profiler.percentiles(phase)
+    profiler.fps()
+    result["overlay_refresh_ms"] = (time.perf_counter() - start) * 1000
+    assert profiler.summary()["update_ball"]["p50_ms"] > 0
+    return result
+
+
+def bench_draw_calls(frames=3000, seed=1):
+    # Canvas calls per frame for a rally drawn on a RecordingCanvas: the
+    # renderer and ViewModel as the game uses them, without a display
+    from canvas_renderer import CanvasRenderer
+    from renderers import RecordingCanvas
+    from view_model import ViewModel
+
+    canvas = RecordingCanvas()
+    view = ViewModel()
+    renderer = CanvasRenderer(canvas, view)
+    renderer.show()
+    engine = TennisEngine(seed=seed)
+    rng = random.Random(seed)
+    moves = [0, UP, DOWN, LEFT, RIGHT, UP | RIGHT, DOWN | RIGHT, UP | LEFT]
+    inputs = 0
+    counts = []
+    skipped = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        if rng.random() < 0.1:
+            inputs = rng.choice(moves)
+        engine.step(inputs)
+        if engine.state.game_over:
+            engine.reset()
+        before = canvas.total()
+        renderer.draw(engine.state)
+        view.flush()
+        counts.append(canvas.total() - before)
+        skipped += view.frame_skipped
+    elapsed = time.perf_counter() - start
+    counts.sort()
+    return {"frames": frames, "items": len(canvas.find_all()),
+            "calls_per_frame": sum(counts) / frames, "p95_calls_per_frame": counts[frames * 95 // 100],
+            "max_calls_per_frame": counts[-1], "skipped_per_frame": skipped / frames,
+            "frame_us": elapsed / frames * 1e6}
+
+
+def bench_particles(bursts=200, sizes=(48, 1024), seed=1):
+    # Smash-heavy load: a store filled in one burst whose particles all die
+    # on the same tick, against the old list of dicts aged through a copy
+    # and list.remove. Both must keep the same particles alive.
+    from tennis_engine import Particles, PARTICLE_LIFE, TIME_EPSILON
+
+    dt = 1.0 / 60
+    rng = random.Random(seed)
+    result = {"bursts": bursts}
+    for size in sizes:
+        points = [(rng.uniform(0, 800), rng.uniform(0, 500), rng.randrange(2)) for _ in range(size)]
+        particles = Particles(size)
+        store_time = 0.0
+        list_time = 0.0
+        frames = 0
+        for _ in range(bursts):
+            effects = []
+            start = time.perf_counter()
+            for x, y, color in points:
+                particles.add(x, y, PARTICLE_LIFE, color)
+            # A full store takes no more
+            assert not particles.add(0.0, 0.0, PARTICLE_LIFE, 0)
+            mid = time.perf_counter()
+            for x, y, color in points:
+                effects.append({'x': x, 'y': y, 'life': PARTICLE_LIFE, 'player': color})
+            store_time += mid - start
+            list_time += time.perf_counter() - mid
+            while effects:
+                start = time.perf_counter()
+                particles.age(dt)
+                mid = time.perf_counter()
+                for effect in effects[:]:
+                    effect['life'] -= dt
+                    if effect['life'] <= TIME_EPSILON:
+                        effects.remove(effect)
+                store_time += mid - start
+                list_time += time.perf_counter() - mid
+                frames += 1
+                assert len(particles) == len(effects)
+        result[f"store_{size}_frame_us"] = store_time / frames * 1e6
+        result[f"list_{size}_frame_us"] = list_time / frames * 1e6
+    return result
+
+
+def bench_renderers(frames=3000, seed=1):
+    # Draw cost per frame of each renderer backend over the same rally,
+    # failing unless the recording renderer lists exactly the shapes the
+    # canvas renderer shows, frame by frame
+    from renderers import RENDERERS
+    from tests.scenarios import draw_rally
+
+    result = {"frames": frames}
+    counts = {}
+    for name, renderer_class in RENDERERS.items():
+        elapsed, counts[name] = draw_rally(renderer_class, frames, seed)
+        result[f"{name}_frame_us"] = elapsed / frames * 1e6
+    shapes = counts["recording"]
+    assert shapes == counts["canvas"], "recording renderer disagrees with the canvas"
+    result["shapes_per_frame"] = sum(shapes) / frames
+    result["max_shapes_per_frame"] = max(shapes)
+    return result
+
+
+def bench_app(requests=2000, seed=1):
+    # Sequential requests per route through Flask's test client
+    from app import app, match_store, site
+
+    client = app.test_client()
+    rng = random.Random(seed)
+    client.get('/')  # builds the lazy parts of the app outside the timing
+    asset = next(iter(site()[0].urls.values()))
+    match_id = json.loads(client.post('/matches', json={}).data)['id']
+    routes = (
+        ("index", lambda: client.get('/', headers={'Accept-Encoding': 'gzip'})),
+        ("asset", lambda: client.get(asset, headers={'Accept-Encoding': 'gzip'})),
+        ("create_match", lambda: client.post('/matches', json={})),
+        ("match_score", lambda: client.get(f'/matches/{match_id}')),
+        ("match_points", lambda: client.post(f'/matches/{match_id}/points',
+                                             json={'winner': rng.choice((1, 2))})),
+    )
+    result = {"requests": requests}
+    total = 0.0
+    for name, send in routes:
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = send()
+            assert response.status_code in (200, 201), response.data
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        result[f"{name}_requests_per_sec"] = requests / elapsed
+    result["requests_per_sec"] = len(routes) * requests / total
+
+    store = match_store()
+    for shard in store.shards:
+        for created in list(shard.matches):
+            store.remove(created)
+    return result
+
+
+def bench_tunnelling(tick_rates=(20, 30, 60)):
+    # Double max-power smashes straight at each paddle must all come back,
+    # and fast balls at a paddle against a wall must stay on the court
+    from tests.scenarios import smash_returns, wall_escapes
+
+    start = time.perf_counter()
+    shots, misses = smash_returns(tick_rates)
+    wall_steps, escapes = wall_escapes(tick_rates=tick_rates)
+    elapsed = time.perf_counter() - start
+    assert not misses, f"{len(misses)} of {shots} smashes tunnelled through a paddle"
+    assert not escapes, f"the ball left the court in {len(escapes)} of {wall_steps} steps"
+    return {"shots": shots, "misses": len(misses), "wall_steps": wall_steps, "escapes": len(escapes),
+            "elapsed_sec": elapsed}
+
+
+def bench_rooms(tick_rate=60, ticks=30, limit=20000):
+    # Grow the number of CPU rooms in one manager until a tick no longer
+    # fits in its 1 / tick_rate budget (95th percentile of sampled ticks)
+    from rooms import Room, RoomManager
+
+    def p95_tick(count):
+        manager = RoomManager(tick_rate)
+        for i in range(count):
+            room = Room(str(i), "cpu", tick_rate, seed=i)
+            room.inputs["left"] = (UP, DOWN, 0)[i % 3]
+            manager.rooms[room.id] = room
+        durations = sorted(manager.tick() for _ in range(ticks))
+        return durations[int(len(durations) * 0.95)], manager.dt
+
+    low, high = 0, 100
+    while high <= limit:
+        duration, budget = p95_tick(high)
+        if duration > budget:
+            break
+        low, high = high, high * 2
+    for _ in range(5):
+        middle = (low + high) // 2
+        duration, budget = p95_tick(middle)
+        if duration > budget:
+            high = middle
+        else:
+            low = middle
+
+    return {"tick_rate": tick_rate, "rooms_within_deadline": low, "first_missed_at": high}
+
+
+def bench_scheduler(rooms=5000, tick_rate=60, duration=2.0, seed=1):
+    # Run every room from one asyncio loop in real time and check the
+    # deadlines hold; every third room sits paused, among the live ones,
+    # and should be free
+    import asyncio
+    from room_scheduler import RoomScheduler
+
+    scheduler = RoomScheduler(tick_rate, seed=seed)
+    for i in range(rooms + rooms // 2):
+        room = scheduler.add_room(str(i), "cpu" if i % 4 else "pvp")
+        room.set_inputs((UP, DOWN, 0)[i % 3], (0, UP, DOWN)[i % 3])
+        if i % 3 == 2:
+            scheduler.set_paused(room.id, True)
+
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    asyncio.run(scheduler.run(duration))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - start_cpu
+
+    lag = scheduler.lag_stats()
+    room_ticks = sum(group.ticks * int((~(group.batch.game_over | group.batch.paused)).sum())
+                     for group in scheduler.groups)
+    return {"rooms": rooms, "paused": rooms // 2, "groups": len(scheduler.groups),
+            "room_ticks_per_sec": room_ticks / elapsed,
+            "missed_deadlines": scheduler.missed_deadlines,
+            "lag_p50_ms": lag["p50"] * 1000, "lag_p99_ms": lag["p99"] * 1000,
+            "room_max_lag_ms": max(room.max_lag for room in scheduler.rooms.values()) * 1000,
+            "cpu_utilisation": cpu / elapsed}
+
+
+def bench_snapshots(ticks=20000, seed=1):
+    # One client acking every snapshot it gets, against the JSON payload
+    import json
+    from rooms import state_payload
+    from snapshot import SnapshotEncoder, SnapshotDecoder
+
+    engine = TennisEngine(seed=seed)
+    rng = random.Random(seed)
+    moves = [0, UP, DOWN, LEFT, RIGHT, UP | RIGHT, DOWN | RIGHT, UP | LEFT]
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder()
+    binary_bytes = 0
+    json_bytes = 0
+    encode_time = 0.0
+    decode_time = 0.0
+    for i in range(ticks):
+        if i % 15 == 0:
+            inputs = rng.choice(moves)
+        engine.step(inputs)
+        if engine.state.game_over:
+            engine.reset()
+        start = time.perf_counter()
+        encoder.update(engine.state)
+        snapshot = encoder.encode(decoder.ack)
+        encode_time += time.perf_counter() - start
+        start = time.perf_counter()
+        decoder.decode(snapshot)
+        decode_time += time.perf_counter() - start
+        binary_bytes += len(snapshot)
+        json_bytes += len(json.dumps(state_payload(engine.state)))
+
+    return {"ticks": ticks, "bytes_per_tick": binary_bytes / ticks, "json_bytes_per_tick": json_bytes / ticks,
+            "encode_us": encode_time / ticks * 1e6, "decode_us": decode_time / ticks * 1e6}
+
+
+def bench_replay(matches=20, seed=1):
+    # Record whole matches, then re-simulate them from the files and from
+    # keyframe seeks; every replay must end exactly where the match did
+    import os
+    import tempfile
+    from replay import MatchRandom, ReplayReader, ReplayWriter
+
+    rng = random.Random(seed)
+    moves = [0, UP, DOWN, LEFT, RIGHT, UP | RIGHT, DOWN | RIGHT, UP | LEFT]
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        finals = []
+        for i in range(matches):
+            difficulty = list(DIFFICULTIES)[i % len(DIFFICULTIES)]
+            engine = TennisEngine(rng=MatchRandom(seed + i), difficulty=difficulty)
+            path = os.path.join(directory, f"{i}.atr")
+            with ReplayWriter(path, engine) as writer:
+                inputs = 0
+                while not engine.state.game_over:
+                    if rng.random() < 0.05:
+                        inputs = rng.choice(moves)
+                    writer.step(inputs)
+            paths.append(path)
+            finals.append((engine.state.tick, engine.state.ball_x, engine.state.ball_y, engine.state.winner))
+
+        total_bytes = sum(os.path.getsize(path) for path in paths)
+        ticks = 0
+        start = time.perf_counter()
+        for path, final in zip(paths, finals):
+            with ReplayReader(path) as reader:
+                for tick, _ in reader.play():
+                    pass
+                ticks += reader.ticks
+        elapsed = time.perf_counter() - start
+
+        seeks = 0
+        seek_start = time.perf_counter()
+        for path, final in zip(paths, finals):
+            with ReplayReader(path) as reader:
+                for tick in range(0, reader.ticks, 97):
+                    reader.state_at(tick)
+                    seeks += 1
+                s = reader.state_at(reader.ticks)
+                assert (s.tick, s.ball_x, s.ball_y, s.winner) == final, f"{path} does not replay exactly"
+        seek_elapsed = time.perf_counter() - seek_start
+
+    return {"matches": matches, "bytes_per_match": total_bytes / matches, "avg_ticks": ticks // matches,
+            "replay_ticks_per_sec": ticks / elapsed, "seek_ms": seek_elapsed / seeks * 1000}
+
+
+def bench_win_probability(simulations=20000, seed=1):
+    # Exact DP against playing TennisGame out point by point, from a few
+    # scores and formats (tests/scenarios.py)
+    import numpy as np
+    from tests.scenarios import SIMULATION_CASES, simulated_win_rate
+    from win_probability import WinProbability, match_win_probabilities
+
+    worst = max(simulated_win_rate(*case, simulations, seed)[2] for case in SIMULATION_CASES)
+    assert worst < 4, f"win probability is {worst:.1f} standard errors from simulation"
+
+    model = WinProbability(0.62, 0.58).warm()
+    lookups = 200000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        model.lookup(2, 3, 4, 5, 1, 0, 1)
+    lookup_ns = (time.perf_counter() - start) / lookups * 1e9
+
+    pairs = 10000
+    p = np.random.default_rng(seed).uniform(0.4, 0.8, (2, pairs))
+    start = time.perf_counter()
+    match_win_probabilities(p[0], p[1])
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    return {"simulations": simulations, "worst_sigma": worst, "warm_lookup_ns": lookup_ns,
+            "pairs": pairs, "batch_pairs_ms": batch_ms}
+
+
+def bench_scoring(matches=2000, seed=1):
+    # Point streams for whole matches, scored through apply_points_array
+    # and checked against point_won_by one point at a time
+    import numpy as np
+    from tennis_game import TennisGame
+
+    rng = np.random.default_rng(seed)
+    streams = [(rng.random(400) < 0.5).astype(np.uint8) + 1 for _ in range(matches)]
+    streams = [stream.tobytes() for stream in streams]
+    TennisGame()  # compiles the scoring table outside the timing
+
+    points = 0
+    start = time.perf_counter()
+    for stream in streams:
+        points += TennisGame().apply_points_array(stream).applied
+    elapsed = time.perf_counter() - start
+
+    checked = 0
+    single_elapsed = 0.0
+    for stream in streams[:matches // 10]:
+        game = TennisGame()
+        result = game.apply_points_array(stream)
+        single = TennisGame()
+        games = []
+        single.subscribe(lambda events, player, number: games.append(number))
+        start = time.perf_counter()
+        for player in stream[:result.applied]:
+            single.point_won_by(player)
+        single_elapsed += time.perf_counter() - start
+        assert single.state == game.state and games == list(result.games), "apply_points disagrees"
+        checked += result.applied
+
+    return {"matches": matches, "points": points, "points_per_sec": points / elapsed,
+            "point_won_by_per_sec": checked / single_elapsed}
+
+
+def bench_history(matches=20, seed=1):
+    # Five-set advantage matches between even players run to thousands of
+    # points; the undo history they keep is measured against its budget,
+    # then undo, redo and rewinds are timed against the end of the
+    # longest match
+    from tests.scenarios import HISTORY_BYTES_PER_POINT, long_matches
+
+    rng = random.Random(seed)
+    games, bytes_per_point = long_matches(matches, seed)
+    assert bytes_per_point <= HISTORY_BYTES_PER_POINT, f"history takes {bytes_per_point:.1f} bytes a point"
+    points = sum(game.points_played for game in games)
+
+    game = max(games, key=lambda game: game.points_played)
+    final = game.state
+    longest = game.points_played
+    operations = 100000
+    start = time.perf_counter()
+    for _ in range(operations // 2):
+        game.undo()
+        game.redo()
+    undo_ns = (time.perf_counter() - start) / operations * 1e9
+    targets = [rng.randrange(longest + 1) for _ in range(operations)]
+    start = time.perf_counter()
+    for target in targets:
+        game.rewind(target)
+    rewind_ns = (time.perf_counter() - start) / operations * 1e9
+    game.rewind(longest)
+    assert game.state == final and game.game_over, "rewinding to the end lost the final score"
+
+    return {"matches": matches, "points": points, "longest_match": longest,
+            "bytes_per_point": bytes_per_point, "undo_redo_ns": undo_ns, "rewind_ns": rewind_ns}
+
+
+def bench_point_entry(points=2000, seed=1):
+    # Time from a point button press until its widgets are updated, with
+    # the game/set/match banners, against the old handler that opened a
+    # modal messagebox per game, set and match won. A real messagebox
+    # blocks until dismissed; the stand-in here opens and draws the same
+    # dialog, then closes it at once, so the modal numbers leave out the
+    # wait for a click. Needs a display.
+    import tkinter as tk
+    from scoring import GAME, SET, MATCH
+    from tennis_gui import TennisGameGUI
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as error:
+        return {"skipped": str(error)}
+    root.withdraw()
+    gui = TennisGameGUI(root)
+    dialogs = []
+
+    def showinfo(title, message):
+        start = time.perf_counter()
+        window = tk.Toplevel(root)
+        window.title(title)
+        tk.Label(window, text=message).pack(padx=20, pady=10)
+        tk.Button(window, text="OK", command=window.destroy).pack(pady=5)
+        window.grab_set()
+        window.update_idletasks()
+        window.destroy()
+        dialogs.append(time.perf_counter() - start)
+
+    def modal_point(player):
+        events = gui.game.advance(player)
+        gui.update_display()
+        winner = gui.player1_name if player == 1 else gui.player2_name
+        for flag, title, message in ((GAME, "ゲーム終了", "ゲームを獲得！"), (SET, "セット終了", "セットを獲得！"),
+                                     (MATCH, "マッチ終了", "マッチに勝利しました！")):
+            if events & flag:
+                showinfo(title, f"{winner}が{message}")
+
+    def enter_points(point_won_by):
+        rng = random.Random(seed)
+        latencies = []
+        for _ in range(points):
+            if gui.game.game_over:
+                gui.new_game()
+            start = time.perf_counter()
+            point_won_by(rng.choice((1, 2)))
+            root.update_idletasks()
+            latencies.append(time.perf_counter() - start)
+            root.update()
+        latencies.sort()
+        return latencies
+
+    banner = enter_points(gui.point_won_by)
+    gui.new_game()
+    modal = enter_points(modal_point)
+    root.destroy()
+
+    result = {"points": points}
+    for prefix, latencies in (("", banner), ("modal_", modal)):
+        result[f"{prefix}p50_us"] = latencies[len(latencies) // 2] * 1e6
+        result[f"{prefix}p99_us"] = latencies[int(len(latencies) * 0.99)] * 1e6
+        result[f"{prefix}max_us"] = latencies[-1] * 1e6
+    result["modal_dialogs"] = len(dialogs)
+    return result
+
+
+def bench_match_api(matches=10000, requests=20000, threads=8, seed=1):
+    # Threaded clients against the Flask app with 10k live matches: four
+    # score reads to every point posted, over random matches
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from app import app, match_store
+
+    match_store = match_store()
+
+    client = app.test_client()
+    match_ids = [json.loads(client.post('/matches', json={}).data)['id'] for _ in range(matches)]
+    assert len(match_store) >= matches
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = app.test_client()
+        latencies = []
+        for _ in range(requests // threads):
+            match_id = rng.choice(match_ids)
+            start = time.perf_counter()
+            if rng.random() < 0.2:
+                response = client.post(f'/matches/{match_id}/points', json={'winner': rng.choice((1, 2))})
+            else:
+                response = client.get(f'/matches/{match_id}')
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.data
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = sorted(latency for result in pool.map(worker, range(threads)) for latency in result)
+    elapsed = time.perf_counter() - start
+
+    # The store alone, without Flask and the test client around it
+    rng = random.Random(seed)
+    sample = [rng.choice(match_ids) for _ in range(requests)]
+    start = time.perf_counter()
+    for match_id in sample:
+        match_store.payload(match_id)
+    store_elapsed = time.perf_counter() - start
+
+    for match_id in match_ids:
+        match_store.remove(match_id)
+    return {"matches": matches, "threads": threads, "requests": len(latencies),
+            "requests_per_sec": len(latencies) / elapsed, "store_reads_per_sec": requests / store_elapsed,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000}
+
+
+def bench_sse(subscribers=10000, updates=5, burst=50, slow_every=10):
+    # 10k SSE subscribers on one match, each a thread reading the same
+    # generator the endpoint returns. Measures idle memory per subscriber
+    # and how long a score change takes to reach all of them, then
+    # publishes a burst: slow subscribers (every tenth) and anyone else
+    # behind must skip to the latest frame rather than queue the rest
+    import os
+    import threading
+    from matches import MatchStore
+
+    def rss():
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    store = MatchStore()
+    match_id = json.loads(store.create())["id"]
+    broadcast = store.broadcast(match_id)
+    received = [0] * subscribers
+    latest = [0] * subscribers
+    arrived = [0.0] * (updates + burst + 2)
+    seen = set()
+
+    def subscriber(index):
+        stream = broadcast.stream(0, keepalive=5)
+        next(stream)
+        for frame in stream:
+            version = int(frame[4:frame.index(b"\n")])
+            arrived[version] = max(arrived[version], time.perf_counter())
+            received[index] += 1
+            latest[index] = version
+            seen.add(id(frame))
+            if index % slow_every == 0:
+                time.sleep(1)
+
+    base_rss = rss()
+    stack_size = threading.stack_size(256 * 1024)
+    start = time.perf_counter()
+    threads = [threading.Thread(target=subscriber, args=(i,), daemon=True) for i in range(subscribers)]
+    for thread in threads:
+        thread.start()
+    threading.stack_size(stack_size)
+    while sum(received) < subscribers:
+        time.sleep(0.05)
+    connect = time.perf_counter() - start
+    idle_rss = rss() - base_rss
+
+    # Alternating winners keep the game at deuce, so every point changes the score
+    fanout = []
+    for k in range(updates):
+        published = time.perf_counter()
+        store.add_points(match_id, [1 + k % 2])
+        version = broadcast.version
+        while min(latest[i] for i in range(subscribers) if i % slow_every) < version:
+            time.sleep(0.01)
+        fanout.append(arrived[version] - published)
+
+    before_burst = sum(received)
+    for k in range(burst):
+        store.add_points(match_id, [1 + k % 2])
+    final = broadcast.version
+    deadline = time.perf_counter() + 60
+    while min(latest) < final and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    store.remove(match_id)
+    for thread in threads:
+        thread.join()
+
+    # Frames rendered per client would show up as thousands of distinct objects
+    assert len(seen) <= final, "subscribers were not sent the shared frames"
+    assert min(latest) == final, "a subscriber never caught up with the latest score"
+    return {"subscribers": subscribers, "connect_s": connect,
+            "rss_kb_per_subscriber": idle_rss / subscribers / 1024,
+            "fanout_ms_avg": sum(fanout) / updates * 1000, "fanout_ms_max": max(fanout) * 1000,
+            "burst": burst, "burst_frames_per_subscriber": (sum(received) - before_burst) / subscribers}
+
+
+def bench_page_load(loads=500):
+    # Bytes and server time for a first and a repeat visit to /, the old
+    # way (template rendered per request, raw /static files revalidated on
+    # every visit) and the new way (pre-rendered gzip page revalidated by
+    # ETag, fingerprinted assets cached as immutable)
+    import gzip
+    import re
+    from flask import Flask, render_template
+    from app import app, site
+
+    old_app = Flask('app', root_path=app.root_path)
+    old_app.jinja_env.globals['asset_url'] = lambda filename: f'/static/{filename}'
+    old_app.add_url_rule('/', 'index', lambda: render_template('index.html'))
+    old_client = old_app.test_client()
+    client = app.test_client()
+    gzip_only = {'Accept-Encoding': 'gzip'}
+
+    def timed(function):
+        start = time.perf_counter()
+        for _ in range(loads):
+            sent = function()
+        return sent, (time.perf_counter() - start) / loads * 1000
+
+    old_urls = re.findall(r'/static/[^"]+', old_client.get('/').text)
+    etags = {url: old_client.get(url).headers['ETag'] for url in old_urls}
+
+    def old_first():
+        return sum(len(old_client.get(url, headers=gzip_only).data) for url in ['/'] + old_urls)
+
+    def old_repeat():
+        return len(old_client.get('/', headers=gzip_only).data) + sum(
+            len(old_client.get(url, headers={**gzip_only, 'If-None-Match': etags[url]}).data) for url in old_urls)
+
+    page = client.get('/', headers=gzip_only)
+    new_urls = re.findall(r'/assets/[^"]+', gzip.decompress(page.data).decode())
+    assert len(new_urls) == len(old_urls) == len(site()[0].urls)
+
+    def new_first():
+        return sum(len(client.get(url, headers=gzip_only).data) for url in ['/'] + new_urls)
+
+    def new_repeat():
+        # The browser still holds the immutable assets, so only / is asked for
+        response = client.get('/', headers={**gzip_only, 'If-None-Match': page.headers['ETag']})
+        assert response.status_code == 304
+        return len(response.data)
+
+    (old_first_bytes, old_first_ms), (old_repeat_bytes, old_repeat_ms) = timed(old_first), timed(old_repeat)
+    (new_first_bytes, new_first_ms), (new_repeat_bytes, new_repeat_ms) = timed(new_first), timed(new_repeat)
+    return {"old_first_bytes": old_first_bytes, "new_first_bytes": new_first_bytes,
+            "old_repeat_bytes": old_repeat_bytes, "new_repeat_bytes": new_repeat_bytes,
+            "old_first_ms": old_first_ms, "new_first_ms": new_first_ms,
+            "old_repeat_ms": old_repeat_ms, "new_repeat_ms": new_repeat_ms,
+            "old_requests_per_repeat": 1 + len(old_urls), "new_requests_per_repeat": 1}
+
+
+def bench_cold_start(runs=5):
+    # A fresh ``import wsgi`` has to stay inside the budget in startup.py
+    # and must not load the modules app.py defers to first use
+    from startup import IMPORT_MEMORY_BUDGET, IMPORT_TIME_BUDGET
+    from tests.scenarios import cold_imports
+
+    seconds, rss, loaded = cold_imports(runs)
+    assert not loaded, f"import wsgi loaded {', '.join(loaded)} eagerly"
+    assert seconds <= IMPORT_TIME_BUDGET, f"import wsgi took {seconds * 1000:.0f} ms"
+    assert rss <= IMPORT_MEMORY_BUDGET, f"import wsgi peaked at {rss / 2 ** 20:.1f} MB"
+    return {"import_ms": seconds * 1000, "budget_ms": IMPORT_TIME_BUDGET * 1000,
+            "peak_rss_mb": rss / 2 ** 20, "budget_mb": IMPORT_MEMORY_BUDGET / 2 ** 20}
+
+
+BENCHMARKS = {
+    "engine": bench_engine,
+    "batch": bench_batch,
+    "parity": bench_parity,
+    "cpu_ai": bench_cpu_ai,
+    "selfplay": bench_selfplay,
+    "frame_profiler": bench_frame_profiler,
+    "draw_calls": bench_draw_calls,
+    "renderers": bench_renderers,
+    "particles": bench_particles,
+    "app": bench_app,
+    "tunnelling": bench_tunnelling,
+    "rooms": bench_rooms,
+    "scheduler": bench_scheduler,
+    "snapshots": bench_snapshots,
+    "replay": bench_replay,
+    "win_probability": bench_win_probability,
+    "scoring": bench_scoring,
+    "history": bench_history,
+    "point_entry": bench_point_entry,
+    "match_api": bench_match_api,
+    "sse": bench_sse,
+    "page_load": bench_page_load,
+    "cold_start": bench_cold_start,
+}
+
+
+DEFAULT_THRESHOLD = 0.25
+# Matched against whole metric names; FIXED_WORDS win over the others
+FIXED_WORDS = ("budget",)
+RATE_WORDS = ("per_sec", "within_deadline", "first_missed_at")
+# Matched against the "_"-separated words of a metric name
+COST_WORDS = ("s", "ms", "us", "ns", "sec", "kb", "mb", "bytes", "calls",
+              "misses", "missed", "escapes", "error", "sigma")
+
+
+def metric_direction(name):
+    """1 if a larger ``name`` is better, -1 if smaller is, 0 if neither."""
+    if any(word in name for word in FIXED_WORDS):
+        return 0
+    if any(word in name for word in RATE_WORDS):
+        return 1
+    if any(word in name.split("_") for word in COST_WORDS):
+        return -1
+    return 0
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Returns ``(benchmark, metric, baseline, now)`` for every metric of
+    ``results`` that is worse than in ``baseline`` by over ``threshold``."""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            direction = metric_direction(metric)
+            if not direction or not isinstance(before, (int, float)):
+                continue
+            if before:
+                worse = (value - before) / abs(before) * direction < -threshold
+            else:
+                # No relative change from 0: any move the wrong way counts
+                worse = value * direction < 0
+            if worse:
+                regressions.append((name, metric, before, value))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmarks (all of them by default).")
+    parser.add_argument("names", nargs="*", metavar="name",
+                        help=f"benchmarks to run, from: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with results written by --json")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"worst allowed change as a fraction (default {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    json_path = args.json
+    baseline_path = args.baseline
+    threshold = args.threshold
+    names = args.names or list(BENCHMARKS)
+
+    results = {}
+    for name in names:
+        result = results[name] = BENCHMARKS[name]()
+        details = ", ".join(f"{key}={value:,.6g}" if isinstance(value, float) else f"{key}={value}"
+                            for key, value in result.items())
+        print(f"{name}: {details}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "results": results}, f, indent=1)
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, threshold)
+        for name, metric, before, value in regressions:
+            print(f"REGRESSION {name}.{metric}: {before:,.6g} -> {value:,.6g}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
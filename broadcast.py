@@ -0,0 +1,81 @@
+"""
+Server-Sent Events fan-out.
+
+A ``Broadcast`` holds only the latest frame: one pre-encoded SSE message
+shared by every subscriber. Each frame carries the whole current state,
+so a client that falls behind simply jumps to the newest one; nothing is
+queued per subscriber and a subscriber costs its ``since`` counter.
+"""
+
+import json
+import threading
+
+SSE_RETRY_MS = 2000
+# Comment lines sent while nothing changes, so dead connections are noticed
+SSE_KEEPALIVE = 15
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def sse_frame(version, events):
+    """Encodes ``(event name, data)`` pairs as one SSE message block; the
+    last event carries ``version`` as its id for Last-Event-ID resumes."""
+    lines = []
+    for i, (name, data) in enumerate(events):
+        if i == len(events) - 1:
+            lines.append(f"id: {version}\n")
+        lines.append(f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n")
+    return "".join(lines).encode()
+
+
+class Broadcast:
+    """The latest frame of one match or room and a condition to wait on."""
+
+    def __init__(self):
+        self.changed = threading.Condition()
+        self.latest = (0, None)  # (version, frame), replaced as a pair
+        self.closed = False
+
+    @property
+    def version(self):
+        return self.latest[0]
+
+    @property
+    def frame(self):
+        return self.latest[1]
+
+    def publish(self, events):
+        # ``events`` as for ``sse_frame``; serialised here, once
+        with self.changed:
+            version = self.latest[0] + 1
+            self.latest = (version, sse_frame(version, events))
+            self.changed.notify_all()
+
+    def close(self):
+        with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+
+    def wait(self, since, timeout=SSE_KEEPALIVE):
+        """Returns ``(version, frame)`` once there is a frame newer than
+        ``since``, ``(since, None)`` on timeout and ``(None, None)`` once
+        closed."""
+        version, frame = self.latest
+        if version <= since and not self.closed:
+            with self.changed:
+                self.changed.wait_for(lambda: self.closed or self.latest[0] > since, timeout)
+            version, frame = self.latest
+        if self.closed:
+            return None, None
+        if version > since and frame is not None:
+            return version, frame
+        return since, None
+
+    def stream(self, since=0, keepalive=SSE_KEEPALIVE):
+        # Generator for a streaming response body
+        yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+        while True:
+            version, frame = self.wait(since, keepalive)
+            if version is None:
+                return
+            since = version
+            yield frame if frame is not None else KEEPALIVE_FRAME
@@ -0,0 +1,245 @@
+import time
+
+from tennis_engine import (
+    ball_color, CANVAS_WIDTH, CANVAS_HEIGHT, BALL_SIZE, PADDLE_WIDTH, PADDLE_HEIGHT, MAX_CHARGE,
+    PARTICLE_LIFE, PARTICLE_CAPACITY, TRAIL_LENGTH,
+)
+
+# By particle colour index (``PLAYERS``)
+PARTICLE_COLORS = ("#FFD700", "#FF4444")
+
+CHARGE_BAR_WIDTH = 60
+CHARGE_BAR_HEIGHT = 6
+# Charge colours from low to full: player blue -> purple -> pink, CPU red -> pink -> orange
+PLAYER_CHARGE_COLORS = ("#2196F3", "#9C27B0", "#FF4081")
+CPU_CHARGE_COLORS = ("#F44336", "#E91E63", "#FF9800")
+SMASH_TEXT_MS = 1000
+
+
+def _build_trail_table():
+    # TRAIL_TABLE[length][i] = (half size, colour) for trail dot i of a trail of that length
+    table = [[]]
+    for length in range(1, TRAIL_LENGTH + 1):
+        row = []
+        for i in range(length):
+            alpha = (i + 1) / length
+            size = int(BALL_SIZE * alpha * 0.7)
+            row.append((size // 2, f"#{int(255 * alpha):02x}{int(255 * alpha):02x}00"))
+        table.append(row)
+    return table
+
+
+TRAIL_TABLE = _build_trail_table()
+
+
+def charge_level(charge_time):
+    ratio = charge_time / MAX_CHARGE
+    if ratio > 0.5:
+        return 2
+    elif ratio > 0.25:
+        return 1
+    return 0
+
+
+def body_items(s):
+    """Shapes of a frame except the charge bars, in drawing order, as
+    ``(kind, x1, y1, x2, y2, fill)``. Kinds are ``"player_paddle"``,
+    ``"cpu_paddle"``, ``"trail"``, ``"particle"`` and ``"ball"``."""
+    items = [
+        # Paddles (colour shows charge level)
+        ("player_paddle", s.player_x, s.player_y, s.player_x + PADDLE_WIDTH, s.player_y + PADDLE_HEIGHT,
+         PLAYER_CHARGE_COLORS[charge_level(s.player_charge_time)]),
+        ("cpu_paddle", s.cpu_x, s.cpu_y, s.cpu_x + PADDLE_WIDTH, s.cpu_y + PADDLE_HEIGHT,
+         CPU_CHARGE_COLORS[charge_level(s.cpu_charge_time)]),
+    ]
+
+    # The newest trail point sits under the ball, so it is not drawn
+    trail = s.ball_trail
+    styles = TRAIL_TABLE[len(trail)]
+    for i in range(len(trail) - 1):
+        x, y = trail[i]
+        half, color = styles[i]
+        items.append(("trail", x - half, y - half, x + half, y + half, color))
+
+    # The engine holds at most PARTICLE_CAPACITY particles, the size the
+    # renderer's pool starts at
+    for x, y, life, color in s.smash_effects:
+        size = int(10 * life / PARTICLE_LIFE)
+        items.append(("particle", x - size, y - size, x + size, y + size, PARTICLE_COLORS[color]))
+
+    half = BALL_SIZE // 2
+    items.append(("ball", s.ball_x - half, s.ball_y - half, s.ball_x + half, s.ball_y + half,
+                  ball_color(s.ball_speed_multiplier)))
+    return items
+
+
+def charge_bar_items(s):
+    """``("bar_back", ...)`` and ``("bar_fill", ...)`` for each charging paddle."""
+    items = []
+    for x, y, charge_time, colors in (
+            (s.player_x, s.player_y, s.player_charge_time, PLAYER_CHARGE_COLORS),
+            (s.cpu_x, s.cpu_y, s.cpu_charge_time, CPU_CHARGE_COLORS)):
+        if charge_time <= 0:
+            continue
+        bar_x = x - 10
+        bar_y = y - 15
+        width = int(CHARGE_BAR_WIDTH * min(charge_time / MAX_CHARGE, 1.0))
+        items.append(("bar_back", bar_x, bar_y, bar_x + CHARGE_BAR_WIDTH, bar_y + CHARGE_BAR_HEIGHT, "#333333"))
+        # A zero-width fill collapses to nothing, like the old "if width > 0"
+        items.append(("bar_fill", bar_x, bar_y, bar_x + width, bar_y + CHARGE_BAR_HEIGHT,
+                      colors[charge_level(charge_time)]))
+    return items
+
+
+def scene_items(s):
+    """Every shape a renderer draws for state ``s``."""
+    return body_items(s) + charge_bar_items(s)
+
+
+class ItemPool:
+    """Canvas items that are shown and hidden, never deleted.
+
+    ``size`` items are created up front; ``place`` creates more when an
+    index is past the end, so nothing asked for is left undrawn.
+    """
+
+    def __init__(self, canvas, view, size, create):
+        self.canvas = canvas
+        self.view = view
+        self.create = create
+        self.items = [create() for _ in range(size)]
+        self.visible = 0
+
+    def place(self, index, x1, y1, x2, y2, fill):
+        items = self.items
+        while index >= len(items):
+            # New items start hidden; show() makes them visible
+            items.append(self.create())
+        item = items[index]
+        self.view.coords(self.canvas, item, x1, y1, x2, y2)
+        self.view.itemconfig(self.canvas, item, fill=fill)
+
+    def show(self, count):
+        # Only items that change visibility are touched
+        items = self.items
+        for item in items[count:self.visible]:
+            self.view.itemconfig(self.canvas, item, state="hidden")
+        for item in items[self.visible:count]:
+            self.view.itemconfig(self.canvas, item, state="normal")
+        self.visible = count
+
+
+class CanvasRenderer:
+    """Draws engine state with canvas items allocated once up front.
+
+    All per-frame changes go through ``view`` (a ``ViewModel``), which
+    drops the ones that would not change anything on screen. ``profiler``
+    times ``draw`` and ``draw_charge_bars`` when set. ``renderers.py``
+    has the same interface without Tk.
+    """
+
+    def __init__(self, canvas, view):
+        self.canvas = canvas
+        self.view = view
+        self.profiler = None
+        # The court goes first so everything else is drawn over it
+        self.draw_court()
+        self.player_paddle = canvas.create_rectangle(0, 0, 0, 0, fill=PLAYER_CHARGE_COLORS[0],
+                                                     outline="white", width=2, state="hidden")
+        self.cpu_paddle = canvas.create_rectangle(0, 0, 0, 0, fill=CPU_CHARGE_COLORS[0],
+                                                  outline="white", width=2, state="hidden")
+        self.ball = canvas.create_oval(0, 0, 0, 0, fill=ball_color(1.0),
+                                       outline="white", width=2, state="hidden")
+        self.trail = ItemPool(canvas, view, TRAIL_LENGTH - 1,
+                              lambda: canvas.create_oval(0, 0, 0, 0, outline="", state="hidden"))
+        self.particles = ItemPool(canvas, view, PARTICLE_CAPACITY,
+                                  lambda: canvas.create_oval(0, 0, 0, 0, outline="", state="hidden"))
+        self.bar_backs = ItemPool(canvas, view, 2,
+                                  lambda: canvas.create_rectangle(0, 0, 0, 0, fill="#333333",
+                                                                  outline="white", state="hidden"))
+        self.bar_fills = ItemPool(canvas, view, 2,
+                                  lambda: canvas.create_rectangle(0, 0, 0, 0, outline="", state="hidden"))
+        self.fixed_items = (self.player_paddle, self.cpu_paddle, self.ball)
+        self.fixed = {"player_paddle": self.player_paddle, "cpu_paddle": self.cpu_paddle, "ball": self.ball}
+
+    def draw_court(self):
+        canvas = self.canvas
+        # Court outline
+        canvas.create_rectangle(5, 5, CANVAS_WIDTH - 5, CANVAS_HEIGHT - 5, outline="white", width=3)
+        # Center line
+        canvas.create_line(CANVAS_WIDTH // 2, 5, CANVAS_WIDTH // 2, CANVAS_HEIGHT - 5,
+                           fill="white", width=2, dash=(10, 5))
+        # Center circle
+        canvas.create_oval(CANVAS_WIDTH // 2 - 30, CANVAS_HEIGHT // 2 - 30,
+                           CANVAS_WIDTH // 2 + 30, CANVAS_HEIGHT // 2 + 30, outline="white", width=2)
+
+    def smash(self, player, power, x, y):
+        text = "🔥SMASH!🔥" if power < 2.0 else "💥MEGA SMASH!💥"
+        color = "#FFD700" if player == "Player" else "#FF4444"
+        self.canvas.create_text(x, y - 30, text=text, font=("Arial", 16, "bold"), fill=color,
+                                tags="smash_text")
+        self.canvas.after(SMASH_TEXT_MS, lambda: self.canvas.delete("smash_text"))
+
+    def game_over(self, winner):
+        if winner == "Player":
+            text, color = "🏆 YOU WIN! 🏆", "yellow"
+        else:
+            text, color = "💻 CPU WINS! 💻", "red"
+        self.canvas.create_text(CANVAS_WIDTH // 2, CANVAS_HEIGHT // 2, text=text,
+                                font=("Arial", 36, "bold"), fill=color, tags="game_object")
+
+    def clear(self):
+        # Removes the smash and game over messages
+        self.canvas.delete("game_object")
+        self.canvas.delete("smash_text")
+
+    def show(self):
+        for item in self.fixed_items:
+            self.view.itemconfig(self.canvas, item, state="normal")
+
+    def hide(self):
+        for item in self.fixed_items:
+            self.view.itemconfig(self.canvas, item, state="hidden")
+        for pool in (self.trail, self.particles, self.bar_backs, self.bar_fills):
+            pool.show(0)
+
+    def draw(self, s):
+        profiler = self.profiler
+        if profiler is not None:
+            start = time.perf_counter_ns()
+        canvas = self.canvas
+        view = self.view
+        fixed = self.fixed
+        trail = self.trail
+        particles = self.particles
+        trail_count = particle_count = 0
+        for kind, x1, y1, x2, y2, fill in body_items(s):
+            if kind == "trail":
+                trail.place(trail_count, x1, y1, x2, y2, fill)
+                trail_count += 1
+            elif kind == "particle":
+                particles.place(particle_count, x1, y1, x2, y2, fill)
+                particle_count += 1
+            else:
+                item = fixed[kind]
+                view.coords(canvas, item, x1, y1, x2, y2)
+                view.itemconfig(canvas, item, fill=fill)
+        trail.show(trail_count)
+        particles.show(particle_count)
+
+        if profiler is None:
+            self.draw_charge_bars(s)
+        else:
+            start = profiler.lap("draw", start)
+            self.draw_charge_bars(s)
+            profiler.lap("draw_charge_bars", start)
+
+    def draw_charge_bars(self, s):
+        # A (back, fill) pair of items per charging paddle
+        items = charge_bar_items(s)
+        count = len(items) // 2
+        for i in range(count):
+            self.bar_backs.place(i, *items[2 * i][1:])
+            self.bar_fills.place(i, *items[2 * i + 1][1:])
+        self.bar_backs.show(count)
+        self.bar_fills.show(count)
@@ -0,0 +1,6 @@
+class ApiError(Exception):
+    """An error to answer a request with, carrying its HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
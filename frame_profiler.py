@@ -0,0 +1,112 @@
+"""
+Per-phase frame timings for the Action Tennis game loop.
+
+A ``FrameProfiler`` keeps the last ``size`` frames in one flat
+``array('q')`` ring: a row per frame holding its start time and the
+nanoseconds spent in each of ``PHASES`` plus the whole frame. Callers
+time a phase with ``lap``:
+
+    start = time.perf_counter_ns()
+    engine.update_player(inputs)
+    start = profiler.lap("update_player", start)
+
+Phases run several times in a frame (physics catch-up steps) add up.
+Code that can be profiled holds a ``profiler`` attribute that is None
+while profiling is off, so the only cost then is that check.
+"""
+
+import json
+import time
+from array import array
+
+PHASES = ("update_player", "update_cpu", "update_ball", "age_effects", "draw", "draw_charge_bars", "flush")
+RING_SIZE = 600  # ten seconds at 60 fps
+PERCENTILES = (50, 95, 99)
+
+
+class FrameProfiler:
+    def __init__(self, phases=PHASES, size=RING_SIZE):
+        self.phases = phases
+        # Each row is the frame's start time, its phases, then the whole frame
+        self.width = len(phases) + 2
+        self.columns = {phase: i + 1 for i, phase in enumerate(phases)}
+        self.columns["start"] = 0
+        self.columns["frame"] = self.width - 1
+        self.size = size
+        self.samples = array("q", bytes(8 * self.width * size))
+        self.blank_row = array("q", bytes(8 * self.width))
+        self.frames = 0  # frames recorded so far, including overwritten ones
+        self.row = 0
+
+    def begin_frame(self):
+        row = self.row
+        self.samples[row:row + self.width] = self.blank_row
+        self.samples[row] = time.perf_counter_ns()
+
+    def lap(self, phase, start):
+        """Adds the time since ``start`` to ``phase``; returns now."""
+        now = time.perf_counter_ns()
+        self.samples[self.row + self.columns[phase]] += now - start
+        return now
+
+    def end_frame(self):
+        row = self.row
+        self.samples[row + self.width - 1] = time.perf_counter_ns() - self.samples[row]
+        self.frames += 1
+        self.row = (self.frames % self.size) * self.width
+
+    def rows(self):
+        # Recorded rows, oldest first
+        count = min(self.frames, self.size)
+        first = self.frames - count
+        width = self.width
+        samples = self.samples
+        for frame in range(first, self.frames):
+            row = (frame % self.size) * width
+            yield samples[row:row + width]
+
+    def column(self, phase):
+        # Values of one column in ring order (not time order)
+        return self.samples[self.columns[phase]::self.width][:min(self.frames, self.size)]
+
+    def percentiles(self, phase="frame", points=PERCENTILES):
+        """Nearest-rank percentiles of ``phase`` (or the whole frame) in
+        nanoseconds over the frames in the ring."""
+        values = sorted(self.column(phase))
+        if not values:
+            return tuple(0 for _ in points)
+        # The smallest value with at least ``point`` percent of frames at or below it
+        count = len(values)
+        return tuple(values[max(0, -(-count * point // 100) - 1)] for point in points)
+
+    def fps(self):
+        starts = self.column("start")
+        if len(starts) < 2:
+            return 0.0
+        return (len(starts) - 1) * 1e9 / max(1, max(starts) - min(starts))
+
+    def summary(self):
+        """``{phase: {"mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}``."""
+        result = {}
+        for phase in self.phases + ("frame",):
+            values = self.column(phase)
+            stats = {"mean_ms": sum(values) / len(values) / 1e6 if values else 0.0}
+            for point, value in zip(PERCENTILES, self.percentiles(phase)):
+                stats[f"p{point}_ms"] = value / 1e6
+            stats["max_ms"] = max(values, default=0) / 1e6
+            result[phase] = stats
+        return result
+
+    def dump(self, path):
+        """Writes every recorded frame (``.csv``) or the summary and the
+        frames (anything else, as JSON)."""
+        header = ("start_ns",) + tuple(f"{phase}_ns" for phase in self.phases) + ("frame_ns",)
+        if path.endswith(".csv"):
+            with open(path, "w") as f:
+                f.write(",".join(header) + "\n")
+                for row in self.rows():
+                    f.write(",".join(map(str, row)) + "\n")
+            return
+        with open(path, "w") as f:
+            json.dump({"fps": self.fps(), "summary": self.summary(), "columns": header,
+                       "frames": [list(row) for row in self.rows()]}, f)
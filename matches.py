@@ -0,0 +1,156 @@
+import json
+import secrets
+import threading
+
+from broadcast import Broadcast
+from errors import ApiError
+from scoring import DEFAULT_FORMAT, FORMATS
+from tennis_game import TennisGame
+
+# Live matches are spread over this many independently locked shards
+SHARD_COUNT = 64
+MAX_BATCH_POINTS = 10000
+MAX_NAME_LENGTH = 40
+
+
+class MatchError(ApiError):
+    pass
+
+
+class Match:
+    """One scored match and its serialised score.
+
+    ``payload`` is JSON bytes, rebuilt only after a point changes the
+    score; every read in between shares the same bytes. Each change is
+    also published once to ``broadcast`` for SSE spectators.
+    """
+
+    def __init__(self, match_id, player1="Player 1", player2="Player 2", match_format=DEFAULT_FORMAT):
+        self.id = match_id
+        self.format = match_format
+        self.game = TennisGame(player1, player2, match_format)
+        self.version = 0
+        self._payload = None
+        self.broadcast = Broadcast()
+        self.publish(())
+
+    def add_points(self, points):
+        # Returns how many points counted; the rest came after match point
+        stream = self.game.apply_points(points)
+        if stream.applied:
+            self.version += 1
+            self._payload = None
+            self.publish(name for name, boundaries in (("game", stream.games), ("set", stream.sets),
+                                                      ("match", stream.matches)) if boundaries)
+        return stream.applied
+
+    def publish(self, events):
+        score = self.game.get_full_score()
+        score["version"] = self.version
+        score["events"] = list(events)
+        self.broadcast.publish([("score", score)])
+
+    @property
+    def payload(self):
+        if self._payload is None:
+            game = self.game
+            winner = None
+            if game.game_over:
+                winner = game.player1_name if game.player1_sets > game.player2_sets else game.player2_name
+            self._payload = json.dumps({
+                "id": self.id,
+                "version": self.version,
+                "format": self.format,
+                "players": [game.player1_name, game.player2_name],
+                "points": [game.player1_points, game.player2_points],
+                "games": [game.player1_games, game.player2_games],
+                "sets": [game.player1_sets, game.player2_sets],
+                "display": game.get_score_display(),
+                "server": game.server,
+                "tiebreak": game.in_tiebreak,
+                "points_played": game.points_played,
+                "game_over": game.game_over,
+                "winner": winner,
+            }, separators=(",", ":")).encode()
+        return self._payload
+
+
+class MatchShard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.matches = {}
+
+
+class MatchStore:
+    """Live matches in memory, sharded by id.
+
+    A request only takes the lock of the shard its match lives in, so
+    threaded workers scoring different matches rarely wait on each other.
+    Every method returns the match's payload bytes.
+    """
+
+    def __init__(self, shard_count=SHARD_COUNT):
+        self.shards = [MatchShard() for _ in range(shard_count)]
+
+    def _shard(self, match_id):
+        return self.shards[hash(match_id) % len(self.shards)]
+
+    def create(self, player1=None, player2=None, match_format=None):
+        match_format = match_format or DEFAULT_FORMAT
+        if not isinstance(match_format, str) or match_format not in FORMATS:
+            raise MatchError(f"unknown match format: {match_format}")
+        names = []
+        for name, default in ((player1, "Player 1"), (player2, "Player 2")):
+            if name is None:
+                name = default
+            if not isinstance(name, str) or not 0 < len(name) <= MAX_NAME_LENGTH:
+                raise MatchError(f"player names must be 1 to {MAX_NAME_LENGTH} characters")
+            names.append(name)
+        match = Match(secrets.token_urlsafe(8), names[0], names[1], match_format)
+        shard = self._shard(match.id)
+        with shard.lock:
+            shard.matches[match.id] = match
+            return match.payload
+
+    def payload(self, match_id):
+        shard = self._shard(match_id)
+        with shard.lock:
+            return self._get(shard, match_id).payload
+
+    def broadcast(self, match_id):
+        shard = self._shard(match_id)
+        with shard.lock:
+            return self._get(shard, match_id).broadcast
+
+    def add_points(self, match_id, points):
+        if isinstance(points, int):
+            points = (points,)
+        if not isinstance(points, (list, tuple)) or not all(type(point) is int for point in points):
+            raise MatchError("points must be a list of 1s and 2s")
+        if len(points) > MAX_BATCH_POINTS:
+            raise MatchError(f"at most {MAX_BATCH_POINTS} points per request", 413)
+        shard = self._shard(match_id)
+        with shard.lock:
+            match = self._get(shard, match_id)
+            try:
+                match.add_points(points)
+            except (ValueError, OverflowError):
+                raise MatchError("points must be a list of 1s and 2s") from None
+            return match.payload
+
+    def remove(self, match_id):
+        shard = self._shard(match_id)
+        with shard.lock:
+            match = shard.matches.pop(match_id, None)
+        if match is None:
+            raise MatchError("no such match", 404)
+        match.broadcast.close()
+
+    def _get(self, shard, match_id):
+        match = shard.matches.get(match_id)
+        if match is None:
+            raise MatchError("no such match", 404)
+        return match
+
+    def __len__(self):
+        return sum(len(shard.matches) for shard in self.shards)
@@ -0,0 +1,159 @@
+"""
+Renderer backends for ``ActionTennisGame``.
+
+A renderer is built as ``renderer(canvas, view)`` and draws from engine
+state and events only; the engine never draws. Every backend has:
+
+    draw(state)                  one frame of paddles, ball, trail,
+                                 particles and charge bars
+    show() / hide()              the game objects
+    smash(player, power, x, y)   the smash message
+    game_over(winner)            the game over message
+    clear()                      removes the messages
+    profiler                     a ``FrameProfiler`` or None
+
+``CanvasRenderer`` draws on a Tk canvas, ``NullRenderer`` does nothing
+(headless runs and servers) and ``RecordingRenderer`` keeps what each
+frame would draw, so draw output can be counted and checked without a
+display. ``RecordingCanvas`` stands in for the Tk canvas itself.
+"""
+
+from collections import Counter, deque
+
+from canvas_renderer import CanvasRenderer, scene_items
+
+# Shape commands; the rest (messages, show, hide, clear) are not counted
+# as drawing
+SHAPES = ("player_paddle", "cpu_paddle", "trail", "particle", "ball", "bar_back", "bar_fill")
+
+
+class NullRenderer:
+    """Draws nothing; ``canvas`` and ``view`` may be None."""
+
+    def __init__(self, canvas=None, view=None):
+        self.profiler = None
+
+    def draw(self, s):
+        pass
+
+    def show(self):
+        pass
+
+    def hide(self):
+        pass
+
+    def smash(self, player, power, x, y):
+        pass
+
+    def game_over(self, winner):
+        pass
+
+    def clear(self):
+        pass
+
+
+class RecordingRenderer(NullRenderer):
+    """Keeps the commands of the last ``keep`` frames (all when None).
+
+    Each ``draw`` closes a frame: a list of tuples holding any messages
+    since the previous frame, such as ``("smash", player, power, x, y)``,
+    then the shapes of ``scene_items(state)``, the same ones
+    ``CanvasRenderer`` places on its canvas.
+    """
+
+    def __init__(self, canvas=None, view=None, keep=None):
+        super().__init__(canvas, view)
+        self.frames = deque(maxlen=keep)
+        self.pending = []
+
+    def draw(self, s):
+        self.pending.extend(scene_items(s))
+        self.frames.append(self.pending)
+        self.pending = []
+
+    def show(self):
+        self.pending.append(("show",))
+
+    def hide(self):
+        self.pending.append(("hide",))
+
+    def smash(self, player, power, x, y):
+        self.pending.append(("smash", player, power, x, y))
+
+    def game_over(self, winner):
+        self.pending.append(("game_over", winner))
+
+    def clear(self):
+        self.pending.append(("clear",))
+
+    def counts(self, frame=-1):
+        """Commands of one frame (the latest by default) by kind."""
+        return Counter(command[0] for command in self.frames[frame])
+
+    def shapes(self, frame=-1):
+        return sum(1 for command in self.frames[frame] if command[0] in SHAPES)
+
+
+class RecordingCanvas:
+    """Stand-in for ``tk.Canvas`` that records instead of drawing.
+
+    ``calls`` counts every call by method name and ``find_all`` lists the
+    items created and not yet deleted, so draw costs can be measured and
+    checked without a display.
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.items = {}  # item id -> (kind, tags)
+        self.next_item = 1
+
+    def _create(self, kind, options):
+        self.calls[f"create_{kind}"] += 1
+        item = self.next_item
+        self.next_item += 1
+        tags = options.get("tags", ())
+        self.items[item] = (kind, (tags,) if isinstance(tags, str) else tuple(tags))
+        return item
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", options)
+
+    def create_oval(self, *coords, **options):
+        return self._create("oval", options)
+
+    def create_line(self, *coords, **options):
+        return self._create("line", options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", options)
+
+    def coords(self, item, *coords):
+        self.calls["coords"] += 1
+
+    def itemconfig(self, item, **options):
+        self.calls["itemconfig"] += 1
+
+    def delete(self, *targets):
+        self.calls["delete"] += 1
+        for target in targets:
+            for item, (_, tags) in list(self.items.items()):
+                if target == "all" or target == item or target in tags:
+                    del self.items[item]
+
+    def after(self, ms, callback=None):
+        # Scheduled callbacks never run; there is no event loop
+        self.calls["after"] += 1
+
+    def find_all(self):
+        return tuple(self.items)
+
+    def total(self):
+        return sum(self.calls.values())
+
+
+RENDERERS = {
+    "canvas": CanvasRenderer,
+    "null": NullRenderer,
+    "recording": RecordingRenderer,
+}
+
@@ -0,0 +1,309 @@
+"""
+Deterministic match recordings.
+
+A replay file is a ``HEADER`` (ending with the CPU's ``Difficulty``)
+followed by an append-only stream of records. An input record is two bytes, ``(inputs, count)``: the input
+byte (player bitmask in the low nibble, CPU bitmask in the high nibble)
+held for ``count`` ticks. A record with ``count == 0`` is a keyframe
+marker followed by a length-prefixed ``KEYFRAME``: the whole game state
+as exact doubles plus the 8-byte ``MatchRandom`` state. Re-simulating
+from a keyframe with the recorded inputs reproduces the match exactly.
+
+Usage: python replay.py FILE ...   (prints a summary of each recording)
+"""
+
+import hashlib
+import mmap
+import os
+import random
+import struct
+import sys
+from bisect import bisect_right
+
+from tennis_engine import Difficulty, GameState, TennisEngine, FLOAT_FIELDS, INT_FIELDS
+
+MAGIC = b"ATRP"
+FORMAT_VERSION = 2
+# Ticks between keyframes (10 seconds at 60 Hz)
+KEYFRAME_INTERVAL = 600
+
+# Header flags
+CPU_MANUAL = 1  # the right paddle was driven by recorded inputs, not the CPU AI
+
+# magic, version, flags, tick rate, keyframe interval, difficulty
+HEADER = struct.Struct("<4sBBHI" + "d" * len(Difficulty._fields))
+VERSION = struct.Struct("<4sB")
+RUN = struct.Struct("<BB")
+LENGTH = struct.Struct("<H")
+MAX_RUN = 0xFF
+
+KEYFRAME = struct.Struct("<IQ" + "d" * len(FLOAT_FIELDS) + "I" * len(INT_FIELDS) + "BB")
+COUNT = struct.Struct("<B")
+TRAIL_POINT = struct.Struct("<dd")
+PARTICLE = struct.Struct("<dddB")
+
+WINNER_CODES = {None: 0, "Player": 1, "CPU": 2}
+WINNER_NAMES = {code: name for name, code in WINNER_CODES.items()}
+
+MASK64 = (1 << 64) - 1
+
+
+class ReplayError(ValueError):
+    pass
+
+
+class MatchRandom(random.Random):
+    """``random.Random`` driven by SplitMix64.
+
+    The whole generator state is one 64-bit integer, so a keyframe can
+    store it in 8 bytes instead of the Mersenne Twister's 2.5 KB.
+    """
+
+    def seed(self, a=None, version=2):
+        if a is None:
+            a = int.from_bytes(os.urandom(8), "little")
+        elif not isinstance(a, int):
+            a = int.from_bytes(hashlib.sha256(str(a).encode()).digest()[:8], "little")
+        self._state = a & MASK64
+        self.gauss_next = None
+
+    def getstate(self):
+        return self._state
+
+    def setstate(self, state):
+        self._state = state & MASK64
+        self.gauss_next = None
+
+    def _next(self):
+        self._state = z = (self._state + 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def random(self):
+        return (self._next() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k):
+        if k <= 64:
+            return self._next() >> (64 - k)
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self._next() << shift
+        return bits & ((1 << k) - 1)
+
+
+def pack_keyframe(engine):
+    s = engine.state
+    parts = [KEYFRAME.pack(s.tick, engine.rng.getstate(),
+                           *(getattr(s, name) for name in FLOAT_FIELDS),
+                           *(getattr(s, name) for name in INT_FIELDS),
+                           s.game_over, WINNER_CODES[s.winner])]
+    parts.append(COUNT.pack(len(s.ball_trail)))
+    parts.extend(TRAIL_POINT.pack(x, y) for x, y in s.ball_trail)
+    parts.append(COUNT.pack(len(s.smash_effects)))
+    parts.extend(PARTICLE.pack(*particle) for particle in s.smash_effects)
+    return b"".join(parts)
+
+
+def unpack_keyframe(data, offset=0):
+    """Returns ``(state, rng_state)`` from a keyframe at ``offset`` of ``data``."""
+    values = KEYFRAME.unpack_from(data, offset)
+    offset += KEYFRAME.size
+    state = GameState()
+    state.tick, rng_state = values[0], values[1]
+    fields = values[2:]
+    for name, value in zip(FLOAT_FIELDS + INT_FIELDS, fields):
+        setattr(state, name, value)
+    state.game_over = bool(fields[-2])
+    state.winner = WINNER_NAMES[fields[-1]]
+
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for i in range(count):
+        state.ball_trail.append(*TRAIL_POINT.unpack_from(data, offset + TRAIL_POINT.size * i))
+    offset += TRAIL_POINT.size * count
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for i in range(count):
+        state.smash_effects.add(*PARTICLE.unpack_from(data, offset + PARTICLE.size * i))
+    return state, rng_state
+
+
+class ReplayWriter:
+    """Records a match played through ``step`` into an append-only file.
+
+    ``engine`` must use a ``MatchRandom`` and is keyframed as it is when
+    the writer is created.
+    """
+
+    def __init__(self, path, engine, cpu_manual=False, keyframe_interval=KEYFRAME_INTERVAL):
+        if not isinstance(engine.rng, MatchRandom):
+            raise ReplayError("recorded engines need a MatchRandom rng")
+        self.engine = engine
+        self.cpu_manual = cpu_manual
+        self.keyframe_interval = keyframe_interval
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, CPU_MANUAL if cpu_manual else 0,
+                                    engine.tick_rate, keyframe_interval, *engine.difficulty))
+        self.run_value = None
+        self.run_length = 0
+        self.write_keyframe()
+
+    def step(self, inputs=0, cpu_inputs=None):
+        engine = self.engine
+        if engine.state.game_over:
+            return []
+        if engine.state.tick % self.keyframe_interval == 0 and engine.state.tick:
+            self.write_keyframe()
+        value = inputs & 0xF
+        if self.cpu_manual:
+            value |= ((cpu_inputs or 0) & 0xF) << 4
+        if value != self.run_value or self.run_length == MAX_RUN:
+            self.flush_run()
+            self.run_value = value
+        self.run_length += 1
+        return engine.step(inputs, cpu_inputs if self.cpu_manual else None)
+
+    def flush_run(self):
+        if self.run_length:
+            self.file.write(RUN.pack(self.run_value, self.run_length))
+        self.run_length = 0
+
+    def write_keyframe(self):
+        self.flush_run()
+        keyframe = pack_keyframe(self.engine)
+        self.file.write(RUN.pack(0, 0) + LENGTH.pack(len(keyframe)) + keyframe)
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush_run()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayReader:
+    """Memory-maps a replay file and re-simulates any part of it.
+
+    ``keyframes`` lists ``(tick, offset)`` pairs; ``ticks`` is the last
+    recorded tick. A truncated tail (say, from a crash) is ignored.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Check the version first: older headers have a different size
+        if len(self.data) < VERSION.size:
+            raise ReplayError("not a replay file")
+        magic, version = VERSION.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ReplayError("not a replay file")
+        if version != FORMAT_VERSION:
+            raise ReplayError(f"unsupported replay version {version}")
+        if len(self.data) < HEADER.size:
+            raise ReplayError("not a replay file")
+        _, _, flags, self.tick_rate, self.keyframe_interval, *difficulty = HEADER.unpack_from(self.data, 0)
+        self.difficulty = Difficulty(*difficulty)
+        self.cpu_manual = bool(flags & CPU_MANUAL)
+        self.keyframes = []
+        self.ticks = 0
+        self._index()
+
+    def _index(self):
+        data = self.data
+        end = len(data)
+        offset = HEADER.size
+        tick = 0
+        while offset + RUN.size <= end:
+            _, count = RUN.unpack_from(data, offset)
+            if count:
+                tick += count
+                offset += RUN.size
+                continue
+            if offset + RUN.size + LENGTH.size > end:
+                break
+            length, = LENGTH.unpack_from(data, offset + RUN.size)
+            start = offset + RUN.size + LENGTH.size
+            if start + length > end:
+                break
+            tick, = struct.unpack_from("<I", data, start)
+            self.keyframes.append((tick, start))
+            offset = start + length
+        if not self.keyframes:
+            raise ReplayError("replay has no keyframes")
+        self.end = offset
+        self.ticks = tick
+
+    def inputs(self, offset):
+        # Yields the per-tick (inputs, cpu_inputs) recorded after ``offset``,
+        # stepping over keyframes
+        data = self.data
+        end = self.end
+        while offset < end:
+            value, count = RUN.unpack_from(data, offset)
+            offset += RUN.size
+            if not count:
+                length, = LENGTH.unpack_from(data, offset)
+                offset += LENGTH.size + length
+                continue
+            pair = (value & 0xF, value >> 4)
+            for _ in range(count):
+                yield pair
+
+    def engine_at(self, tick=0):
+        """Returns ``(engine, inputs)`` with the engine at ``tick`` and an
+        iterator over the inputs that follow it."""
+        first = self.keyframes[0][0]
+        if not first <= tick <= self.ticks:
+            raise ReplayError(f"tick {tick} is outside {first}..{self.ticks}")
+        index = bisect_right(self.keyframes, (tick, len(self.data))) - 1
+        keyframe_tick, offset = self.keyframes[index]
+        engine = TennisEngine(tick_rate=self.tick_rate, rng=MatchRandom(0), difficulty=self.difficulty)
+        engine.state, rng_state = unpack_keyframe(self.data, offset)
+        engine.rng.setstate(rng_state)
+        length, = LENGTH.unpack_from(self.data, offset - LENGTH.size)
+        inputs = self.inputs(offset + length)
+        for _ in range(tick - keyframe_tick):
+            self._step(engine, next(inputs))
+        return engine, inputs
+
+    def state_at(self, tick):
+        return self.engine_at(tick)[0].state
+
+    def play(self, start=0):
+        """Yields ``(tick, events)`` for every tick from ``start`` to the end."""
+        engine, inputs = self.engine_at(start)
+        for pair in inputs:
+            events = self._step(engine, pair)
+            yield engine.state.tick, events
+
+    def _step(self, engine, pair):
+        inputs, cpu_inputs = pair
+        return engine.step(inputs, cpu_inputs if self.cpu_manual else None)
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    for path in (argv if argv is not None else sys.argv[1:]):
+        with ReplayReader(path) as reader:
+            engine, _ = reader.engine_at(reader.ticks)
+            s = engine.state
+            print(f"{path}: {reader.ticks} ticks, {len(reader.data)} bytes, "
+                  f"Player {s.player_score} - CPU {s.cpu_score}, winner {s.winner}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Batched room ticking on one asyncio loop.
+
+``RoomScheduler`` hosts headless matches: physics, inputs, scores and
+events, stepped in ``BatchEngine`` groups. It is not what serves the
+Flask app's rooms. Those stay on ``rooms.RoomManager``, because each
+room there also keeps a tick count, smash particles and a trail for
+snapshots and spectators, which a batch row does not have.
+``bench_scheduler`` measures it at 5,000 rooms.
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+from batch_engine import BatchEngine, AI_CONTROLLED, NOBODY, PLAYER, CPU, np
+from tennis_engine import DEFAULT_TICK_RATE
+
+# Rooms stepped together by one BatchEngine call
+DEFAULT_GROUP_SIZE = 1024
+# Lag samples kept for lag_stats
+LAG_HISTORY = 4096
+
+SIDE_NAMES = {PLAYER: "Player", CPU: "CPU"}
+
+
+class ScheduledRoom:
+    """Handle for one match living in a slot of a ``TickGroup``."""
+
+    def __init__(self, room_id, group, slot, mode):
+        self.id = room_id
+        self.group = group
+        self.slot = slot
+        self.mode = mode
+
+    @property
+    def paused(self):
+        return bool(self.group.batch.paused[self.slot])
+
+    @property
+    def game_over(self):
+        return bool(self.group.batch.game_over[self.slot])
+
+    @property
+    def lag(self):
+        # Seconds between this room's last deadline and the tick that
+        # stepped it; paused and finished rooms keep their last value
+        return float(self.group.lag[self.slot])
+
+    @property
+    def max_lag(self):
+        return float(self.group.max_lag[self.slot])
+
+    def set_inputs(self, inputs, cpu_inputs=None):
+        with self.group.lock:
+            self.group.inputs[self.slot] = int(inputs) & 0xF
+            if self.mode == "pvp" and cpu_inputs is not None:
+                self.group.cpu_inputs[self.slot] = int(cpu_inputs) & 0xF
+
+    def state(self):
+        with self.group.lock:
+            return self.group.batch.get_row(self.slot)
+
+
+class TickGroup:
+    """Up to ``size`` rooms that share one deadline and one ``BatchEngine``.
+
+    Free slots are parked as finished matches so they never move.
+    ``lag`` and ``max_lag`` hold each slot's tick lag. ``lock`` is the
+    scheduler's and guards every array of the group.
+    """
+
+    def __init__(self, size, seed, tick_rate, lock):
+        self.lock = lock
+        self.batch = BatchEngine(size, seed=seed, tick_rate=tick_rate)
+        self.batch.game_over[:] = True
+        self.inputs = np.zeros(size, dtype=np.int64)
+        self.cpu_inputs = np.full(size, AI_CONTROLLED, dtype=np.int64)
+        self.rooms = [None] * size
+        self.free = list(range(size - 1, -1, -1))
+        self.deadline = 0.0
+        self.scheduled = False
+        self.lag = np.zeros(size)
+        self.max_lag = np.zeros(size)
+        self.ticks = 0
+
+    @property
+    def live(self):
+        batch = self.batch
+        return not (batch.game_over | batch.paused).all()
+
+    def mask(self, slot):
+        mask = np.zeros(self.batch.n, dtype=bool)
+        mask[slot] = True
+        return mask
+
+
+class RoomScheduler:
+    """Ticks thousands of headless rooms from a single asyncio loop.
+
+    Rooms are packed into ``TickGroup``s; a heap keyed on each group's
+    next deadline decides what is due, and every due group advances its
+    live rooms with one vectorised ``BatchEngine.step``. Paused and
+    finished rooms are left out of that step, and a group with no live
+    rooms drops out of the heap, so it costs nothing until
+    ``set_paused``, ``reset`` or ``add_room`` wakes it. ``lag_stats``
+    covers every group tick; each room handle has its own ``lag`` and
+    ``max_lag``.
+
+    ``on_event(room, event)`` gets ``("point", scorer)``,
+    ``("smash", player)`` and ``("game_over", winner)`` tuples, only for
+    rooms where something happened, on the loop and under ``lock``.
+
+    ``add_room``, ``remove_room``, ``set_paused``, ``reset`` and the room
+    handles' ``set_inputs`` and ``state`` may be called from other
+    threads: they hold ``lock``, which the loop also holds while it steps
+    a group, so a room never changes halfway through a tick.
+    """
+
+    def __init__(self, tick_rate=DEFAULT_TICK_RATE, group_size=DEFAULT_GROUP_SIZE, seed=None,
+                 on_event=None):
+        if np is None:
+            raise ImportError("RoomScheduler requires numpy")
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.group_size = group_size
+        self.seed = seed
+        self.on_event = on_event
+        # Reentrant so on_event handlers can call back into the scheduler
+        self.lock = threading.RLock()
+        self.groups = []
+        self.rooms = {}
+        self.heap = []
+        self.sequence = itertools.count()
+        self.ticks = 0
+        self.missed_deadlines = 0
+        self.lags = deque(maxlen=LAG_HISTORY)
+        self.loop = None
+        self.running = False
+        self._wakeup = None
+
+    def add_room(self, room_id, mode="cpu"):
+        if mode not in ("cpu", "pvp"):
+            raise ValueError(f"unknown mode: {mode}")
+        with self.lock:
+            group = next((group for group in self.groups if group.free), None)
+            if group is None:
+                seed = None if self.seed is None else self.seed + len(self.groups)
+                group = TickGroup(self.group_size, seed, self.tick_rate, self.lock)
+                self.groups.append(group)
+            slot = group.free.pop()
+            room = ScheduledRoom(room_id, group, slot, mode)
+            group.rooms[slot] = room
+            group.inputs[slot] = 0
+            group.cpu_inputs[slot] = AI_CONTROLLED if mode == "cpu" else 0
+            group.batch.paused[slot] = False
+            group.lag[slot] = group.max_lag[slot] = 0.0
+            group.batch.reset(group.mask(slot))
+            self.rooms[room_id] = room
+        self._wake(group)
+        return room
+
+    def remove_room(self, room_id):
+        with self.lock:
+            room = self.rooms.pop(room_id)
+            group = room.group
+            group.rooms[room.slot] = None
+            group.batch.game_over[room.slot] = True
+            group.free.append(room.slot)
+
+    def set_paused(self, room_id, paused):
+        with self.lock:
+            room = self.rooms[room_id]
+            room.group.batch.paused[room.slot] = bool(paused)
+        if not paused:
+            self._wake(room.group)
+
+    def reset(self, room_id):
+        with self.lock:
+            room = self.rooms[room_id]
+            room.group.batch.reset(room.group.mask(room.slot))
+        self._wake(room.group)
+
+    def _wake(self, group):
+        if self.loop is None:
+            self._activate(group)
+        else:
+            self.loop.call_soon_threadsafe(self._activate, group)
+
+    def _activate(self, group):
+        if not group.scheduled:
+            group.scheduled = True
+            group.deadline = time.monotonic()
+            heapq.heappush(self.heap, (group.deadline, next(self.sequence), group))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def tick_due(self, now=None):
+        # Step every group whose deadline has passed; returns how many
+        if now is None:
+            now = time.monotonic()
+        heap = self.heap
+        stepped = 0
+        while heap and heap[0][0] <= now:
+            deadline, _, group = heapq.heappop(heap)
+            lag = time.monotonic() - deadline
+            self.lags.append(lag)
+            with self.lock:
+                self.step_group(group, lag)
+                live = group.live
+            stepped += 1
+
+            if not live:
+                group.scheduled = False
+                continue
+            group.deadline = deadline + self.dt
+            if now - group.deadline > self.dt:
+                self.missed_deadlines += 1
+                group.deadline = now
+            heapq.heappush(heap, (group.deadline, next(self.sequence), group))
+        return stepped
+
+    def step_group(self, group, lag=0.0):
+        batch = group.batch
+        was_over = batch.game_over.copy()
+        # Only the rooms this tick steps record its lag
+        stepped = ~(was_over | batch.paused)
+        group.lag[stepped] = lag
+        np.maximum(group.max_lag, group.lag, out=group.max_lag)
+        scored, smashed = batch.step(group.inputs, group.cpu_inputs)
+        group.ticks += 1
+        self.ticks += 1
+        if self.on_event is None:
+            return
+        for slot in np.flatnonzero((scored != NOBODY) | (smashed != NOBODY)):
+            room = group.rooms[slot]
+            if smashed[slot] != NOBODY:
+                self.on_event(room, ("smash", SIDE_NAMES[int(smashed[slot])]))
+            if scored[slot] != NOBODY:
+                self.on_event(room, ("point", SIDE_NAMES[int(scored[slot])]))
+                if batch.game_over[slot] and not was_over[slot]:
+                    self.on_event(room, ("game_over", SIDE_NAMES[int(batch.winner[slot])]))
+
+    def lag_stats(self):
+        lags = sorted(self.lags)
+        if not lags:
+            return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+        return {"p50": lags[len(lags) // 2], "p99": lags[int(len(lags) * 0.99)], "max": lags[-1]}
+
+    def stop(self):
+        self.running = False
+        if self._wakeup is not None:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self, duration=None):
+        self.loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.running = True
+        # Groups queued before the loop started begin ticking now
+        now = time.monotonic()
+        self.heap = [(max(deadline, now), seq, group) for deadline, seq, group in self.heap]
+        heapq.heapify(self.heap)
+        end = None if duration is None else time.monotonic() + duration
+        try:
+            while self.running:
+                now = time.monotonic()
+                if end is not None and now >= end:
+                    break
+                self.tick_due(now)
+                now = time.monotonic()
+                # Sleep until the next deadline; with nothing scheduled,
+                # wait for a room to be added or resumed
+                timeout = self.heap[0][0] - now if self.heap else None
+                if end is not None:
+                    timeout = end - now if timeout is None else min(timeout, end - now)
+                if timeout is not None and timeout <= 0:
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+            self.loop = None
+            self._wakeup = None
@@ -0,0 +1,249 @@
+import json
+import secrets
+import threading
+import time
+
+from broadcast import Broadcast
+from errors import ApiError
+from snapshot import SnapshotEncoder
+from tennis_engine import TennisEngine, DEFAULT_TICK_RATE
+
+ROOM_IDLE_TIMEOUT = 300  # seconds without input or polling before a room is closed
+LONG_POLL_TIMEOUT = 25
+INPUT_MASK = 0xF  # UP | DOWN | LEFT | RIGHT
+
+
+class RoomError(ApiError):
+    pass
+
+
+def state_payload(state):
+    return {
+        "tick": state.tick,
+        "player": {"x": state.player_x, "y": state.player_y,
+                   "charge": state.player_charge_time, "smashes": state.player_smash_count,
+                   "score": state.player_score},
+        "cpu": {"x": state.cpu_x, "y": state.cpu_y,
+                "charge": state.cpu_charge_time, "smashes": state.cpu_smash_count,
+                "score": state.cpu_score},
+        "ball": {"x": state.ball_x, "y": state.ball_y, "dx": state.ball_dx, "dy": state.ball_dy,
+                 "multiplier": state.ball_speed_multiplier},
+        "game_over": state.game_over,
+        "winner": state.winner,
+    }
+
+
+class Room:
+    """One authoritative match.
+
+    The left paddle is always a human. In ``"cpu"`` mode the engine's CPU
+    plays the right paddle; in ``"pvp"`` mode a second human joins and
+    drives it. The room only ticks while every seat is taken and it is
+    not paused or finished.
+    """
+
+    def __init__(self, room_id, mode="cpu", tick_rate=DEFAULT_TICK_RATE, seed=None):
+        if mode not in ("cpu", "pvp"):
+            raise RoomError(f"unknown mode: {mode}")
+        self.id = room_id
+        self.mode = mode
+        self.engine = TennisEngine(seed=seed, tick_rate=tick_rate)
+        self.seats = {"left": secrets.token_urlsafe(12)}
+        self.inputs = {"left": 0, "right": 0}
+        self.paused = False
+        self.closed = False
+        self.events = []
+        self.version = 0
+        self.last_activity = time.monotonic()
+        self.changed = threading.Condition()
+        self._payload = None
+        self._payload_version = -1
+        self.snapshots = SnapshotEncoder()
+        # Point, smash and game-over events for SSE spectators
+        self.broadcast = Broadcast()
+        self.broadcast.publish([("score", self.score())])
+
+    @property
+    def ready(self):
+        return self.mode == "cpu" or "right" in self.seats
+
+    @property
+    def active(self):
+        return self.ready and not self.paused and not self.engine.state.game_over
+
+    @property
+    def finished(self):
+        # Nothing after this will change the room
+        return self.closed or self.engine.state.game_over
+
+    def join(self):
+        with self.changed:
+            if self.ready:
+                raise RoomError("room is full", 409)
+            self.seats["right"] = secrets.token_urlsafe(12)
+            self.last_activity = time.monotonic()
+            return self.seats["right"]
+
+    def side_of(self, token):
+        if not isinstance(token, str):
+            raise RoomError("player must be a token string")
+        # Compared as bytes: compare_digest rejects non-ASCII strings
+        token = token.encode()
+        for side, seat_token in self.seats.items():
+            if secrets.compare_digest(seat_token.encode(), token):
+                return side
+        raise RoomError("not a player in this room", 403)
+
+    def set_inputs(self, token, inputs):
+        side = self.side_of(token)
+        if type(inputs) is not int or not 0 <= inputs <= INPUT_MASK:
+            raise RoomError(f"inputs must be an integer from 0 to {INPUT_MASK}")
+        with self.changed:
+            self.inputs[side] = inputs
+            self.last_activity = time.monotonic()
+
+    def set_paused(self, token, paused):
+        self.side_of(token)
+        with self.changed:
+            self.paused = bool(paused)
+            self.last_activity = time.monotonic()
+
+    def tick(self):
+        with self.changed:
+            cpu_inputs = self.inputs["right"] if self.mode == "pvp" else None
+            events = self.engine.step(self.inputs["left"], cpu_inputs)
+            if events:
+                # Keep the latest events, stamped with their tick, so slow
+                # pollers can still see them
+                tick = self.engine.state.tick
+                self.events.extend((tick,) + event for event in events)
+                del self.events[:-32]
+                self.broadcast.publish([self.event_message(event) for event in events])
+            self.version += 1
+            self.changed.notify_all()
+
+    def score(self):
+        state = self.engine.state
+        return {"tick": state.tick, "player": state.player_score, "cpu": state.cpu_score,
+                "game_over": state.game_over, "winner": state.winner}
+
+    def event_message(self, event):
+        # An engine event as an SSE (name, data) pair. Every frame carries
+        # the whole score, so a spectator that skips frames stays current.
+        name = event[0]
+        data = self.score()
+        if name == "smash":
+            _, player, power, x, y = event
+            # "player" is already the left paddle's score
+            data.update(smasher=player, power=power, x=x, y=y)
+        else:
+            data["scorer" if name == "point" else "winner"] = event[1]
+        return name, data
+
+    def payload(self):
+        # Serialised at most once per tick however many clients ask for it.
+        # Returns (version, json text).
+        with self.changed:
+            if self._payload_version != self.version:
+                body = state_payload(self.engine.state)
+                body["version"] = self.version
+                body["paused"] = self.paused
+                body["ready"] = self.ready
+                body["events"] = [list(event) for event in self.events]
+                self._payload = json.dumps(body)
+                self._payload_version = self.version
+            return self._payload_version, self._payload
+
+    def snapshot(self, ack=None):
+        # Binary form of the state as a delta against the client's last
+        # acknowledged tick. Returns (version, bytes).
+        with self.changed:
+            self.snapshots.update(self.engine.state)
+            return self.version, self.snapshots.encode(ack)
+
+    def wait_for_version(self, since, timeout=LONG_POLL_TIMEOUT, keep_alive=True):
+        # Block until there is a version newer than ``since`` or the room
+        # is closed; False on timeout. Waits with ``keep_alive`` count as
+        # activity for ROOM_IDLE_TIMEOUT.
+        with self.changed:
+            if keep_alive:
+                self.last_activity = time.monotonic()
+            return self.changed.wait_for(lambda: self.version > since or self.closed, timeout)
+
+    def close(self):
+        # Wakes every waiting client so it can see the room is gone
+        with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+        self.broadcast.close()
+
+    def wait(self, since, timeout=LONG_POLL_TIMEOUT):
+        # Long-poll for the JSON payload
+        self.wait_for_version(since, timeout)
+        return self.payload()
+
+
+class RoomManager:
+    """Owns every room in this worker and ticks them from one thread."""
+
+    def __init__(self, tick_rate=DEFAULT_TICK_RATE):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.rooms = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.ticks = 0
+        self.missed_deadlines = 0
+        self.last_tick_duration = 0.0
+
+    def create(self, mode="cpu", seed=None):
+        room = Room(secrets.token_urlsafe(8), mode, self.tick_rate, seed)
+        with self.lock:
+            self.rooms[room.id] = room
+        self.start()
+        return room
+
+    def get(self, room_id):
+        room = self.rooms.get(room_id)
+        if room is None:
+            raise RoomError("no such room", 404)
+        return room
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="room-ticker", daemon=True)
+                self.thread.start()
+
+    def tick(self):
+        start = time.perf_counter()
+        now = time.monotonic()
+        expired = []
+        for room in list(self.rooms.values()):
+            if now - room.last_activity > ROOM_IDLE_TIMEOUT:
+                expired.append(room.id)
+            elif room.active:
+                room.tick()
+        if expired:
+            with self.lock:
+                for room_id in expired:
+                    room = self.rooms.pop(room_id, None)
+                    if room is not None:
+                        room.close()
+        self.ticks += 1
+        self.last_tick_duration = time.perf_counter() - start
+        return self.last_tick_duration
+
+    def run(self):
+        # Fixed-rate loop; a tick that starts more than one period late
+        # counts as a missed deadline and the schedule is re-anchored
+        next_deadline = time.perf_counter()
+        while True:
+            self.tick()
+            next_deadline += self.dt
+            delay = next_deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif -delay > self.dt:
+                self.missed_deadlines += 1
+                next_deadline = time.perf_counter()
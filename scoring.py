@@ -0,0 +1,196 @@
+"""
+Table-driven tennis scoring.
+
+``compile_format`` enumerates every score a ``MatchFormat`` can reach,
+numbers them, and builds flat transition tables, so scoring a point is
+one array lookup: ``table.next[2 * state + winner - 1]`` with ``winner``
+1 or 2, plus ``table.events`` at the same index for what the point
+finished. A live match is then just its state id (4 bytes in an
+``array('I')``).
+
+States are ``(points1, points2, games1, games2, sets1, sets2, server)``
+where ``server`` is the player serving the current game (in a tiebreak,
+the one who served its first point). Deuce is stored as 3-3 with
+advantage as 4-3/3-4, and scores that could otherwise grow forever
+(advantage sets, long tiebreaks) step back by 2 past a cap, which keeps
+the table finite without changing who wins or who serves.
+"""
+
+from array import array
+from collections import deque, namedtuple
+
+MatchFormat = namedtuple("MatchFormat", [
+    "sets_to_win",            # 2 for best of 3, 3 for best of 5
+    "games_per_set",
+    "tiebreak_at",            # games all at which a tiebreak is played, or None for advantage sets
+    "tiebreak_points",
+    "no_ad",                  # the point at deuce wins the game
+    "match_tiebreak_points",  # a tiebreak to this many replaces the deciding set, or None
+], defaults=(2, 6, 6, 7, False, None))
+
+FORMATS = {
+    "classic": MatchFormat(tiebreak_at=None),  # the original TennisGame rules
+    "best-of-3": MatchFormat(),
+    "best-of-5": MatchFormat(sets_to_win=3),
+    "no-ad": MatchFormat(no_ad=True),
+    "match-tiebreak": MatchFormat(no_ad=True, match_tiebreak_points=10),
+}
+DEFAULT_FORMAT = "classic"
+
+# Event flags for a transition
+GAME = 1
+SET = 2
+MATCH = 4
+
+# Past these, advantage-set games and tiebreak points step back by 2
+GAME_CAP = 99
+TIEBREAK_CAP = 30
+
+_compiled = {}
+
+
+def get_format(match_format):
+    if isinstance(match_format, MatchFormat):
+        return match_format
+    try:
+        return FORMATS[match_format]
+    except KeyError:
+        raise ValueError(f"unknown match format: {match_format}") from None
+
+
+def compile_format(match_format=DEFAULT_FORMAT):
+    """Returns the (cached) ``ScoringTable`` for a format or format name."""
+    match_format = get_format(match_format)
+    table = _compiled.get(match_format)
+    if table is None:
+        table = _compiled[match_format] = ScoringTable(match_format)
+    return table
+
+
+def in_match_tiebreak(fmt, sets1, sets2):
+    return fmt.match_tiebreak_points is not None and sets1 == sets2 == fmt.sets_to_win - 1
+
+
+def in_tiebreak(fmt, games1, games2, sets1, sets2):
+    """Returns the tiebreak target if the current game is a tiebreak, else 0."""
+    if in_match_tiebreak(fmt, sets1, sets2):
+        return fmt.match_tiebreak_points
+    if fmt.tiebreak_at is not None and games1 == games2 == fmt.tiebreak_at:
+        return fmt.tiebreak_points
+    return 0
+
+
+def tiebreak_server(starter, points1, points2):
+    # The starter serves one point, then the serve changes every two
+    return starter if (points1 + points2 + 1) // 2 % 2 == 0 else 3 - starter
+
+
+def transition(fmt, state, winner):
+    """The score after ``winner`` (1 or 2) takes a point, and its events."""
+    a, b, g1, g2, s1, s2, server = state
+    if max(s1, s2) >= fmt.sets_to_win:
+        return state, 0
+    tiebreak = in_tiebreak(fmt, g1, g2, s1, s2)
+    if winner == 1:
+        a += 1
+    else:
+        b += 1
+
+    if tiebreak:
+        won = max(a, b) >= tiebreak and abs(a - b) >= 2
+    else:
+        won = max(a, b) >= 4 and (abs(a - b) >= 2 or fmt.no_ad)
+    if not won:
+        if tiebreak:
+            while a >= TIEBREAK_CAP and b >= TIEBREAK_CAP:
+                a -= 2
+                b -= 2
+        elif a >= 3 and b >= 3:
+            a, b = 3 + max(a - b, 0), 3 + max(b - a, 0)
+        return (a, b, g1, g2, s1, s2, server), 0
+
+    events = GAME
+    server = 3 - server
+    if winner == 1:
+        g1 += 1
+    else:
+        g2 += 1
+    lead = abs(g1 - g2)
+    if tiebreak or (max(g1, g2) >= fmt.games_per_set and lead >= 2):
+        events |= SET
+        g1 = g2 = 0
+        if winner == 1:
+            s1 += 1
+        else:
+            s2 += 1
+        if max(s1, s2) >= fmt.sets_to_win:
+            events |= MATCH
+    else:
+        while g1 >= GAME_CAP and g2 >= GAME_CAP:
+            g1 -= 2
+            g2 -= 2
+    return (0, 0, g1, g2, s1, s2, server), events
+
+
+class ScoringTable:
+    """Every reachable score of one ``MatchFormat`` with its transitions.
+
+    ``next`` and ``events`` are ``array``s indexed by
+    ``2 * state + winner - 1``. ``points1`` ... ``server``,
+    ``tiebreak`` (the tiebreak target, or 0) and ``finished`` are
+    per-state ``array``s. ``initial(server)`` is the id of 0-0.
+    """
+
+    def __init__(self, match_format):
+        self.format = match_format
+        self.ids = {}
+        states = []
+        next_states = []
+        events = []
+        queue = deque()
+
+        def number(state):
+            state_id = self.ids.get(state)
+            if state_id is None:
+                state_id = self.ids[state] = len(states)
+                states.append(state)
+                queue.append(state)
+            return state_id
+
+        for server in (1, 2):
+            number((0, 0, 0, 0, 0, 0, server))
+        while queue:
+            state = queue.popleft()
+            for winner in (1, 2):
+                target, flags = transition(match_format, state, winner)
+                next_states.append(number(target))
+                events.append(flags)
+
+        self.size = len(states)
+        self.next = array("I", next_states)
+        self.events = array("B", events)
+        fields = list(zip(*states))
+        self.points1, self.points2, self.games1, self.games2, self.sets1, self.sets2, self.server = (
+            array("B", values) for values in fields)
+        self.tiebreak = array("B", (in_tiebreak(match_format, *state[2:6]) for state in states))
+        self.finished = array("B", (max(state[4], state[5]) >= match_format.sets_to_win
+                                    for state in states))
+
+    def initial(self, server=1):
+        return self.ids[(0, 0, 0, 0, 0, 0, server)]
+
+    def state_id(self, points1, points2, games1, games2, sets1, sets2, server=1):
+        try:
+            return self.ids[(points1, points2, games1, games2, sets1, sets2, server)]
+        except KeyError:
+            raise ValueError("score is not reachable in this format") from None
+
+    def score(self, state):
+        return (self.points1[state], self.points2[state], self.games1[state], self.games2[state],
+                self.sets1[state], self.sets2[state], self.server[state])
+
+    def point_server(self, state):
+        # Who serves the next point
+        if self.tiebreak[state]:
+            return tiebreak_server(self.server[state], self.points1[state], self.points2[state])
+        return self.server[state]
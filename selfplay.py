@@ -0,0 +1,330 @@
+"""
+Self-play tuning of the built-in CPU's ``Difficulty``.
+
+Each candidate plays the right paddle of a headless ``TennisEngine``
+against a ``Sparring`` partner on the left, which plays the way the
+built-in CPU does but through the player's input bitmask. Rallies are
+split into tasks of ``POINTS_PER_TASK`` points and spread over a
+``ProcessPoolExecutor``; every candidate of a generation plays the same
+seeds, so their results differ by skill rather than by luck.
+
+The search is a simple evolution strategy: the best ``elite`` candidates
+survive and the rest of the next generation are mutated copies of them.
+After every generation the whole run is written to ``checkpoint`` (JSON),
+and a run started with the same checkpoint carries on from there exactly
+as if it had never stopped.
+
+Usage: python selfplay.py [--generations N] [--population N] [--points N]
+                          [--workers N] [--checkpoint FILE] [--seed N]
+                          [--opponent NAME] [--target-win-rate X]
+"""
+
+import argparse
+import json
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from tennis_engine import (
+    TennisEngine, Difficulty, DIFFICULTIES, get_difficulty, intercept,
+    CANVAS_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, CPU_DEADZONE, DEFAULT_TICK_RATE,
+    UP, DOWN, LEFT, RIGHT,
+)
+
+CHECKPOINT_VERSION = 1
+POINTS_PER_TASK = 200
+# A rally still going after this many seconds is scored as a draw
+RALLY_TIME_LIMIT = 60
+# The sparring partner steps into the ball this long before it arrives
+SMASH_LEAD = 0.05
+
+# Search range of each ``Difficulty`` field and the mutation step as a
+# fraction of it
+BOUNDS = Difficulty(speed=(200.0, 600.0), reaction_time=(0.0, 0.5), aim_error=(0.0, 120.0),
+                    smash_chance=(0.0, 1.0))
+MUTATION_SCALE = 0.1
+
+Results = namedtuple("Results", [
+    "points",        # rallies that ended in a point
+    "cpu_points",    # of those, won by the candidate
+    "draws",         # rallies cut off at RALLY_TIME_LIMIT
+    "cpu_hits",
+    "cpu_smashes",
+    "shots",         # paddle hits by either side
+    "ticks",
+])
+
+
+def combine(results):
+    return Results(*(sum(values) for values in zip(*results)))
+
+
+def summary(results):
+    """Win rate, rally length (shots per rally) and smash rate."""
+    rallies = results.points + results.draws
+    return {
+        "win_rate": results.cpu_points / results.points if results.points else 0.5,
+        "rally_length": results.shots / rallies if rallies else 0.0,
+        "smash_rate": results.cpu_smashes / results.cpu_hits if results.cpu_hits else 0.0,
+    }
+
+
+class Sparring:
+    """Drives the left paddle through ``inputs(state)`` like the built-in
+    CPU drives the right one: it plans each shot when the ball turns
+    towards it, waits out its reaction time and steers to the intercept.
+    A planned smash steps forward into the ball. The player's paddle has
+    a fixed speed, so ``difficulty.speed`` is not used.
+    """
+
+    def __init__(self, difficulty, rng, tick_rate=DEFAULT_TICK_RATE):
+        self.difficulty = get_difficulty(difficulty)
+        self.rng = rng
+        self.dt = 1.0 / tick_rate
+        self.home_x = None
+        self.heading = None
+        self.points = None
+        self.target_y = CANVAS_HEIGHT / 2
+        self.reaction = 0.0
+        self.intercept_time = 0.0
+        self.smash = False
+
+    def plan(self, s):
+        difficulty = self.difficulty
+        self.reaction = difficulty.reaction_time
+        self.smash = False
+        if s.ball_dx >= 0:
+            self.target_y = CANVAS_HEIGHT / 2
+            self.intercept_time = 0.0
+            return
+        target_y, self.intercept_time = intercept(
+            s.ball_x, s.ball_y, s.ball_dx, s.ball_dy, s.ball_speed_multiplier, s.ball_smash_effect,
+            s.player_x + PADDLE_WIDTH + BALL_SIZE // 2)
+        self.target_y = target_y + difficulty.aim_error * s.ball_speed_multiplier * self.rng.uniform(-1, 1)
+        self.smash = self.rng.random() < difficulty.smash_chance
+
+    def inputs(self, s):
+        if self.home_x is None:
+            self.home_x = s.player_x
+        heading = s.ball_dx < 0
+        points = s.player_score + s.cpu_score
+        if heading != self.heading or points != self.points:
+            self.heading = heading
+            self.points = points
+            self.plan(s)
+        self.intercept_time -= self.dt
+        if self.reaction > 0:
+            self.reaction -= self.dt
+            return 0
+
+        mask = 0
+        offset = self.target_y - (s.player_y + PADDLE_HEIGHT // 2)
+        if offset > CPU_DEADZONE:
+            mask |= DOWN
+        elif offset < -CPU_DEADZONE:
+            mask |= UP
+        if self.smash and self.intercept_time <= SMASH_LEAD:
+            mask |= RIGHT
+        elif not heading and s.player_x > self.home_x:
+            mask |= LEFT
+        return mask
+
+
+def play(difficulty, opponent, seed, points=POINTS_PER_TASK, tick_rate=DEFAULT_TICK_RATE):
+    """Plays ``points`` rallies of ``difficulty`` against ``opponent``;
+    runs in a worker process and returns ``Results``."""
+    engine = TennisEngine(seed=f"{seed}-engine", tick_rate=tick_rate, difficulty=difficulty)
+    sparring = Sparring(opponent, random.Random(f"{seed}-sparring"), tick_rate)
+    limit = RALLY_TIME_LIMIT * tick_rate
+    won = draws = cpu_hits = cpu_smashes = shots = ticks = rally_ticks = 0
+    played = 0
+    while played + draws < points:
+        s = engine.state
+        heading = s.ball_dx > 0
+        events = engine.step(sparring.inputs(s))
+        ticks += 1
+        rally_ticks += 1
+        scored = False
+        for event in events:
+            if event[0] == "point":
+                scored = True
+                played += 1
+                won += event[1] == "CPU"
+            elif event[0] == "smash" and event[1] == "CPU":
+                cpu_smashes += 1
+        if scored:
+            rally_ticks = 0
+            if engine.state.game_over:
+                engine.reset()
+        elif (engine.state.ball_dx > 0) != heading:
+            shots += 1
+            cpu_hits += heading
+        elif rally_ticks >= limit:
+            draws += 1
+            rally_ticks = 0
+            engine.reset_positions()
+            sparring.heading = None
+    return Results(played, won, draws, cpu_hits, cpu_smashes, shots, ticks)
+
+
+def clamp(candidate):
+    return Difficulty(*(min(max(value, low), high) for value, (low, high) in zip(candidate, BOUNDS)))
+
+
+def mutate(candidate, rng):
+    return clamp(Difficulty(*(value + rng.gauss(0, (high - low) * MUTATION_SCALE)
+                             for value, (low, high) in zip(candidate, BOUNDS))))
+
+
+class SelfPlay:
+    """One tuning run; ``run(generations)`` evolves it and checkpoints.
+
+    ``target_win_rate`` of None looks for the strongest CPU; a value such
+    as 0.5 looks for the one that wins that share of points against
+    ``opponent``.
+    """
+
+    def __init__(self, population=8, elite=2, points=1000, opponent="normal", seed=0,
+                 target_win_rate=None, workers=None, checkpoint=None, tick_rate=DEFAULT_TICK_RATE):
+        self.population_size = population
+        self.elite = elite
+        self.points = points
+        self.opponent = get_difficulty(opponent)
+        self.seed = seed
+        self.target_win_rate = target_win_rate
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.tick_rate = tick_rate
+        self.rng = random.Random(seed)
+        self.generation = 0
+        self.history = []
+        self.population = [get_difficulty("normal")]
+        while len(self.population) < population:
+            self.population.append(mutate(self.population[0], self.rng))
+        if checkpoint and os.path.exists(checkpoint):
+            self.load()
+
+    def fitness(self, stats):
+        if self.target_win_rate is None:
+            return stats["win_rate"]
+        return -abs(stats["win_rate"] - self.target_win_rate)
+
+    def evaluate(self, executor, population):
+        # One task per (candidate, chunk of points); every candidate plays
+        # the same chunk seeds
+        chunks = max(1, -(-self.points // POINTS_PER_TASK))
+        seeds = [f"{self.seed}-{self.generation}-{chunk}" for chunk in range(chunks)]
+        tasks = [(candidate, seed) for candidate in population for seed in seeds]
+        results = list(executor.map(play, [candidate for candidate, _ in tasks],
+                                    [self.opponent] * len(tasks), [seed for _, seed in tasks],
+                                    [self.points // chunks] * len(tasks), [self.tick_rate] * len(tasks)))
+        return [combine(results[i:i + chunks]) for i in range(0, len(results), chunks)]
+
+    def step(self, executor):
+        results = self.evaluate(executor, self.population)
+        scored = []
+        for candidate, result in zip(self.population, results):
+            stats = summary(result)
+            scored.append((self.fitness(stats), candidate, stats, result.ticks))
+        scored.sort(key=lambda entry: entry[0], reverse=True)
+        fitness, best, stats, _ = scored[0]
+        self.history.append({"generation": self.generation, "fitness": fitness,
+                             "best": best._asdict(), **stats,
+                             "ticks": sum(entry[3] for entry in scored)})
+
+        parents = [candidate for _, candidate, _, _ in scored[:self.elite]]
+        self.population = parents + [mutate(self.rng.choice(parents), self.rng)
+                                     for _ in range(self.population_size - len(parents))]
+        self.generation += 1
+        if self.checkpoint:
+            self.save()
+        return self.history[-1]
+
+    def run(self, generations, report=None):
+        with ProcessPoolExecutor(self.workers) as executor:
+            while self.generation < generations:
+                entry = self.step(executor)
+                if report is not None:
+                    report(entry)
+        return self.best
+
+    @property
+    def best(self):
+        return Difficulty(**self.history[-1]["best"]) if self.history else self.population[0]
+
+    def save(self):
+        version, state, gauss_next = self.rng.getstate()
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "seed": self.seed,
+            "points": self.points,
+            "elite": self.elite,
+            "opponent": self.opponent._asdict(),
+            "target_win_rate": self.target_win_rate,
+            "generation": self.generation,
+            "population": [candidate._asdict() for candidate in self.population],
+            "history": self.history,
+            "rng": [version, list(state), gauss_next],
+        }
+        # Written aside and renamed, so a crash never leaves half a checkpoint
+        partial = self.checkpoint + ".tmp"
+        with open(partial, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(partial, self.checkpoint)
+
+    def load(self):
+        with open(self.checkpoint) as f:
+            data = json.load(f)
+        if data["version"] != CHECKPOINT_VERSION:
+            raise ValueError(f"unsupported checkpoint version {data['version']}")
+        self.seed = data["seed"]
+        self.points = data["points"]
+        self.elite = data["elite"]
+        self.opponent = Difficulty(**data["opponent"])
+        self.target_win_rate = data["target_win_rate"]
+        self.generation = data["generation"]
+        self.population = [Difficulty(**candidate) for candidate in data["population"]]
+        self.population_size = len(self.population)
+        self.history = data["history"]
+        version, state, gauss_next = data["rng"]
+        self.rng.setstate((version, tuple(state), gauss_next))
+
+
+def report(entry):
+    best = ", ".join(f"{name}={value:.3g}" for name, value in entry["best"].items())
+    print(f"generation {entry['generation']}: win rate {entry['win_rate']:.3f}, "
+          f"rally {entry['rally_length']:.2f} shots, smash rate {entry['smash_rate']:.3f} ({best})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the built-in CPU's Difficulty by self-play.")
+    parser.add_argument("--generations", type=int, metavar="N", default=10,
+                        help="generations to run (default 10)")
+    parser.add_argument("--population", type=int, metavar="N", default=8,
+                        help="candidates per generation (default 8)")
+    parser.add_argument("--points", type=int, metavar="N", default=1000,
+                        help="points each candidate plays (default 1000)")
+    parser.add_argument("--workers", type=int, metavar="N", help="worker processes (default: one per CPU)")
+    parser.add_argument("--checkpoint", metavar="FILE", help="JSON file to resume from and save to")
+    parser.add_argument("--seed", type=int, metavar="N", default=0, help="seed for the whole run (default 0)")
+    parser.add_argument("--opponent", choices=DIFFICULTIES, default="normal",
+                        help="difficulty the sparring partner plays at (default normal)")
+    parser.add_argument("--target-win-rate", type=float, metavar="X",
+                        help="aim for this win rate against the opponent instead of the highest")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run = SelfPlay(population=args.population, points=args.points, opponent=args.opponent,
+                   seed=args.seed, target_win_rate=args.target_win_rate, workers=args.workers,
+                   checkpoint=args.checkpoint)
+    if run.generation:
+        print(f"resuming at generation {run.generation}")
+    best = run.run(args.generations, report)
+    print(f"best: {best}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Compact binary game-state snapshots.
+
+A snapshot is a ``HEADER`` (format version, game-over/winner flags, tick,
+base tick, field mask) followed by the fields whose bit is set in the
+mask, packed little-endian with ``struct``. Positions and velocities are
+fixed point (1/16 px), timers are bytes. A keyframe has every bit set
+and ``base == NO_BASE``; a delta only carries the fields that differ from
+the snapshot at ``base``, which is the last one the client acknowledged.
+
+The ball trail is not sent: ``SnapshotDecoder`` rebuilds it from the ball
+positions it decodes, the same way the engine builds it (clearing it
+when a point is scored).
+"""
+
+import struct
+from operator import attrgetter
+
+from tennis_engine import GameState, Trail, MAX_CHARGE, PARTICLE_LIFE, SMASH_EFFECT_TIME
+
+FORMAT_VERSION = 1
+NO_BASE = 0xFFFFFFFF
+# Snapshots kept for clients whose acks lag behind
+SNAPSHOT_HISTORY = 64
+
+POSITION_SCALE = 16
+
+# (GameState field, struct code, scale)
+FIELDS = (
+    ("player_x", "h", POSITION_SCALE),
+    ("player_y", "h", POSITION_SCALE),
+    ("player_velocity_x", "h", POSITION_SCALE),
+    ("player_velocity_y", "h", POSITION_SCALE),
+    ("player_charge_time", "B", 255 / MAX_CHARGE),
+    ("player_smash_count", "H", 1),
+    ("player_score", "B", 1),
+    ("cpu_x", "h", POSITION_SCALE),
+    ("cpu_y", "h", POSITION_SCALE),
+    ("cpu_velocity_x", "h", POSITION_SCALE),
+    ("cpu_velocity_y", "h", POSITION_SCALE),
+    ("cpu_charge_time", "B", 255 / MAX_CHARGE),
+    ("cpu_smash_count", "H", 1),
+    ("cpu_score", "B", 1),
+    ("ball_x", "h", POSITION_SCALE),
+    ("ball_y", "h", POSITION_SCALE),
+    # Smashes compound the ball speed, so it gets 32 bits
+    ("ball_dx", "i", POSITION_SCALE),
+    ("ball_dy", "i", POSITION_SCALE),
+    ("ball_speed_multiplier", "B", 32),
+    ("ball_smash_effect", "B", 250 / SMASH_EFFECT_TIME),
+)
+COUNT_FIELDS = {"player_smash_count", "player_score", "cpu_smash_count", "cpu_score"}
+# The particle list is the last mask bit: a count byte, then PARTICLE per particle
+EFFECTS_BIT = 1 << len(FIELDS)
+ALL_FIELDS = (EFFECTS_BIT << 1) - 1
+
+HEADER = struct.Struct("<BBIII")
+COUNT = struct.Struct("<B")
+PARTICLE = struct.Struct("<hhBB")
+PARTICLE_LIFE_SCALE = 255 / PARTICLE_LIFE
+
+WINNER_CODES = {None: 0, "Player": 1, "CPU": 2}
+WINNER_NAMES = {code: name for name, code in WINNER_CODES.items()}
+
+LIMITS = {"B": (0, 0xFF), "H": (0, 0xFFFF), "h": (-0x8000, 0x7FFF), "i": (-0x80000000, 0x7FFFFFFF)}
+_BOUNDS = tuple(LIMITS[code] for _, code, _ in FIELDS)
+_SCALES = tuple(scale for _, _, scale in FIELDS)
+_read_fields = attrgetter(*(name for name, _, _ in FIELDS))
+_structs = {}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _fields_struct(mask):
+    # One compiled Struct per field mask, built the first time it is seen
+    packer = _structs.get(mask)
+    if packer is None:
+        codes = "".join(code for i, (_, code, _) in enumerate(FIELDS) if mask >> i & 1)
+        packer = _structs[mask] = struct.Struct("<" + codes)
+    return packer
+
+
+def quantise(state):
+    """Returns ``(flags, fields, effects)``: the state as it goes on the wire."""
+    fields = [round(value * scale) for value, scale in zip(_read_fields(state), _SCALES)]
+    for i, (low, high) in enumerate(_BOUNDS):
+        if not low <= fields[i] <= high:
+            fields[i] = low if fields[i] < low else high
+    effects = tuple(
+        (max(-0x8000, min(0x7FFF, round(x * POSITION_SCALE))),
+         max(-0x8000, min(0x7FFF, round(y * POSITION_SCALE))),
+         max(0, min(0xFF, round(life * PARTICLE_LIFE_SCALE))),
+         color)
+        for x, y, life, color in state.smash_effects)
+    flags = state.game_over | WINNER_CODES[state.winner] << 1
+    return flags, tuple(fields), effects
+
+
+def dequantise(tick, flags, fields, effects):
+    state = GameState()
+    for (name, _, scale), value in zip(FIELDS, fields):
+        setattr(state, name, value if name in COUNT_FIELDS else value / scale)
+    state.tick = tick
+    state.game_over = bool(flags & 1)
+    state.winner = WINNER_NAMES[flags >> 1 & 3]
+    for x, y, life, color in effects:
+        state.smash_effects.add(x / POSITION_SCALE, y / POSITION_SCALE, life / PARTICLE_LIFE_SCALE, color)
+    return state
+
+
+class SnapshotEncoder:
+    """Encodes one match's snapshots for any number of clients.
+
+    Call ``update`` with the state once per tick, then ``encode`` with
+    each client's last acknowledged tick. Clients that acked the same
+    tick share one immutable ``bytes`` object, built once per tick and
+    sent as is.
+    """
+
+    def __init__(self, history=SNAPSHOT_HISTORY):
+        self.history = history
+        self.snapshots = {}
+        self.tick = None
+        self.encoded = {}
+
+    def update(self, state):
+        if state.tick == self.tick:
+            return
+        if self.tick is not None and state.tick < self.tick:
+            # A new game restarted the tick count; old snapshots are useless
+            self.snapshots = {}
+        self.tick = state.tick
+        self.snapshots[state.tick] = quantise(state)
+        if len(self.snapshots) > self.history:
+            del self.snapshots[next(iter(self.snapshots))]
+        self.encoded = {}
+
+    def encode(self, base=None):
+        # Falls back to a keyframe when ``base`` is unknown or too old
+        if base not in self.snapshots or base == self.tick:
+            base = None
+        view = self.encoded.get(base)
+        if view is None:
+            view = self.encoded[base] = self._pack(base)
+        return view
+
+    def _pack(self, base):
+        flags, fields, effects = self.snapshots[self.tick]
+        if base is None:
+            mask = ALL_FIELDS
+            values = fields
+        else:
+            _, base_fields, base_effects = self.snapshots[base]
+            mask = 0
+            values = []
+            for i, (value, old) in enumerate(zip(fields, base_fields)):
+                if value != old:
+                    mask |= 1 << i
+                    values.append(value)
+            if effects != base_effects:
+                mask |= EFFECTS_BIT
+        packer = _fields_struct(mask & ~EFFECTS_BIT)
+        size = HEADER.size + packer.size
+        if mask & EFFECTS_BIT:
+            size += COUNT.size + PARTICLE.size * len(effects)
+
+        buffer = bytearray(size)
+        HEADER.pack_into(buffer, 0, FORMAT_VERSION, flags, self.tick,
+                         NO_BASE if base is None else base, mask)
+        offset = HEADER.size
+        packer.pack_into(buffer, offset, *values)
+        offset += packer.size
+        if mask & EFFECTS_BIT:
+            COUNT.pack_into(buffer, offset, len(effects))
+            offset += COUNT.size
+            for effect in effects:
+                PARTICLE.pack_into(buffer, offset, *effect)
+                offset += PARTICLE.size
+        return bytes(buffer)
+
+
+class SnapshotDecoder:
+    """Client side of ``SnapshotEncoder``; ``ack`` is the tick to report back."""
+
+    def __init__(self, history=SNAPSHOT_HISTORY):
+        self.history = history
+        self.snapshots = {}
+        self.ack = None
+        self.trail = Trail()
+        self.previous = None
+
+    def decode(self, data):
+        view = memoryview(data)
+        if len(view) < HEADER.size:
+            raise SnapshotError("truncated snapshot header")
+        version, flags, tick, base, mask = HEADER.unpack_from(view, 0)
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}")
+        if mask & ~ALL_FIELDS:
+            raise SnapshotError("unknown fields in snapshot")
+
+        if base == NO_BASE:
+            if self.ack is not None and tick <= self.ack:
+                self.snapshots = {}
+                self.ack = None
+            fields = [0] * len(FIELDS)
+            effects = ()
+        elif base in self.snapshots:
+            _, fields, effects = self.snapshots[base]
+            fields = list(fields)
+        else:
+            raise SnapshotError(f"snapshot {tick} is a delta against unknown tick {base}")
+
+        try:
+            packer = _fields_struct(mask & ~EFFECTS_BIT)
+            values = iter(packer.unpack_from(view, HEADER.size))
+            for i in range(len(FIELDS)):
+                if mask >> i & 1:
+                    fields[i] = next(values)
+            offset = HEADER.size + packer.size
+            if mask & EFFECTS_BIT:
+                count, = COUNT.unpack_from(view, offset)
+                offset += COUNT.size
+                effects = tuple(PARTICLE.unpack_from(view, offset + PARTICLE.size * i)
+                                for i in range(count))
+        except struct.error as error:
+            raise SnapshotError(f"truncated snapshot: {error}") from None
+
+        fields = tuple(fields)
+        self.snapshots[tick] = (flags, fields, effects)
+        if len(self.snapshots) > self.history:
+            del self.snapshots[next(iter(self.snapshots))]
+        if self.ack is None or tick > self.ack:
+            self.ack = tick
+
+        state = dequantise(tick, flags, fields, effects)
+        previous = self.previous
+        if (previous is None or previous.player_score != state.player_score
+                or previous.cpu_score != state.cpu_score):
+            self.trail.clear()
+        else:
+            self.trail.append(previous.ball_x, previous.ball_y)
+        state.ball_trail.extend(self.trail)
+        self.previous = state
+        return state
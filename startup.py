@@ -0,0 +1,145 @@
+"""
+Cold-start measurement for the WSGI entry point.
+
+``ImportProfiler`` wraps ``__import__`` and records how long every import
+statement took, nested imports included. ``step`` times named
+initialisation steps (``app.lazy`` uses it for the work it defers to
+first use). With ``STARTUP_PROFILE=1`` in the environment, ``wsgi.py``
+profiles its own import and prints the report to stderr, which is how
+a serverless cold start can be looked at in the platform's logs.
+
+Usage: python startup.py   (profiles a fresh ``import wsgi`` and first request)
+"""
+
+import builtins
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# Budget for a fresh ``import wsgi``; the startup tests and the cold_start
+# benchmark hold it to these
+IMPORT_TIME_BUDGET = 0.5  # seconds
+IMPORT_MEMORY_BUDGET = 64 * 1024 * 1024  # peak RSS of the whole process, bytes
+# Loaded on first use only; importing wsgi must not pull these in
+LAZY_MODULES = ("numpy", "rooms", "matches", "tennis_engine", "tennis_game", "scoring", "assets")
+
+REPORT_LIMIT = 15
+
+# (name, seconds) for every step timed so far
+steps = []
+
+
+@contextmanager
+def step(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        steps.append((name, time.perf_counter() - start))
+
+
+class ImportProfiler:
+    """Times every ``import`` while installed; ``imports`` holds
+    ``(module, depth, seconds)`` in the order they finished."""
+
+    def __init__(self):
+        self.imports = []
+        self.depth = 0
+        self.original = None
+
+    def install(self):
+        self.original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def uninstall(self):
+        builtins.__import__ = self.original
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name in sys.modules:
+            return self.original(name, globals, locals, fromlist, level)
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            return self.original(name, globals, locals, fromlist, level)
+        finally:
+            self.depth -= 1
+            self.imports.append((self._resolve(name, globals, fromlist, level), self.depth,
+                                 time.perf_counter() - start))
+
+    def _resolve(self, name, globals, fromlist, level):
+        # Full dotted name of a relative import
+        if not level:
+            return name
+        package = (globals or {}).get("__package__") or ""
+        if level > 1:
+            package = package.rsplit(".", level - 1)[0]
+        if name:
+            return f"{package}.{name}"
+        return f"{package}.{{{', '.join(fromlist or ())}}}"
+
+    def report(self, out=sys.stderr, limit=REPORT_LIMIT):
+        total = sum(seconds for _, depth, seconds in self.imports if depth == 0)
+        out.write(f"imports: {total * 1000:.1f} ms in {len(self.imports)} modules\n")
+        slowest = sorted(self.imports, key=lambda record: -record[2])[:limit]
+        for name, depth, seconds in slowest:
+            out.write(f"  {seconds * 1000:8.1f} ms  {'  ' * depth}{name}\n")
+        for name, seconds in steps:
+            out.write(f"step {name}: {seconds * 1000:.1f} ms\n")
+
+
+def peak_rss():
+    # Peak resident set size of this process, in bytes. ru_maxrss (KB on
+    # Linux) survives fork and exec, so a child of a big process would
+    # report its parent's peak; VmHWM starts over with the new program.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure_import(module="wsgi"):
+    """Imports ``module`` in a fresh interpreter and returns
+    ``(seconds, peak_rss_bytes, lazy_modules_loaded)``."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "import startup\n"
+        "loaded = [name for name in startup.LAZY_MODULES if name in sys.modules]\n"
+        "print(elapsed, startup.peak_rss(), ','.join(loaded))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+    loaded = output[2].split(",") if len(output) > 2 else []
+    return float(output[0]), int(output[1]), loaded
+
+
+def main():
+    # Profiles a cold import of wsgi and its first page request in a
+    # fresh interpreter
+    code = (
+        "import os\n"
+        "os.environ['STARTUP_PROFILE'] = '1'\n"
+        "import time, startup\n"
+        "import wsgi\n"
+        "client = wsgi.app.test_client()\n"
+        "with startup.step('first request /'):\n"
+        "    client.get('/')\n"
+        "for name, seconds in startup.steps:\n"
+        "    print(f'step {name}: {seconds * 1000:.1f} ms')\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,682 @@
+import math
+import random
+import time
+from array import array
+from collections import namedtuple
+
+# Court and object sizes (pixels)
+CANVAS_WIDTH = 800
+CANVAS_HEIGHT = 500
+PADDLE_WIDTH = 10
+PADDLE_HEIGHT = 80
+BALL_SIZE = 12
+
+# Speeds in pixels per second
+PLAYER_SPEED = 480
+CPU_SPEED = 360
+BALL_SPEED = 360
+SERVE_DY_CHOICES = (-180, -120, -60, 60, 120, 180)
+HIT_ANGLE_SPEED = 240  # vertical speed at the paddle edge
+
+# Durations in seconds
+SMASH_EFFECT_TIME = 0.5
+PARTICLE_LIFE = 1 / 3
+MAX_CHARGE = 1.0
+CHARGE_DRAIN_RATE = 2.0  # charge drains twice as fast as it builds
+TIME_EPSILON = 1e-9  # absorbs float drift when summing 1 / tick_rate
+PARTICLES_PER_SMASH = 8
+# Smashes past this many live particles add none
+PARTICLE_CAPACITY = 48
+# Particle colour indexes
+PLAYERS = ("Player", "CPU")
+
+Difficulty = namedtuple("Difficulty", [
+    "speed",           # CPU paddle speed in pixels per second
+    "reaction_time",   # seconds the CPU waits before moving after each shot
+    "aim_error",       # largest intercept misjudgement in pixels, per unit of ball speed multiplier
+    "smash_chance",    # chance of running through the ball to smash it
+], defaults=(CPU_SPEED, 0.12, 50.0, 0.2))
+
+DIFFICULTIES = {
+    "easy": Difficulty(speed=300, reaction_time=0.3, aim_error=80.0, smash_chance=0.05),
+    "normal": Difficulty(),
+    "hard": Difficulty(speed=420, reaction_time=0.05, aim_error=25.0, smash_chance=0.4),
+}
+DEFAULT_DIFFICULTY = "normal"
+
+# The CPU stops this close to its target instead of twitching around it
+CPU_DEADZONE = 5
+# A smash starts this far before the intercept and finishes as far past it
+SMASH_RUNUP = 30
+
+DEFAULT_TICK_RATE = 60
+WIN_SCORE = 10
+TRAIL_LENGTH = 8
+
+# Ball centre limits where it touches the court walls
+WALL_TOP = BALL_SIZE // 2 + 5
+WALL_BOTTOM = CANVAS_HEIGHT - BALL_SIZE // 2 - 5
+
+# Fast balls are swept in several sub-steps of at most this many pixels
+MAX_SUBSTEP_DISTANCE = PADDLE_WIDTH
+MAX_SUBSTEPS = 32
+# Contacts resolved within one sub-step; movement left after that is dropped
+MAX_CONTACTS = 4
+
+# Input bitmask for one paddle
+UP = 1
+DOWN = 2
+LEFT = 4
+RIGHT = 8
+
+KEY_BITS = {"Up": UP, "Down": DOWN, "Left": LEFT, "Right": RIGHT}
+
+
+def inputs_from_keys(keys):
+    mask = 0
+    for key in keys:
+        mask |= KEY_BITS.get(key, 0)
+    return mask
+
+
+def get_difficulty(difficulty):
+    if isinstance(difficulty, Difficulty):
+        return difficulty
+    try:
+        return DIFFICULTIES[difficulty]
+    except KeyError:
+        raise ValueError(f"unknown difficulty: {difficulty}") from None
+
+
+def fold_wall(y):
+    """Where a ball centre that travelled straight to ``y`` really is
+    after bouncing between ``WALL_TOP`` and ``WALL_BOTTOM``."""
+    span = WALL_BOTTOM - WALL_TOP
+    y = (y - WALL_TOP) % (2 * span)
+    return WALL_TOP + (y if y <= span else 2 * span - y)
+
+
+def intercept(x, y, dx, dy, mult, effect, target_x):
+    """``(y, seconds)`` at which a ball at ``(x, y)`` reaches ``target_x``.
+
+    The ball moves at ``mult`` times its velocity for ``effect`` more
+    seconds of smash, then at its plain velocity; wall bounces only flip
+    ``dy`` so they fold into the line (see ``fold_wall``).
+    """
+    distance = target_x - x
+    if distance * dx <= 0:
+        return fold_wall(y), 0.0
+    fast = abs(dx) * mult * effect
+    if abs(distance) <= fast:
+        seconds = abs(distance) / (abs(dx) * mult)
+    else:
+        seconds = effect + (abs(distance) - fast) / abs(dx)
+    return fold_wall(y + distance * dy / dx), seconds
+
+
+def substep_count(distance):
+    return min(MAX_SUBSTEPS, max(1, math.ceil(distance / MAX_SUBSTEP_DISTANCE)))
+
+
+def paddle_impact(x0, y0, ex, ey, paddle_x, paddle_y):
+    """Fraction of the move (x0, y0) -> (x0 + ex, y0 + ey) at which the
+    ball first touches the paddle, or None if it misses.
+
+    The paddle is grown by the ball radius so the ball can be treated as
+    a point. A ball already touching the paddle hits at 0.
+    """
+    half = BALL_SIZE // 2
+    t_enter = 0.0
+    t_exit = 1.0
+    for p, e, low, high in ((x0, ex, paddle_x - half, paddle_x + PADDLE_WIDTH + half),
+                            (y0, ey, paddle_y - half, paddle_y + PADDLE_HEIGHT + half)):
+        if e == 0:
+            if p < low or p > high:
+                return None
+            continue
+        t1 = (low - p) / e
+        t2 = (high - p) / e
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > t_enter:
+            t_enter = t1
+        if t2 < t_exit:
+            t_exit = t2
+        if t_enter > t_exit:
+            return None
+    return t_enter
+
+
+class Particles:
+    """Smash particles in parallel arrays of a fixed ``capacity``.
+
+    The live particles are the first ``count`` entries of ``x``, ``y``,
+    ``expires`` and ``color`` (an index into ``PLAYERS``). Particles keep
+    the ``clock`` time they expire at rather than their remaining life,
+    so ``age`` only advances the clock until the next one is due. A dying
+    particle is overwritten by the last live one, so nothing is ever
+    shifted and the order of particles is not kept.
+    """
+
+    __slots__ = ("capacity", "x", "y", "expires", "color", "count", "clock", "next_expiry")
+
+    def __init__(self, capacity=PARTICLE_CAPACITY):
+        self.capacity = capacity
+        self.x = array("d", bytes(8 * capacity))
+        self.y = array("d", bytes(8 * capacity))
+        self.expires = array("d", bytes(8 * capacity))
+        self.color = array("B", bytes(capacity))
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # (x, y, remaining life, color) of each live particle
+        clock = self.clock
+        for i in range(self.count):
+            yield self.x[i], self.y[i], self.expires[i] - clock, self.color[i]
+
+    def add(self, x, y, life, color):
+        i = self.count
+        if i == self.capacity:
+            return False
+        expires = self.clock + life
+        self.x[i] = x
+        self.y[i] = y
+        self.expires[i] = expires
+        self.color[i] = color
+        self.count = i + 1
+        if expires < self.next_expiry:
+            self.next_expiry = expires
+        return True
+
+    def age(self, dt):
+        if not self.count:
+            # Nothing to age; the clock stays at 0 until a particle is added
+            return
+        self.clock += dt
+        if self.next_expiry - self.clock > TIME_EPSILON:
+            return
+        # Swap-remove every expired particle and find the next one due
+        clock = self.clock
+        x, y, expires, color = self.x, self.y, self.expires, self.color
+        count = self.count
+        next_expiry = math.inf
+        i = 0
+        while i < count:
+            if expires[i] - clock > TIME_EPSILON:
+                if expires[i] < next_expiry:
+                    next_expiry = expires[i]
+                i += 1
+                continue
+            # The moved particle is checked on the next pass
+            count -= 1
+            x[i] = x[count]
+            y[i] = y[count]
+            expires[i] = expires[count]
+            color[i] = color[count]
+        self.count = count
+        self.next_expiry = next_expiry
+        if not count:
+            # Restart the clock so it never grows large enough to lose precision
+            self.clock = 0.0
+
+    def clear(self):
+        self.count = 0
+        self.clock = 0.0
+        self.next_expiry = math.inf
+
+
+class Trail:
+    """The last ``capacity`` ball positions in a ring buffer.
+
+    Indexing and iteration go from the oldest point to the newest.
+    """
+
+    __slots__ = ("capacity", "x", "y", "end", "count")
+
+    def __init__(self, capacity=TRAIL_LENGTH):
+        self.capacity = capacity
+        self.x = array("d", bytes(8 * capacity))
+        self.y = array("d", bytes(8 * capacity))
+        self.end = 0  # where the next point goes
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError("trail index out of range")
+        i = (self.end - self.count + i) % self.capacity
+        return self.x[i], self.y[i]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def append(self, x, y):
+        # Overwrites the oldest point once full
+        i = self.end
+        self.x[i] = x
+        self.y[i] = y
+        i += 1
+        self.end = i if i < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def extend(self, points):
+        for x, y in points:
+            self.append(x, y)
+
+    def clear(self):
+        self.end = 0
+        self.count = 0
+
+
+class GameState:
+    __slots__ = (
+        "player_x", "player_y", "player_velocity_x", "player_velocity_y",
+        "player_charge_time", "player_smash_count", "player_score",
+        "cpu_x", "cpu_y", "cpu_velocity_x", "cpu_velocity_y",
+        "cpu_charge_time", "cpu_smash_count", "cpu_score",
+        "ball_x", "ball_y", "ball_dx", "ball_dy",
+        "ball_speed_multiplier", "ball_smash_effect",
+        "ball_trail", "smash_effects",
+        "cpu_target_y", "cpu_reaction", "cpu_intercept_time", "cpu_smash",
+        "tick", "game_over", "winner",
+    )
+
+    def __init__(self):
+        self.player_x = 20
+        self.player_y = CANVAS_HEIGHT // 2 - PADDLE_HEIGHT // 2
+        self.player_velocity_x = 0
+        self.player_velocity_y = 0
+        self.player_charge_time = 0
+        self.player_smash_count = 0
+        self.player_score = 0
+
+        self.cpu_x = CANVAS_WIDTH - 30
+        self.cpu_y = CANVAS_HEIGHT // 2 - PADDLE_HEIGHT // 2
+        self.cpu_velocity_x = 0
+        self.cpu_velocity_y = 0
+        self.cpu_charge_time = 0
+        self.cpu_smash_count = 0
+        self.cpu_score = 0
+
+        self.ball_x = CANVAS_WIDTH // 2
+        self.ball_y = CANVAS_HEIGHT // 2
+        self.ball_dx = BALL_SPEED
+        self.ball_dy = 0
+        self.ball_speed_multiplier = 1.0
+        self.ball_smash_effect = 0
+        self.ball_trail = Trail()
+        self.smash_effects = Particles()
+
+        # The CPU's plan for the current shot, made when it is hit or served
+        self.cpu_target_y = CANVAS_HEIGHT / 2
+        self.cpu_reaction = 0.0
+        self.cpu_intercept_time = 0.0
+        self.cpu_smash = 0.0  # direction of a planned smash, or 0
+
+        self.tick = 0
+        self.game_over = False
+        self.winner = None
+
+
+# The numeric GameState fields, as stored by BatchEngine rows and replay
+# keyframes; the trail, particles, tick and outcome are handled apart
+FLOAT_FIELDS = (
+    "player_x", "player_y", "player_velocity_x", "player_velocity_y", "player_charge_time",
+    "cpu_x", "cpu_y", "cpu_velocity_x", "cpu_velocity_y", "cpu_charge_time",
+    "ball_x", "ball_y", "ball_dx", "ball_dy", "ball_speed_multiplier", "ball_smash_effect",
+    "cpu_target_y", "cpu_reaction", "cpu_intercept_time", "cpu_smash",
+)
+INT_FIELDS = ("player_smash_count", "player_score", "cpu_smash_count", "cpu_score")
+
+
+class TennisEngine:
+    """Headless Action Tennis physics.
+
+    ``step(inputs)`` advances one tick of ``1 / tick_rate`` seconds and
+    returns a list of events:
+    ``("smash", player, power, x, y)``, ``("point", scorer)`` and
+    ``("game_over", winner)`` where players are ``"Player"`` or ``"CPU"``.
+    When ``cpu_inputs`` is given the right paddle is driven by that
+    bitmask instead of the built-in CPU. All randomness comes from
+    ``rng`` (a ``random.Random`` seeded with ``seed`` unless one is
+    passed in).
+
+    The built-in CPU plays at ``difficulty`` (a ``Difficulty`` or a name
+    in ``DIFFICULTIES``). It works out where the ball will cross its
+    paddle once per serve and paddle hit (``plan_cpu``) and only steers
+    toward that target in between.
+
+    Setting ``profiler`` to a ``frame_profiler.FrameProfiler`` times each
+    phase of ``step``; it is None (and costs one check) otherwise.
+    """
+
+    def __init__(self, seed=None, tick_rate=DEFAULT_TICK_RATE, rng=None, difficulty=DEFAULT_DIFFICULTY):
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.difficulty = get_difficulty(difficulty)
+        self.profiler = None
+        self.state = GameState()
+        self.reset_ball()
+
+    def reset(self):
+        self.state = GameState()
+        self.reset_ball()
+
+    def reset_positions(self):
+        s = self.state
+        s.player_y = CANVAS_HEIGHT // 2 - PADDLE_HEIGHT // 2
+        s.cpu_y = CANVAS_HEIGHT // 2 - PADDLE_HEIGHT // 2
+        self.reset_ball()
+
+    def reset_ball(self):
+        s = self.state
+        s.ball_x = CANVAS_WIDTH // 2
+        s.ball_y = CANVAS_HEIGHT // 2
+        s.ball_dx = BALL_SPEED if self.rng.choice([True, False]) else -BALL_SPEED
+        s.ball_dy = self.rng.choice(SERVE_DY_CHOICES)
+
+        s.ball_speed_multiplier = 1.0
+        s.ball_smash_effect = 0
+        s.smash_effects.clear()
+        s.ball_trail.clear()
+        self.plan_cpu()
+
+    def plan_cpu(self):
+        # Called whenever the ball changes direction: solve where it will
+        # reach the CPU paddle, or head back to the middle if it is leaving
+        s = self.state
+        difficulty = self.difficulty
+        s.cpu_reaction = difficulty.reaction_time
+        s.cpu_smash = 0.0
+        if s.ball_dx <= 0:
+            s.cpu_target_y = CANVAS_HEIGHT / 2
+            s.cpu_intercept_time = 0.0
+            return
+        target_y, s.cpu_intercept_time = intercept(
+            s.ball_x, s.ball_y, s.ball_dx, s.ball_dy, s.ball_speed_multiplier, s.ball_smash_effect,
+            s.cpu_x - BALL_SIZE // 2)
+        rng = self.rng
+        s.cpu_target_y = target_y + difficulty.aim_error * s.ball_speed_multiplier * rng.uniform(-1, 1)
+        if rng.random() < difficulty.smash_chance:
+            # Run through the ball the way the paddle is already heading,
+            # so a late paddle never turns back for its run-up
+            s.cpu_smash = 1.0 if s.cpu_target_y > s.cpu_y + PADDLE_HEIGHT // 2 else -1.0
+
+    def step(self, inputs=0, cpu_inputs=None):
+        s = self.state
+        events = []
+        if s.game_over:
+            return events
+        s.tick += 1
+        if self.profiler is not None:
+            return self._profiled_step(inputs, cpu_inputs, events)
+        self.age_effects()
+        self.update_player(inputs)
+        if cpu_inputs is None:
+            self.update_cpu()
+        else:
+            self.update_cpu_manual(cpu_inputs)
+        self.update_ball(events)
+        return events
+
+    def _profiled_step(self, inputs, cpu_inputs, events):
+        # ``step`` with each phase timed
+        profiler = self.profiler
+        start = time.perf_counter_ns()
+        self.age_effects()
+        start = profiler.lap("age_effects", start)
+        self.update_player(inputs)
+        start = profiler.lap("update_player", start)
+        if cpu_inputs is None:
+            self.update_cpu()
+        else:
+            self.update_cpu_manual(cpu_inputs)
+        start = profiler.lap("update_cpu", start)
+        self.update_ball(events)
+        profiler.lap("update_ball", start)
+        return events
+
+    def age_effects(self):
+        self.state.smash_effects.age(self.dt)
+
+    def update_player(self, inputs):
+        s = self.state
+        prev_x = s.player_x
+        prev_y = s.player_y
+        move = PLAYER_SPEED * self.dt
+
+        move_up = inputs & UP and s.player_y > 5
+        move_down = inputs & DOWN and s.player_y < CANVAS_HEIGHT - PADDLE_HEIGHT - 5
+        move_left = inputs & LEFT and s.player_x > 5
+        move_right = inputs & RIGHT and s.player_x < CANVAS_WIDTH // 2 - PADDLE_WIDTH - 5
+
+        if move_up:
+            s.player_y -= move
+        if move_down:
+            s.player_y += move
+        if move_left:
+            s.player_x -= move
+        if move_right:
+            s.player_x += move
+
+        s.player_velocity_x = (s.player_x - prev_x) * self.tick_rate
+        s.player_velocity_y = (s.player_y - prev_y) * self.tick_rate
+        s.player_charge_time = self._charge(s.player_charge_time,
+                                            s.player_velocity_x or s.player_velocity_y)
+
+    def _charge(self, charge_time, moving):
+        # Charge builds while moving and drains faster when idle
+        if moving:
+            charge_time += self.dt
+            return MAX_CHARGE if charge_time > MAX_CHARGE - TIME_EPSILON else charge_time
+        charge_time -= CHARGE_DRAIN_RATE * self.dt
+        return 0 if charge_time < TIME_EPSILON else charge_time
+
+    def update_cpu(self):
+        s = self.state
+        prev_y = s.cpu_y
+        s.cpu_intercept_time -= self.dt
+        if s.cpu_reaction > TIME_EPSILON:
+            s.cpu_reaction -= self.dt
+        else:
+            speed = self.difficulty.speed
+            target_y = s.cpu_target_y
+            if s.cpu_smash:
+                # Wait short of the target, then run past it as the ball arrives
+                runup = SMASH_RUNUP if s.cpu_intercept_time <= SMASH_RUNUP / speed else -SMASH_RUNUP
+                target_y += s.cpu_smash * runup
+            offset = target_y - (s.cpu_y + PADDLE_HEIGHT // 2)
+            move = speed * self.dt
+            if offset > CPU_DEADZONE:
+                s.cpu_y += min(move, offset)
+            elif offset < -CPU_DEADZONE:
+                s.cpu_y -= min(move, -offset)
+
+        self._finish_cpu_move(prev_y)
+
+    def update_cpu_manual(self, inputs):
+        s = self.state
+        prev_y = s.cpu_y
+        move = self.difficulty.speed * self.dt
+        if inputs & UP:
+            s.cpu_y -= move
+        if inputs & DOWN:
+            s.cpu_y += move
+        self._finish_cpu_move(prev_y)
+
+    def _finish_cpu_move(self, prev_y):
+        s = self.state
+        if s.cpu_y < 5:
+            s.cpu_y = 5
+        elif s.cpu_y > CANVAS_HEIGHT - PADDLE_HEIGHT - 5:
+            s.cpu_y = CANVAS_HEIGHT - PADDLE_HEIGHT - 5
+
+        s.cpu_velocity_x = 0
+        s.cpu_velocity_y = (s.cpu_y - prev_y) * self.tick_rate
+        s.cpu_charge_time = self._charge(s.cpu_charge_time, s.cpu_velocity_y)
+
+    def update_ball(self, events):
+        s = self.state
+
+        s.ball_trail.append(s.ball_x, s.ball_y)
+
+        # This tick moves at the multiplier it started with
+        mult = s.ball_speed_multiplier
+        if s.ball_smash_effect > 0:
+            s.ball_smash_effect -= self.dt
+            if s.ball_smash_effect <= TIME_EPSILON:
+                s.ball_smash_effect = 0
+                s.ball_speed_multiplier = 1.0
+
+        substeps = substep_count(max(abs(s.ball_dx), abs(s.ball_dy)) * mult * self.dt)
+        h = self.dt / substeps
+        heading = s.ball_dx > 0
+        for _ in range(substeps):
+            mult = self.sweep_ball(h, mult, events)
+
+        if s.ball_x < 0:
+            self.score_point("CPU", events)
+        elif s.ball_x > CANVAS_WIDTH:
+            self.score_point("Player", events)
+        elif (s.ball_dx > 0) != heading:
+            # A paddle hit; serves plan in reset_ball
+            self.plan_cpu()
+
+    def sweep_ball(self, h, mult, events):
+        # Move the ball for h seconds, resolving each wall or paddle contact
+        # along the way at its exact time of impact
+        s = self.state
+        for _ in range(MAX_CONTACTS):
+            x0 = s.ball_x
+            y0 = s.ball_y
+            ex = s.ball_dx * mult * h
+            ey = s.ball_dy * mult * h
+
+            t = 1.0
+            hit = None
+            if ey < 0:
+                wall_t = 0.0 if y0 <= WALL_TOP else (WALL_TOP - y0) / ey
+                if wall_t <= t:
+                    t, hit = wall_t, "wall"
+            elif ey > 0:
+                wall_t = 0.0 if y0 >= WALL_BOTTOM else (WALL_BOTTOM - y0) / ey
+                if wall_t <= t:
+                    t, hit = wall_t, "wall"
+            if ex < 0:
+                paddle_t = paddle_impact(x0, y0, ex, ey, s.player_x, s.player_y)
+                if paddle_t is not None and paddle_t < t:
+                    t, hit = paddle_t, "Player"
+            elif ex > 0:
+                paddle_t = paddle_impact(x0, y0, ex, ey, s.cpu_x, s.cpu_y)
+                if paddle_t is not None and paddle_t < t:
+                    t, hit = paddle_t, "CPU"
+
+            s.ball_x = x0 + ex * t
+            s.ball_y = y0 + ey * t
+            if hit is None:
+                return mult
+
+            if hit == "wall":
+                s.ball_dy = -s.ball_dy
+            else:
+                power = self.hit_paddle(hit, events)
+                if power is not None:
+                    mult = power
+
+            # Sweep the rest of the sub-step on the new heading, which may
+            # meet another wall or paddle
+            h *= 1.0 - t
+        return mult
+
+    def hit_paddle(self, player, events):
+        # Returns the smash power, or None for a plain return
+        s = self.state
+        is_smash = False
+        smash_power = 1.0
+
+        if player == "Player":
+            charge = s.player_charge_time / MAX_CHARGE
+            # Moving into the ball, or across it vertically, is a smash
+            if s.player_velocity_x > 0:
+                is_smash = True
+                smash_power = 1.5 + charge * 1.0
+            if ((s.ball_dy > 0 and s.player_velocity_y < 0) or
+                    (s.ball_dy < 0 and s.player_velocity_y > 0)):
+                is_smash = True
+                smash_power = max(smash_power, 1.3 + charge * 0.7)
+            hit_pos = (s.ball_y - (s.player_y + PADDLE_HEIGHT // 2)) / (PADDLE_HEIGHT // 2)
+            s.ball_dx = abs(s.ball_dx) * smash_power
+        else:
+            charge = s.cpu_charge_time / MAX_CHARGE
+            if s.cpu_velocity_x < 0:
+                is_smash = True
+                smash_power = 1.3 + charge * 0.5
+            if abs(s.cpu_velocity_y) > self.difficulty.speed * 0.5:
+                is_smash = True
+                smash_power = max(smash_power, 1.2 + charge * 0.4)
+            hit_pos = (s.ball_y - (s.cpu_y + PADDLE_HEIGHT // 2)) / (PADDLE_HEIGHT // 2)
+            s.ball_dx = -abs(s.ball_dx) * smash_power
+        s.ball_dy = hit_pos * HIT_ANGLE_SPEED * smash_power
+
+        if not is_smash:
+            return None
+        self.execute_smash(player, smash_power, events)
+        if player == "Player":
+            s.player_charge_time = 0
+        else:
+            s.cpu_charge_time = 0
+        return smash_power
+
+    def execute_smash(self, player, power, events):
+        s = self.state
+        rng = self.rng
+        if player == "Player":
+            s.player_smash_count += 1
+        else:
+            s.cpu_smash_count += 1
+
+        s.ball_smash_effect = SMASH_EFFECT_TIME
+        s.ball_speed_multiplier = power
+
+        # The rng is drawn for every particle even when they do not fit,
+        # so a full particle store never changes the rest of the match
+        spread = 20 * (power - 1)
+        color = PLAYERS.index(player)
+        for _ in range(PARTICLES_PER_SMASH):
+            effect_x = s.ball_x + spread * rng.uniform(0.5, 1.5) * (1 if rng.random() > 0.5 else -1)
+            effect_y = s.ball_y + spread * rng.uniform(0.5, 1.5) * (1 if rng.random() > 0.5 else -1)
+            s.smash_effects.add(effect_x, effect_y, PARTICLE_LIFE, color)
+
+        events.append(("smash", player, power, s.ball_x, s.ball_y))
+
+    def score_point(self, scorer, events):
+        s = self.state
+        if scorer == "Player":
+            s.player_score += 1
+        else:
+            s.cpu_score += 1
+        self.reset_ball()
+        events.append(("point", scorer))
+
+        if s.player_score >= WIN_SCORE or s.cpu_score >= WIN_SCORE:
+            s.game_over = True
+            s.winner = scorer
+            events.append(("game_over", scorer))
+
+
+def ball_color(speed_multiplier):
+    if speed_multiplier >= 2.0:
+        return "#FF0000"  # Red for super smash
+    elif speed_multiplier >= 1.5:
+        return "#FF8C00"  # Orange for strong smash
+    elif speed_multiplier > 1.0:
+        return "#FFA500"  # Light orange for normal smash
+    return "#FFEB3B"
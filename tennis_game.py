@@ -1,16 +1,86 @@
+import argparse
+import sys
+from array import array
+from collections import namedtuple
+
+from scoring import DEFAULT_FORMAT, FORMATS, GAME, SET, MATCH, compile_format
+
+# What apply_points scored: how many points it used, then the stream
+# indices of the points that won a game, a set and the match
+PointStream = namedtuple("PointStream", ["applied", "games", "sets", "matches"])
+
+# Batch input is one match per line of '1'/'2' characters
+ASCII_POINTS = bytes.maketrans(b"12", b"\x01\x02")
+
+
 class TennisGame:
-    def __init__(self, player1_name="Player 1", player2_name="Player 2"):
+    def __init__(self, player1_name="Player 1", player2_name="Player 2", match_format=DEFAULT_FORMAT):
         self.player1_name = player1_name
         self.player2_name = player2_name
-        self.player1_points = 0
-        self.player2_points = 0
-        self.player1_games = 0
-        self.player2_games = 0
-        self.player1_sets = 0
-        self.player2_sets = 0
-        self.game_over = False
+        # The whole score is one state id in the format's compiled table
+        self.table = compile_format(match_format)
+        self.state = self.table.initial()
+        # Every state the match has been in, 4 bytes a point; ``position``
+        # indexes the current one and anything after it can be redone
+        self.history = array('I', [self.state])
+        self.position = 0
+        # Called as callback(events, player, point_number) when a point
+        # wins a game, set or match
+        self.subscribers = []
         
+    @property
+    def player1_points(self):
+        return self.table.points1[self.state]
+    
+    @property
+    def player2_points(self):
+        return self.table.points2[self.state]
+    
+    @property
+    def player1_games(self):
+        return self.table.games1[self.state]
+    
+    @property
+    def player2_games(self):
+        return self.table.games2[self.state]
+    
+    @property
+    def player1_sets(self):
+        return self.table.sets1[self.state]
+    
+    @property
+    def player2_sets(self):
+        return self.table.sets2[self.state]
+    
+    @property
+    def server(self):
+        # Who serves the current game (or started the current tiebreak)
+        return self.table.server[self.state]
+    
+    @property
+    def points_played(self):
+        return self.position
+    
+    @property
+    def can_undo(self):
+        return self.position > 0
+    
+    @property
+    def can_redo(self):
+        return self.position + 1 < len(self.history)
+    
+    @property
+    def in_tiebreak(self):
+        return self.table.tiebreak[self.state] != 0
+    
+    @property
+    def game_over(self):
+        return self.table.finished[self.state] != 0
+    
     def get_score_display(self):
+        if self.in_tiebreak:
+            return f"{self.player1_points} - {self.player2_points}"
+        
         score_map = {0: "0", 1: "15", 2: "30", 3: "40"}
         
         if self.player1_points >= 3 and self.player2_points >= 3:
@@ -26,60 +96,140 @@ class TennisGame:
         
         return f"{p1_score} - {p2_score}"
     
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        return callback
+    
+    def advance(self, player):
+        """Scores a point for ``player`` (1 or 2) and returns the event flags.
+        
+        A finished match is left as it is and 0 (no events) is returned.
+        Any other ``player`` raises ``ValueError``.
+        """
+        if player != 1 and player != 2:
+            raise ValueError(f"player must be 1 or 2, not {player!r}")
+        if self.game_over:
+            return 0
+        index = 2 * self.state + player - 1
+        self.state = self.table.next[index]
+        self.position += 1
+        if self.position < len(self.history):
+            # A new point replaces whatever could have been redone
+            del self.history[self.position:]
+        self.history.append(self.state)
+        return self.table.events[index]
+    
+    def undo(self):
+        """Steps back one point; returns False when there is nothing to undo."""
+        if not self.position:
+            return False
+        self.position -= 1
+        self.state = self.history[self.position]
+        return True
+    
+    def redo(self):
+        if self.position + 1 >= len(self.history):
+            return False
+        self.position += 1
+        self.state = self.history[self.position]
+        return True
+    
+    def rewind(self, point_number):
+        """Goes to the score after ``point_number`` points (0 is the start).
+        
+        Points after it stay redoable until a new point is scored.
+        """
+        if not 0 <= point_number < len(self.history):
+            raise ValueError(f"point {point_number} is outside 0..{len(self.history) - 1}")
+        self.position = point_number
+        self.state = self.history[point_number]
+    
     def point_won_by(self, player):
+        if player != 1 and player != 2:
+            raise ValueError(f"player must be 1 or 2, not {player!r}")
         if self.game_over:
             return
-            
-        if player == 1:
-            self.player1_points += 1
+        
+        point_number = self.points_played
+        events = self.advance(player)
+        if events:
+            for callback in self.subscribers:
+                callback(events, player, point_number)
+    
+    def apply_points(self, points):
+        """Scores an iterable of point winners (1 or 2) in one call.
+        
+        Stops at the end of the match; see ``apply_points_array``.
+        """
+        return self.apply_points_array(array('B', points))
+    
+    def apply_points_array(self, points):
+        """Scores a stream of point winners given as bytes (or any buffer)
+        or a NumPy array of 1s and 2s, and returns a ``PointStream``.
+        
+        Points after the match is won are not scored, and the redo tail
+        is only dropped once a point is. Subscribers hear about every
+        game, set and match in order, but nothing is printed.
+        """
+        if hasattr(points, "dtype"):
+            # NumPy is only imported for NumPy input, keeping plain scoring light
+            import numpy as np
+            if not ((points == 1) | (points == 2)).all():
+                raise ValueError("points must be 1 or 2")
+            points = np.asarray(points, dtype=np.uint8).tobytes()
         else:
-            self.player2_points += 1
-            
-        self._check_game_won()
-    
-    def _check_game_won(self):
-        if (self.player1_points >= 4 or self.player2_points >= 4):
-            if abs(self.player1_points - self.player2_points) >= 2:
-                if self.player1_points > self.player2_points:
-                    self.player1_games += 1
-                    winner_name = self.player1_name
-                else:
-                    self.player2_games += 1
-                    winner_name = self.player2_name
-                
-                self.player1_points = 0
-                self.player2_points = 0
-                
-                print(f"\nGame won by {winner_name}!")
-                self._check_set_won()
-    
-    def _check_set_won(self):
-        if (self.player1_games >= 6 or self.player2_games >= 6):
-            if abs(self.player1_games - self.player2_games) >= 2:
-                if self.player1_games > self.player2_games:
-                    self.player1_sets += 1
-                    winner_name = self.player1_name
-                else:
-                    self.player2_sets += 1
-                    winner_name = self.player2_name
-                
-                print(f"Set won by {winner_name}!")
-                self.player1_games = 0
-                self.player2_games = 0
-                
-                self._check_match_won()
-    
-    def _check_match_won(self):
-        if self.player1_sets >= 2 or self.player2_sets >= 2:
-            winner = self.player1_name if self.player1_sets > self.player2_sets else self.player2_name
-            print(f"\nMATCH WON BY {winner.upper()}!")
-            self.game_over = True
+            points = bytes(memoryview(points).cast('B'))
+            if points.translate(None, b"\x01\x02"):
+                raise ValueError("points must be 1 or 2")
+        
+        games = array('I')
+        sets = array('I')
+        matches = array('I')
+        applied = 0
+        if points and not self.game_over:
+            table_next = self.table.next
+            table_events = self.table.events
+            subscribers = self.subscribers
+            first_point = self.position
+            history = self.history
+            if first_point + 1 < len(history):
+                del history[first_point + 1:]
+            record = history.append
+            state = self.state
+            for applied, player in enumerate(points, 1):
+                index = 2 * state + player - 1
+                state = table_next[index]
+                record(state)
+                events = table_events[index]
+                if events:
+                    games.append(applied - 1)
+                    for callback in subscribers:
+                        callback(events, player, first_point + applied - 1)
+                    if events & SET:
+                        sets.append(applied - 1)
+                        if events & MATCH:
+                            matches.append(applied - 1)
+                            break
+            self.state = state
+            self.position = first_point + applied
+        return PointStream(applied, games, sets, matches)
+    
+    def report(self, events, player, point_number=None):
+        # Console subscriber: prints what a point won
+        winner_name = self.player1_name if player == 1 else self.player2_name
+        if events & GAME:
+            print(f"\nGame won by {winner_name}!")
+        if events & SET:
+            print(f"Set won by {winner_name}!")
+        if events & MATCH:
+            print(f"\nMATCH WON BY {winner_name.upper()}!")
     
     def get_full_score(self):
         return {
             'point_score': self.get_score_display(),
             'games': f"{self.player1_games} - {self.player2_games}",
             'sets': f"{self.player1_sets} - {self.player2_sets}",
+            'server': self.player1_name if self.server == 1 else self.player2_name,
             'game_over': self.game_over
         }
     
@@ -90,15 +240,57 @@ class TennisGame:
         print(f"Points: {score['point_score']}")
 
 
-def main():
+def run_batch(source, match_format=DEFAULT_FORMAT, out=None):
+    """Scores one match per line of ``source`` (a binary file of '1'/'2'
+    characters) and writes one summary line per match to ``out``
+    (``sys.stdout`` as it is when called, by default)."""
+    if out is None:
+        out = sys.stdout
+    for number, line in enumerate(source, 1):
+        points = line.translate(None, b" \t\r\n").translate(ASCII_POINTS)
+        if not points:
+            continue
+        game = TennisGame(match_format=match_format)
+        stream = game.apply_points_array(points)
+        score = game.get_full_score()
+        winner = ""
+        if game.game_over:
+            winner = f", won by {game.player1_name if game.player1_sets > game.player2_sets else game.player2_name}"
+        out.write(f"match {number}: {stream.applied} points, {len(stream.games)} games, "
+                  f"sets {score['sets']}, games {score['games']}, points {score['point_score']}{winner}\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score a tennis match, or many from a file.")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="score one match per line of 1s and 2s from FILE (- for stdin) and exit")
+    parser.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT,
+                        help=f"match format for --batch (default {DEFAULT_FORMAT})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.batch is not None:
+        if args.batch == "-":
+            run_batch(sys.stdin.buffer, args.format)
+        else:
+            with open(args.batch, "rb") as source:
+                run_batch(source, args.format)
+        return
+    
     print("=== Classic Tennis Game ===")
     player1 = input("Enter Player 1 name (or press Enter for 'Player 1'): ").strip() or "Player 1"
     player2 = input("Enter Player 2 name (or press Enter for 'Player 2'): ").strip() or "Player 2"
+    match_format = input(f"Match format ({', '.join(FORMATS)}; Enter for '{DEFAULT_FORMAT}'): ").strip() or DEFAULT_FORMAT
+    while match_format not in FORMATS:
+        match_format = input(f"Unknown format. Choose one of: {', '.join(FORMATS)}: ").strip()
     
-    game = TennisGame(player1, player2)
+    game = TennisGame(player1, player2, match_format)
+    game.subscribe(game.report)
     
     print(f"\nGame started between {player1} and {player2}")
-    print("Commands: '1' for Player 1 point, '2' for Player 2 point, 'q' to quit")
+    print("Commands: '1' for Player 1 point, '2' for Player 2 point, 'u' to undo, 'r' to redo, 'q' to quit")
     
     while not game.game_over:
         game.display_score()
@@ -112,8 +304,14 @@ def main():
             game.point_won_by(1)
         elif command == '2':
             game.point_won_by(2)
+        elif command == 'u':
+            if not game.undo():
+                print("Nothing to undo.")
+        elif command == 'r':
+            if not game.redo():
+                print("Nothing to redo.")
         else:
-            print("Invalid command. Use '1', '2', or 'q'.")
+            print("Invalid command. Use '1', '2', 'u', 'r', or 'q'.")
     
     if game.game_over:
         game.display_score()
@@ -1,6 +1,102 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import math
+from tkinter import ttk
+from collections import deque
+
+from scoring import DEFAULT_FORMAT, SET, MATCH
+from tennis_game import TennisGame
+from view_model import ViewModel
+from win_probability import WinProbability
+
+# Labels for the match format picker
+FORMAT_LABELS = {
+    "classic": "3セット (タイブレークなし)",
+    "best-of-3": "3セット (6-6でタイブレーク)",
+    "best-of-5": "5セット (6-6でタイブレーク)",
+    "no-ad": "3セット ノーアド",
+    "match-tiebreak": "ノーアド + マッチタイブレーク",
+}
+
+# Banner timings (ms): how long one stays up, how long when more are
+# waiting, and the fade that follows
+TOAST_MS = 1800
+TOAST_QUICK_MS = 500
+FADE_STEPS = 8
+FADE_MS = 40
+# Older banners are dropped past this many waiting
+MAX_TOASTS = 4
+
+
+def blend(color, background, t):
+    # Mixes two "#RRGGBB" colors, t = 0 giving ``color``
+    a = int(color[1:], 16)
+    b = int(background[1:], 16)
+    channels = [round(((a >> shift) & 0xFF) * (1 - t) + ((b >> shift) & 0xFF) * t) for shift in (16, 8, 0)]
+    return "#%02X%02X%02X" % tuple(channels)
+
+
+class Notifications:
+    """Non-modal banners over the top of the window, one at a time.
+    
+    ``show`` queues a message and returns at once. A banner stays up for
+    ``TOAST_MS`` (``TOAST_QUICK_MS`` when others are waiting), fades into
+    ``background`` on ``after`` timers and makes way for the next one.
+    ``sticky`` banners stay until ``clear``.
+    """
+    
+    def __init__(self, root, view, background):
+        self.root = root
+        self.view = view
+        self.background = background
+        self.queue = deque(maxlen=MAX_TOASTS)
+        self.label = tk.Label(root, text="", font=("Arial", 16, "bold"), padx=20, pady=10)
+        self.current = None
+        self.fading = False
+        self.timer = None
+    
+    def show(self, text, color="#1E3A8A", sticky=False):
+        self.queue.append((text, color, sticky))
+        if self.current is None:
+            self._next()
+        elif not self.current[2] and not self.fading:
+            # Someone is entering points quickly; move the queue along
+            self._cancel()
+            self.timer = self.root.after(TOAST_QUICK_MS, self._fade, 1)
+    
+    def clear(self):
+        self._cancel()
+        self.queue.clear()
+        self.current = None
+        self.label.place_forget()
+    
+    def _cancel(self):
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+    
+    def _next(self):
+        self.fading = False
+        self.timer = None
+        if not self.queue:
+            self.current = None
+            self.label.place_forget()
+            return
+        text, color, sticky = self.current = self.queue.popleft()
+        self.view.config(self.label, text=text, bg=color, fg="#FFFFFF")
+        self.label.place(relx=0.5, y=12, anchor="n")
+        self.label.lift()
+        if not sticky:
+            self.timer = self.root.after(TOAST_QUICK_MS if self.queue else TOAST_MS, self._fade, 1)
+    
+    def _fade(self, step):
+        if step > FADE_STEPS:
+            self._next()
+            return
+        self.fading = True
+        t = step / FADE_STEPS
+        self.view.config(self.label, bg=blend(self.current[1], self.background, t),
+                         fg=blend("#FFFFFF", self.background, t))
+        self.timer = self.root.after(FADE_MS, self._fade, step + 1)
+
 
 class TennisGameGUI:
     def __init__(self, root):
@@ -11,16 +107,21 @@ class TennisGameGUI:
         
         self.player1_name = "Player 1"
         self.player2_name = "Player 2"
-        self.player1_points = 0
-        self.player2_points = 0
-        self.player1_games = 0
-        self.player2_games = 0
-        self.player1_sets = 0
-        self.player2_sets = 0
-        self.game_over = False
+        # Scoring is the same compiled state machine the console game uses
+        self.match_format = DEFAULT_FORMAT
+        self.game = TennisGame(self.player1_name, self.player2_name, self.match_format)
+        
+        # Label and button changes are applied once per idle cycle, only when they differ
+        self.view = ViewModel(root)
+        
+        # Live match win chances, treating every point as a coin flip
+        self.win_probabilities = {}
         
         self.setup_ui()
         
+        # Game, set and match wins show as banners instead of modal dialogs
+        self.notifications = Notifications(root, self.view, "#2E8B57")
+        
         
     def setup_ui(self):
         main_frame = tk.Frame(self.root, bg="#2E8B57")
@@ -84,6 +185,10 @@ class TennisGameGUI:
                                             font=("Arial", 16, "bold"), bg="#FEE2E2", fg="#DC2626")
         self.player2_points_label.grid(row=0, column=3, padx=10)
         
+        self.win_probability_label = tk.Label(self.score_display, text="",
+                                             font=("Arial", 12, "bold"), bg="#F0F8FF", fg="#1E3A8A")
+        self.win_probability_label.pack(pady=5)
+        
         button_frame = tk.Frame(main_frame, bg="#2E8B57")
         button_frame.pack(pady=20)
         
@@ -101,6 +206,33 @@ class TennisGameGUI:
                                        activebackground="#B91C1C", activeforeground="white")
         self.player2_button.pack(side=tk.LEFT, padx=10)
         
+        history_frame = tk.Frame(main_frame, bg="#2E8B57")
+        history_frame.pack(pady=5)
+        
+        self.undo_button = tk.Button(history_frame, text="↶ 取り消し", command=self.undo,
+                                    bg="#2563EB", fg="white", font=("Arial", 12, "bold"),
+                                    relief=tk.RAISED, bd=2, activebackground="#1D4ED8", activeforeground="white")
+        self.undo_button.pack(side=tk.LEFT, padx=5)
+        
+        self.redo_button = tk.Button(history_frame, text="やり直し ↷", command=self.redo,
+                                    bg="#2563EB", fg="white", font=("Arial", 12, "bold"),
+                                    relief=tk.RAISED, bd=2, activebackground="#1D4ED8", activeforeground="white")
+        self.redo_button.pack(side=tk.LEFT, padx=5)
+        
+        self.point_entry = tk.Spinbox(history_frame, from_=0, to=0, width=5, font=("Arial", 12))
+        self.point_entry.pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(history_frame, text="ポイントへ移動", command=self.rewind,
+                 bg="#2563EB", fg="white", font=("Arial", 12, "bold"),
+                 relief=tk.RAISED, bd=2, activebackground="#1D4ED8", activeforeground="white").pack(side=tk.LEFT, padx=5)
+        
+        self.point_label = tk.Label(history_frame, text="", font=("Arial", 12, "bold"),
+                                   bg="#2E8B57", fg="white")
+        self.point_label.pack(side=tk.LEFT, padx=5)
+        
+        self.root.bind("<Control-z>", lambda event: self.undo())
+        self.root.bind("<Control-y>", lambda event: self.redo())
+        
         control_frame = tk.Frame(main_frame, bg="#2E8B57")
         control_frame.pack(pady=10)
         
@@ -108,11 +240,17 @@ class TennisGameGUI:
                  bg="#F59E0B", fg="white", font=("Arial", 12, "bold"),
                  relief=tk.RAISED, bd=2, activebackground="#D97706", activeforeground="white").pack(side=tk.LEFT, padx=5)
         
+        self.format_choice = ttk.Combobox(control_frame, values=list(FORMAT_LABELS.values()),
+                                          state="readonly", width=26)
+        self.format_choice.set(FORMAT_LABELS[self.match_format])
+        self.format_choice.pack(side=tk.LEFT, padx=5)
+        
         tk.Button(control_frame, text="終了", command=self.root.quit,
                  bg="#6B7280", fg="white", font=("Arial", 12, "bold"),
                  relief=tk.RAISED, bd=2, activebackground="#4B5563", activeforeground="white").pack(side=tk.LEFT, padx=5)
         
         self.create_instructions(main_frame)
+        self.update_display()
         
     def create_tennis_court(self, parent):
         court_frame = tk.Frame(parent, bg="#2E8B57")
@@ -144,7 +282,7 @@ class TennisGameGUI:
         instructions_bg.pack(padx=20, pady=5)
         
         instructions_text = tk.Text(instructions_bg, 
-                                  height=6, width=70, 
+                                  height=8, width=70, 
                                   font=("Arial", 11),
                                   bg="#F8F9FA", fg="#333333",
                                   relief=tk.FLAT, bd=0,
@@ -157,6 +295,7 @@ class TennisGameGUI:
 • 40-40の場合は「Deuce」、そこから2ポイント差で勝利
 
 🏆 勝利条件: 先に2セット獲得したプレイヤーの勝利
+↶ 取り消し / やり直し: 押し間違えたポイントを戻せます (Ctrl+Z / Ctrl+Y)
 🔄 新しいゲーム: いつでも「新しいゲーム」ボタンでリセット可能"""
         
         instructions_text.config(state=tk.NORMAL)
@@ -164,106 +303,109 @@ class TennisGameGUI:
         instructions_text.config(state=tk.DISABLED)
         
     def get_score_display(self):
+        game = self.game
+        if game.in_tiebreak:
+            return str(game.player1_points), str(game.player2_points)
+        
         score_map = {0: "0", 1: "15", 2: "30", 3: "40"}
         
-        if self.player1_points >= 3 and self.player2_points >= 3:
-            if self.player1_points == self.player2_points:
+        if game.player1_points >= 3 and game.player2_points >= 3:
+            if game.player1_points == game.player2_points:
                 return "Deuce", "Deuce"
-            elif self.player1_points > self.player2_points:
+            elif game.player1_points > game.player2_points:
                 return "Ad", "40"
             else:
                 return "40", "Ad"
         
-        p1_score = score_map.get(self.player1_points, "40")
-        p2_score = score_map.get(self.player2_points, "40")
+        p1_score = score_map.get(game.player1_points, "40")
+        p2_score = score_map.get(game.player2_points, "40")
         
         return p1_score, p2_score
     
     def point_won_by(self, player):
-        if self.game_over:
+        if self.game.game_over:
             return
-            
-        if player == 1:
-            self.player1_points += 1
-        else:
-            self.player2_points += 1
-            
+        
+        events = self.game.advance(player)
         self.update_display()
-        self.check_game_won()
-    
-    def check_game_won(self):
-        if (self.player1_points >= 4 or self.player2_points >= 4):
-            if abs(self.player1_points - self.player2_points) >= 2:
-                if self.player1_points > self.player2_points:
-                    self.player1_games += 1
-                    winner_name = self.player1_name
-                else:
-                    self.player2_games += 1
-                    winner_name = self.player2_name
-                
-                self.player1_points = 0
-                self.player2_points = 0
-                
-                messagebox.showinfo("ゲーム終了", f"{winner_name}がゲームを獲得！")
-                self.update_display()
-                self.check_set_won()
-    
-    def check_set_won(self):
-        if (self.player1_games >= 6 or self.player2_games >= 6):
-            if abs(self.player1_games - self.player2_games) >= 2:
-                if self.player1_games > self.player2_games:
-                    self.player1_sets += 1
-                    winner_name = self.player1_name
-                else:
-                    self.player2_sets += 1
-                    winner_name = self.player2_name
-                
-                messagebox.showinfo("セット終了", f"{winner_name}がセットを獲得！")
-                self.player1_games = 0
-                self.player2_games = 0
-                self.update_display()
-                self.check_match_won()
-    
-    def check_match_won(self):
-        if self.player1_sets >= 2 or self.player2_sets >= 2:
-            winner = self.player1_name if self.player1_sets > self.player2_sets else self.player2_name
-            messagebox.showinfo("マッチ終了", f"🏆 {winner}がマッチに勝利しました！ 🏆")
-            self.game_over = True
-            self.player1_button.config(state="disabled")
-            self.player2_button.config(state="disabled")
+        
+        if not events:
+            return
+        # One banner per point, however many things it won
+        winner_name = self.player1_name if player == 1 else self.player2_name
+        game = self.game
+        if events & MATCH:
+            self.notifications.show(f"🏆 {winner_name}がマッチに勝利しました！ 🏆", "#B45309", sticky=True)
+        elif events & SET:
+            self.notifications.show(f"{winner_name}がゲームとセットを獲得！ (セット {game.player1_sets} - {game.player2_sets})",
+                                    "#7C3AED")
+        else:
+            self.notifications.show(f"{winner_name}がゲームを獲得！ (ゲーム {game.player1_games} - {game.player2_games})",
+                                    "#1E3A8A")
     
     def update_display(self):
-        self.player1_name_label.config(text=self.player1_name)
-        self.player2_name_label.config(text=self.player2_name)
-        self.player1_button.config(text=f"{self.player1_name}がポイント獲得")
-        self.player2_button.config(text=f"{self.player2_name}がポイント獲得")
+        view = self.view
+        view.config(self.player1_name_label, text=self.player1_name)
+        view.config(self.player2_name_label, text=self.player2_name)
+        view.config(self.player1_button, text=f"{self.player1_name}がポイント獲得")
+        view.config(self.player2_button, text=f"{self.player2_name}がポイント獲得")
         
         p1_points, p2_points = self.get_score_display()
-        
-        self.player1_sets_label.config(text=str(self.player1_sets))
-        self.player1_games_label.config(text=str(self.player1_games))
-        self.player1_points_label.config(text=p1_points)
-        
-        self.player2_sets_label.config(text=str(self.player2_sets))
-        self.player2_games_label.config(text=str(self.player2_games))
-        self.player2_points_label.config(text=p2_points)
-        
-        if self.game_over:
-            self.player1_button.config(state="disabled")
-            self.player2_button.config(state="disabled")
+        game = self.game
+        
+        view.config(self.player1_sets_label, text=str(game.player1_sets))
+        view.config(self.player1_games_label, text=str(game.player1_games))
+        view.config(self.player1_points_label, text=p1_points)
+        
+        view.config(self.player2_sets_label, text=str(game.player2_sets))
+        view.config(self.player2_games_label, text=str(game.player2_games))
+        view.config(self.player2_points_label, text=p2_points)
+        
+        self.update_win_probability()
+        
+        # Undo can reopen a finished match, so the buttons follow the score
+        point_state = "disabled" if game.game_over else "normal"
+        view.config(self.player1_button, state=point_state)
+        view.config(self.player2_button, state=point_state)
+        view.config(self.undo_button, state="normal" if game.can_undo else "disabled")
+        view.config(self.redo_button, state="normal" if game.can_redo else "disabled")
+        recorded = len(game.history) - 1
+        view.config(self.point_entry, to=recorded)
+        view.config(self.point_label, text=f"ポイント {game.points_played} / {recorded}")
+    
+    def undo(self):
+        if self.game.undo():
+            self.notifications.clear()
+            self.update_display()
+    
+    def redo(self):
+        if self.game.redo():
+            self.notifications.clear()
+            self.update_display()
+    
+    def rewind(self):
+        try:
+            self.game.rewind(int(self.point_entry.get()))
+        except ValueError:
+            self.notifications.show(f"0から{len(self.game.history) - 1}までのポイント番号を入力してください", "#DC2626")
+            return
+        self.notifications.clear()
+        self.update_display()
+    
+    def update_win_probability(self):
+        model = self.win_probabilities.get(self.match_format)
+        if model is None:
+            model = self.win_probabilities[self.match_format] = WinProbability(0.5, match_format=self.match_format)
+        match = model.probabilities(self.game)['match']
+        self.view.config(self.win_probability_label,
+                         text=f"勝利確率: {self.player1_name} {match:.1%}  |  {self.player2_name} {1 - match:.1%}")
     
     def new_game(self):
-        self.player1_points = 0
-        self.player2_points = 0
-        self.player1_games = 0
-        self.player2_games = 0
-        self.player1_sets = 0
-        self.player2_sets = 0
-        self.game_over = False
-        
-        self.player1_button.config(state="normal")
-        self.player2_button.config(state="normal")
+        labels = {label: name for name, label in FORMAT_LABELS.items()}
+        self.match_format = labels.get(self.format_choice.get(), DEFAULT_FORMAT)
+        self.game = TennisGame(self.player1_name, self.player2_name, self.match_format)
         
+        self.notifications.clear()
         self.update_display()
 
 
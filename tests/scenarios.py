@@ -0,0 +1,283 @@
+"""
+Scenarios shared by the tests and ``benchmarks.py``.
+
+Each function plays something out and returns what happened without
+judging it; the tests assert on the result and the benchmarks report
+it. Benchmarks import this module as ``tests.scenarios``.
+"""
+
+import random
+import time
+import tracemalloc
+
+from tennis_engine import (
+    BALL_SPEED, CANVAS_HEIGHT, CANVAS_WIDTH, DEFAULT_TICK_RATE, FLOAT_FIELDS, INT_FIELDS, PADDLE_HEIGHT,
+    PADDLE_WIDTH, WALL_BOTTOM, WALL_TOP, Difficulty, TennisEngine, UP, DOWN, LEFT, RIGHT,
+)
+
+# Built-in CPU without random errors, so both engines plan the same shots
+PARITY_DIFFICULTY = Difficulty(aim_error=0.0, smash_chance=1.0)
+# The CPU's plan for a serve, which differs between engines until copied
+SERVE_PLAN_FIELDS = ("cpu_target_y", "cpu_reaction", "cpu_intercept_time", "cpu_smash")
+
+
+def run_parity(matches=64, steps=2000, seed=0, tick_rate=DEFAULT_TICK_RATE, difficulty=PARITY_DIFFICULTY):
+    """Run ``TennisEngine`` and ``BatchEngine`` side by side.
+
+    Both sides get the same random player and CPU inputs, where a CPU
+    input of ``AI_CONTROLLED`` runs the built-in CPU for that tick. Serves
+    are random on each side, so the scalar ball is copied into the batch
+    after every point. Returns ``(max_error, mismatch)``: the largest
+    absolute difference in any field, and a description of the first
+    event or field that differed by 1e-9 or more (None if nothing did).
+    """
+    import numpy as np
+    from batch_engine import AI_CONTROLLED, BatchEngine, CPU, NOBODY, PLAYER
+
+    rng = np.random.default_rng(seed)
+    engines = [TennisEngine(seed=seed + i, tick_rate=tick_rate, difficulty=difficulty)
+               for i in range(matches)]
+    batch = BatchEngine(matches, seed=seed, tick_rate=tick_rate, difficulty=difficulty)
+    for i, engine in enumerate(engines):
+        batch.set_row(i, engine.state)
+
+    moves = np.array([0, UP, DOWN, LEFT, RIGHT, UP | RIGHT, DOWN | RIGHT, UP | LEFT, DOWN | LEFT])
+    cpu_moves = np.array([0, UP, DOWN, AI_CONTROLLED, AI_CONTROLLED, AI_CONTROLLED])
+    max_error = 0.0
+    for tick in range(steps):
+        inputs = rng.choice(moves, matches)
+        cpu_inputs = rng.choice(cpu_moves, matches)
+        scored, smashed = batch.step(inputs, cpu_inputs)
+        for i, engine in enumerate(engines):
+            cpu_input = int(cpu_inputs[i])
+            events = engine.step(int(inputs[i]), None if cpu_input == AI_CONTROLLED else cpu_input)
+            expected_scored = NOBODY
+            expected_smashed = NOBODY
+            for event in events:
+                side = PLAYER if event[1] == "Player" else CPU
+                if event[0] == "point":
+                    expected_scored = side
+                elif event[0] == "smash":
+                    expected_smashed = side
+            if scored[i] != expected_scored or smashed[i] != expected_smashed:
+                return max_error, f"tick {tick}, match {i}: events {events} but batch {scored[i], smashed[i]}"
+
+            s = engine.state
+            for name in FLOAT_FIELDS + INT_FIELDS:
+                if scored[i] and (name.startswith("ball_") or name in SERVE_PLAN_FIELDS):
+                    continue
+                error = abs(getattr(batch, name)[i] - getattr(s, name))
+                max_error = max(max_error, error)
+                if error >= 1e-9:
+                    return max_error, f"tick {tick}, match {i}: {name} differs by {error}"
+            if scored[i]:
+                batch.set_row(i, s)
+            if s.game_over:
+                engine.reset()
+                batch.set_row(i, engine.state)
+    return max_error, None
+
+
+def smash_returns(tick_rates=(20, 30, 60)):
+    """Fire double max-power smashes (2.5x dx, then 2.5x multiplier)
+    straight at each paddle from many heights and phases.
+
+    Returns ``(shots, misses)``, where ``misses`` lists
+    ``(tick_rate, offset, phase, side)`` for every smash that got through
+    the paddle instead of coming back.
+    """
+    speed = BALL_SPEED * 2.5
+    shots = 0
+    misses = []
+    for rate in tick_rates:
+        for offset in range(-45, 46, 3):
+            for phase in range(0, 100, 7):
+                for side in ("Player", "CPU"):
+                    engine = TennisEngine(seed=0, tick_rate=rate)
+                    s = engine.state
+                    paddle_y = s.player_y if side == "Player" else s.cpu_y
+                    s.ball_x = CANVAS_WIDTH // 2 + phase
+                    s.ball_y = paddle_y + PADDLE_HEIGHT // 2 + offset
+                    s.ball_dx = -speed if side == "Player" else speed
+                    s.ball_dy = 0
+                    s.ball_speed_multiplier = 2.5
+                    s.ball_smash_effect = 10.0
+                    returned = False
+                    for _ in range(rate):
+                        events = engine.step(0, 0)
+                        if events or (s.ball_dx > 0) == (side == "Player"):
+                            returned = not any(event[0] == "point" for event in events)
+                            break
+                    shots += 1
+                    if not returned:
+                        misses.append((rate, offset, phase, side))
+    return shots, misses
+
+
+def wall_escapes(trials=1000, tick_rates=(20, 30, 60), seed=0):
+    """Play fast, steep balls at paddles parked against a wall, where one
+    sub-step can hold a paddle hit and a bounce.
+
+    Returns ``(steps, escapes)``, where ``escapes`` lists
+    ``(tick_rate, trial, y)`` for every step that ended with the ball
+    outside ``WALL_TOP``..``WALL_BOTTOM``.
+    """
+    rng = random.Random(seed)
+    speed = BALL_SPEED * 2.5
+    steps = 0
+    escapes = []
+    for rate in tick_rates:
+        for trial in range(trials):
+            engine = TennisEngine(seed=trial, tick_rate=rate)
+            s = engine.state
+            side = rng.choice(("Player", "CPU"))
+            s.ball_speed_multiplier = 2.5
+            s.ball_smash_effect = 10.0
+            s.ball_dx = -speed if side == "Player" else speed
+            s.ball_dy = rng.choice((-1, 1)) * rng.uniform(300, 1500)
+            paddle_y = rng.choice((5, CANVAS_HEIGHT - PADDLE_HEIGHT - 5))
+            if side == "Player":
+                s.player_y = paddle_y
+            else:
+                s.cpu_y = paddle_y
+            # Start a few sub-steps from the paddle's corner at that wall
+            paddle_x = s.player_x + PADDLE_WIDTH if side == "Player" else s.cpu_x
+            s.ball_x = paddle_x + rng.uniform(10, 120) * (1 if side == "Player" else -1)
+            s.ball_y = (WALL_TOP + rng.uniform(0, 60) if paddle_y < CANVAS_HEIGHT // 2
+                        else WALL_BOTTOM - rng.uniform(0, 60))
+            for _ in range(rate * 2):
+                events = engine.step(rng.choice((0, UP, DOWN, RIGHT)), None)
+                steps += 1
+                if not WALL_TOP <= s.ball_y <= WALL_BOTTOM:
+                    escapes.append((rate, trial, s.ball_y))
+                if any(event[0] == "point" for event in events):
+                    break
+    return steps, escapes
+
+
+# (format, (p1, p2), score) positions for simulated_win_rate
+SIMULATION_CASES = (
+    ("classic", (0.62, 0.58), (0, 0, 0, 0, 0, 0, 1)),
+    ("classic", (0.55, 0.70), (2, 3, 5, 4, 1, 0, 2)),
+    ("best-of-3", (0.64, 0.60), (3, 2, 6, 6, 1, 1, 2)),
+    ("best-of-5", (0.50, None), (1, 1, 3, 4, 2, 1, 1)),
+    ("match-tiebreak", (0.60, 0.66), (3, 3, 5, 5, 0, 0, 1)),
+)
+
+
+def simulated_win_rate(match_format, probabilities, score, simulations=20000, seed=1):
+    """Play ``TennisGame`` out point by point from ``score`` and compare
+    how often player 1 wins with the exact ``WinProbability.lookup``.
+
+    Returns ``(simulated, exact, sigma)``, where ``sigma`` is the gap
+    between the two in standard errors of the simulation.
+    """
+    from tennis_game import TennisGame
+    from win_probability import WinProbability
+
+    rng = random.Random(seed)
+    model = WinProbability(*probabilities, match_format)
+    wins = 0
+    for _ in range(simulations):
+        game = TennisGame(match_format=match_format)
+        table = game.table
+        game.state = table.state_id(*score)
+        while not game.game_over:
+            game.advance(1 if rng.random() < model.point(table.point_server(game.state)) else 2)
+        wins += game.player1_sets > game.player2_sets
+    simulated = wins / simulations
+    exact = model.lookup(*score)[3]
+    sigma = abs(simulated - exact) / max((exact * (1 - exact) / simulations) ** 0.5, 1e-9)
+    return simulated, exact, sigma
+
+
+# Undo history allowed per point played
+HISTORY_BYTES_PER_POINT = 8
+
+
+def long_matches(matches=20, seed=1):
+    """Play five-set advantage matches between even players, which run to
+    thousands of points, measuring the undo history they keep.
+
+    Returns ``(games, bytes_per_point)``: the finished ``TennisGame``s and
+    the memory their histories took per point played.
+    """
+    from scoring import MatchFormat
+    from tennis_game import TennisGame
+
+    match_format = MatchFormat(sets_to_win=3, tiebreak_at=None)
+    rng = random.Random(seed)
+    TennisGame(match_format=match_format)  # compiles the table untraced
+
+    tracemalloc.start()
+    games = []
+    points = 0
+    base = tracemalloc.get_traced_memory()[0]
+    for _ in range(matches):
+        game = TennisGame(match_format=match_format)
+        while not game.game_over:
+            # Nearly always holding serve makes for very long sets
+            game.advance(game.server if rng.random() < 0.9 else 3 - game.server)
+        games.append(game)
+        points += game.points_played
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return games, used / points
+
+
+def cold_imports(runs=5, module="wsgi"):
+    """Import ``module`` in ``runs`` fresh interpreters.
+
+    Returns ``(seconds, rss, loaded)``: the median import time, the
+    largest peak RSS in bytes, and every ``startup.LAZY_MODULES`` entry
+    any of the imports pulled in.
+    """
+    from startup import measure_import
+
+    results = [measure_import(module) for _ in range(runs)]
+    seconds = sorted(result[0] for result in results)[runs // 2]
+    rss = max(result[1] for result in results)
+    loaded = sorted({name for result in results for name in result[2]})
+    return seconds, rss, loaded
+
+
+def draw_rally(renderer_class, frames=3000, seed=1):
+    """Play a rally with random inputs and draw every frame with
+    ``renderer_class`` on a ``RecordingCanvas`` through a ``ViewModel``.
+
+    Returns ``(seconds, shapes)``: the time spent drawing, and the number
+    of shapes on screen after each frame for the canvas and recording
+    renderers (empty for backends that cannot say).
+    """
+    from canvas_renderer import CanvasRenderer
+    from renderers import RecordingCanvas, RecordingRenderer
+    from view_model import ViewModel
+
+    moves = [0, UP, DOWN, LEFT, RIGHT, UP | RIGHT, DOWN | RIGHT, UP | LEFT]
+    view = ViewModel()
+    renderer = renderer_class(RecordingCanvas(), view)
+    renderer.show()
+    engine = TennisEngine(seed=seed)
+    rng = random.Random(seed)
+    inputs = 0
+    shapes = []
+    elapsed = 0.0
+    for _ in range(frames):
+        if rng.random() < 0.1:
+            inputs = rng.choice(moves)
+        for event in engine.step(inputs):
+            if event[0] == "smash":
+                renderer.smash(*event[1:])
+        if engine.state.game_over:
+            engine.reset()
+        start = time.perf_counter()
+        renderer.draw(engine.state)
+        view.flush()
+        elapsed += time.perf_counter() - start
+        if isinstance(renderer, CanvasRenderer):
+            shapes.append(len(renderer.fixed_items) + sum(
+                pool.visible for pool in (renderer.trail, renderer.particles,
+                                          renderer.bar_backs, renderer.bar_fills)))
+        elif isinstance(renderer, RecordingRenderer):
+            shapes.append(renderer.shapes())
+    return elapsed, shapes
@@ -0,0 +1,69 @@
+import gzip
+import os
+
+import pytest
+
+pytest.importorskip("flask")
+
+from app import app, site
+from assets import IMMUTABLE, MIN_COMPRESS_SIZE, REVALIDATE, Asset
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def static_bytes(filename):
+    with open(os.path.join(app.static_folder, filename), "rb") as f:
+        return f.read()
+
+
+def test_index_links_fingerprinted_assets(client):
+    response = client.get('/')
+    assert response.status_code == 200 and response.headers['Cache-Control'] == REVALIDATE
+    assert response.headers['ETag']
+    for filename, url in site()[0].urls.items():
+        assert url in response.get_data(as_text=True), filename
+
+
+def test_assets_are_immutable_and_precompressed(client):
+    url = site()[0].url('js/game.js')
+    plain = client.get(url)
+    assert plain.status_code == 200 and plain.headers['Cache-Control'] == IMMUTABLE
+    assert plain.headers['Vary'] == 'Accept-Encoding' and 'Content-Encoding' not in plain.headers
+    assert plain.data == static_bytes('js/game.js')
+
+    zipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+
+
+@pytest.mark.parametrize("path", ['/', None])
+def test_matching_etags_get_304(client, path):
+    url = path or site()[0].url('css/style.css')
+    for headers in ({}, {'Accept-Encoding': 'gzip'}):
+        etag = client.get(url, headers=headers).headers['ETag']
+        response = client.get(url, headers=dict(headers, **{'If-None-Match': etag}))
+        assert response.status_code == 304 and response.data == b''
+        assert response.headers['ETag'] == etag
+    assert client.get(url, headers={'If-None-Match': '*'}).status_code == 304
+
+
+def test_an_etag_for_another_encoding_gets_the_body(client):
+    url = site()[0].url('js/game.js')
+    zipped_etag = client.get(url, headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = client.get(url, headers={'If-None-Match': zipped_etag})
+    assert response.status_code == 200 and response.data == static_bytes('js/game.js')
+
+
+def test_unknown_and_unfingerprinted_names_are_404(client):
+    assert client.get('/assets/js/game.js').status_code == 404
+    assert client.get('/assets/js/game.000000000000.js').status_code == 404
+
+
+def test_small_or_incompressible_bodies_stay_plain():
+    assert list(Asset(b"x" * (MIN_COMPRESS_SIZE - 1), "text/plain", IMMUTABLE).variants) == [None]
+    assert list(Asset(os.urandom(4096), "application/octet-stream", IMMUTABLE).variants) == [None]
+    assert "gzip" in Asset(b"x" * MIN_COMPRESS_SIZE, "text/plain", IMMUTABLE).variants
@@ -0,0 +1,104 @@
+import json
+import threading
+
+import pytest
+
+import app as app_module
+from broadcast import KEEPALIVE_FRAME, SSE_RETRY_MS, Broadcast, sse_frame
+from matches import MatchStore
+from rooms import RoomManager
+
+
+def parse(frame):
+    """``[(id or None, event, data)]`` for one SSE message block."""
+    messages = []
+    for block in frame.decode().split("\n\n")[:-1]:
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        messages.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return messages
+
+
+def test_only_the_last_event_carries_the_id():
+    frame = sse_frame(7, [("smash", {"player": 1}), ("score", {"points": [1, 0]})])
+    assert parse(frame) == [(None, "smash", {"player": 1}), ("7", "score", {"points": [1, 0]})]
+
+
+def test_wait_returns_newer_frames_times_out_and_closes():
+    broadcast = Broadcast()
+    broadcast.publish([("score", 1)])
+    broadcast.publish([("score", 2)])
+    # A subscriber that fell behind jumps straight to the latest frame
+    version, frame = broadcast.wait(0)
+    assert version == 2 and parse(frame) == [("2", "score", 2)]
+    assert broadcast.wait(2, timeout=0.01) == (2, None)
+    broadcast.close()
+    assert broadcast.wait(0) == (None, None)
+
+
+def test_wait_wakes_on_publish():
+    broadcast = Broadcast()
+    timer = threading.Timer(0.05, broadcast.publish, [[("score", 1)]])
+    timer.start()
+    assert broadcast.wait(0, timeout=5)[0] == 1
+    timer.join()
+
+
+def test_stream_sends_retry_frames_and_keepalives():
+    broadcast = Broadcast()
+    broadcast.publish([("score", 1)])
+    stream = broadcast.stream(keepalive=0.01)
+    assert next(stream) == f"retry: {SSE_RETRY_MS}\n\n".encode()
+    assert parse(next(stream)) == [("1", "score", 1)]
+    assert next(stream) == KEEPALIVE_FRAME
+    broadcast.close()
+    assert list(stream) == []
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = MatchStore(shard_count=4)
+    monkeypatch.setattr(app_module, "match_store", lambda: store)
+    return app_module.app.test_client()
+
+
+def test_match_events_resume_from_last_event_id(client):
+    match_id = json.loads(client.post('/matches', json={}).data)['id']
+    client.post(f'/matches/{match_id}/points', json={'points': [1, 1, 1, 1]})
+
+    response = client.get(f'/matches/{match_id}/events')
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b"retry: ")
+    (event_id, name, score), = parse(next(chunks))
+    assert (event_id, name, score["events"], score["games"]) == ("2", "score", ["game"], "1 - 0")
+    response.close()
+
+    # Already seen: the stream waits for the next point
+    response = client.get(f'/matches/{match_id}/events', headers={'Last-Event-ID': '2'})
+    chunks = iter(response.response)
+    next(chunks)
+    timer = threading.Timer(0.05, client.post, [f'/matches/{match_id}/points'], {'json': {'winner': 2}})
+    timer.start()
+    (event_id, _, score), = parse(next(chunks))
+    assert event_id == "3" and score["point_score"] == "0 - 15"
+    timer.join()
+    # Deleting the match ends the stream
+    client.delete(f'/matches/{match_id}')
+    assert list(chunks) == []
+
+
+def test_events_for_an_unknown_match_are_404(client):
+    assert client.get('/matches/nope/events').status_code == 404
+
+
+def test_room_event_frames_carry_the_whole_score():
+    manager = RoomManager()
+    manager.start = lambda: None
+    room = manager.create("cpu", seed=1)
+    score = room.score()
+    assert room.event_message(("smash", "Player", 1.5, 10, 20)) == (
+        "smash", dict(score, smasher="Player", power=1.5, x=10, y=20))
+    assert room.event_message(("point", "CPU")) == ("point", dict(score, scorer="CPU"))
+    assert room.event_message(("game_over", "CPU")) == ("game_over", dict(score, winner="CPU"))
+    assert room.broadcast.version == 1
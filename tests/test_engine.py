@@ -0,0 +1,140 @@
+import pytest
+
+from scenarios import smash_returns, wall_escapes
+from tennis_engine import (
+    BALL_SIZE, CANVAS_HEIGHT, CANVAS_WIDTH, CPU_DEADZONE, DOWN, MAX_SUBSTEP_DISTANCE, MAX_SUBSTEPS,
+    PADDLE_HEIGHT, PADDLE_WIDTH, WALL_BOTTOM, WALL_TOP, Difficulty, TennisEngine, fold_wall, intercept,
+    paddle_impact, substep_count,
+)
+
+
+def test_smashes_do_not_tunnel_through_paddles():
+    shots, misses = smash_returns()
+    assert shots > 0 and misses == []
+
+
+def test_ball_stays_between_the_walls():
+    steps, escapes = wall_escapes(trials=1000, seed=0)
+    assert steps > 0 and escapes == []
+
+
+@pytest.mark.parametrize("y, expected", [
+    (WALL_TOP + 10, WALL_TOP + 10),
+    (WALL_BOTTOM + 10, WALL_BOTTOM - 10),
+    (WALL_TOP - 10, WALL_TOP + 10),
+    (WALL_BOTTOM + (WALL_BOTTOM - WALL_TOP) + 10, WALL_TOP + 10),
+])
+def test_fold_wall(y, expected):
+    assert fold_wall(y) == pytest.approx(expected)
+
+
+def test_intercept_counts_the_smash_then_plain_speed():
+    # 100 px at 2x for 0.1 s covers 40 px, then 60 px at plain speed
+    y, seconds = intercept(0, 250, 200, 0, 2.0, 0.1, 100)
+    assert y == 250 and seconds == pytest.approx(0.1 + 60 / 200)
+    # Moving away: no intercept
+    assert intercept(100, 250, -200, 0, 1.0, 0.0, 200)[1] == 0.0
+
+
+def test_paddle_impact():
+    half = BALL_SIZE // 2
+    # Straight at a paddle face 100 px away, over a 200 px move
+    t = paddle_impact(300, 250, -200, 0, 200 - PADDLE_WIDTH, 250 - PADDLE_HEIGHT // 2)
+    assert t == pytest.approx((100 - half) / 200)
+    # Passing above the paddle
+    assert paddle_impact(300, 100, -200, 0, 200 - PADDLE_WIDTH, 250) is None
+    # Already touching
+    assert paddle_impact(200, 250, -10, 0, 200 - PADDLE_WIDTH, 250 - PADDLE_HEIGHT // 2) == 0.0
+
+
+def test_substep_count():
+    assert substep_count(0) == 1
+    assert substep_count(MAX_SUBSTEP_DISTANCE) == 1
+    assert substep_count(MAX_SUBSTEP_DISTANCE + 0.1) == 2
+    assert substep_count(1e9) == MAX_SUBSTEPS
+
+
+def test_ball_bounces_off_the_top_wall():
+    engine = TennisEngine(seed=0)
+    s = engine.state
+    s.ball_x, s.ball_y = CANVAS_WIDTH // 2, WALL_TOP + 1
+    s.ball_dx, s.ball_dy = 0, -600
+    engine.step(0, 0)
+    assert s.ball_dy > 0 and WALL_TOP <= s.ball_y <= WALL_BOTTOM
+
+
+def test_a_ball_past_the_cpu_scores_for_the_player():
+    engine = TennisEngine(seed=0)
+    s = engine.state
+    s.cpu_y = 5
+    s.ball_x, s.ball_y = CANVAS_WIDTH - 2, 400
+    s.ball_dx, s.ball_dy = 600, 0
+    events = engine.step(0, 0)
+    assert ("point", "Player") in events
+    assert s.player_score == 1 and s.ball_x == CANVAS_WIDTH // 2
+
+
+def serve_to_cpu(difficulty, ball_dy=150):
+    engine = TennisEngine(seed=0, difficulty=difficulty)
+    s = engine.state
+    s.ball_x, s.ball_y = CANVAS_WIDTH // 2, CANVAS_HEIGHT // 2
+    s.ball_dx, s.ball_dy = 360, ball_dy
+    engine.plan_cpu()
+    return engine
+
+
+def test_cpu_plans_the_intercept_once_per_shot():
+    engine = serve_to_cpu(Difficulty(aim_error=0.0, smash_chance=0.0))
+    s = engine.state
+    y, seconds = intercept(s.ball_x, s.ball_y, s.ball_dx, s.ball_dy, 1.0, 0.0, s.cpu_x - BALL_SIZE // 2)
+    assert (s.cpu_target_y, s.cpu_intercept_time) == (y, seconds)
+    assert s.cpu_reaction == engine.difficulty.reaction_time and s.cpu_smash == 0.0
+    # A ball heading away sends the CPU back to the middle
+    s.ball_dx = -360
+    engine.plan_cpu()
+    assert (s.cpu_target_y, s.cpu_intercept_time) == (CANVAS_HEIGHT / 2, 0.0)
+
+
+def test_cpu_aim_error_scales_with_ball_speed():
+    for seed in range(20):
+        engine = serve_to_cpu(Difficulty(aim_error=50.0, smash_chance=0.0))
+        engine.rng.seed(seed)
+        s = engine.state
+        s.ball_speed_multiplier = 2.0
+        engine.plan_cpu()
+        exact = intercept(s.ball_x, s.ball_y, s.ball_dx, s.ball_dy, 2.0, 0.0, s.cpu_x - BALL_SIZE // 2)[0]
+        assert abs(s.cpu_target_y - exact) <= 100.0
+
+
+def test_cpu_waits_then_reaches_its_target_in_time():
+    engine = serve_to_cpu(Difficulty(aim_error=0.0, smash_chance=0.0), ball_dy=-300)
+    s = engine.state
+    start = s.cpu_y
+    for _ in range(int(engine.difficulty.reaction_time * engine.tick_rate)):
+        engine.step(0)
+    assert s.cpu_y == start
+    while s.cpu_intercept_time > engine.dt:
+        engine.step(0)
+    assert abs(s.cpu_y + PADDLE_HEIGHT // 2 - s.cpu_target_y) <= CPU_DEADZONE
+
+
+def test_cpu_smashes_by_running_through_the_ball():
+    engine = serve_to_cpu(Difficulty(aim_error=0.0, smash_chance=1.0), ball_dy=-300)
+    assert engine.state.cpu_smash != 0.0
+    events = []
+    while engine.state.ball_dx > 0:
+        events += engine.step(0)
+    assert [event[:2] for event in events] == [("smash", "CPU")]
+
+
+def test_manual_cpu_and_its_smashes_follow_the_difficulty_speed():
+    slow = TennisEngine(seed=0, difficulty=Difficulty(speed=200))
+    fast = TennisEngine(seed=0, difficulty=Difficulty(speed=600))
+    for engine in (slow, fast):
+        y = engine.state.cpu_y
+        engine.update_cpu_manual(DOWN)
+        assert engine.state.cpu_y - y == pytest.approx(engine.difficulty.speed * engine.dt)
+        # 250 px/s is over half the slow CPU's speed but not the fast one's
+        engine.state.cpu_velocity_y = 250
+    assert slow.hit_paddle("CPU", []) is not None
+    assert fast.hit_paddle("CPU", []) is None
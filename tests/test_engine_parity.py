@@ -0,0 +1,60 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch_engine import BatchEngine, CPU, NOBODY, PLAYER
+from scenarios import PARITY_DIFFICULTY, run_parity
+from tennis_engine import FLOAT_FIELDS, INT_FIELDS, WIN_SCORE, GameState, TennisEngine
+
+
+@pytest.mark.parametrize("tick_rate", [30, 60, 120])
+def test_batch_engine_matches_tennis_engine(tick_rate):
+    max_error, mismatch = run_parity(matches=12, steps=500, seed=tick_rate, tick_rate=tick_rate)
+    assert mismatch is None
+    assert max_error == 0.0
+
+
+@pytest.mark.parametrize("speed", [240, 600])
+def test_batch_engine_matches_at_other_cpu_speeds(speed):
+    # Manual CPU paddles and the CPU smash threshold follow the difficulty too
+    difficulty = PARITY_DIFFICULTY._replace(speed=speed)
+    assert run_parity(matches=12, steps=500, seed=speed, difficulty=difficulty) == (0.0, None)
+
+
+def test_rows_round_trip():
+    engine = TennisEngine(seed=5)
+    for _ in range(300):
+        engine.step(0)
+    batch = BatchEngine(3, seed=0)
+    batch.set_row(1, engine.state)
+    row = batch.get_row(1)
+    for name in FLOAT_FIELDS + INT_FIELDS + ("game_over", "winner"):
+        assert getattr(row, name) == getattr(engine.state, name), name
+
+
+def test_reset_only_touches_the_masked_rows():
+    batch = BatchEngine(4, seed=0)
+    for _ in range(100):
+        batch.step(0)
+    moved = batch.ball_x.copy()
+    mask = np.array([True, False, True, False])
+    batch.reset(mask)
+    fresh = GameState()
+    assert (batch.player_y[mask] == fresh.player_y).all()
+    assert (batch.ball_x[mask] == fresh.ball_x).all()
+    assert (batch.ball_x[~mask] == moved[~mask]).all()
+
+
+def test_the_last_point_finishes_the_match():
+    batch = BatchEngine(2, seed=0)
+    batch.player_score[:] = WIN_SCORE - 1
+    # Send both balls past the CPU's side
+    batch.ball_x[:] = 795
+    batch.ball_dx[:] = 1000
+    batch.ball_dy[:] = 0
+    batch.cpu_y[:] = 0
+    scored, _ = batch.step(0)
+    assert (scored == PLAYER).all()
+    assert batch.game_over.all() and (batch.winner == PLAYER).all()
+    scored, smashed = batch.step(0)
+    assert (scored == NOBODY).all() and (smashed == NOBODY).all() and CPU not in batch.winner
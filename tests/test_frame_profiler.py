@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import frame_profiler
+from frame_profiler import FrameProfiler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(frame_profiler.time, "perf_counter_ns", clock)
+    return clock
+
+
+def record(profiler, clock, durations, phase="draw"):
+    # One frame per duration, all of it spent in ``phase``
+    for duration in durations:
+        profiler.begin_frame()
+        start = clock.now
+        clock.now += duration
+        profiler.lap(phase, start)
+        profiler.end_frame()
+        clock.now += 1000
+
+
+def test_percentiles_are_nearest_rank(clock):
+    profiler = FrameProfiler(size=200)
+    record(profiler, clock, [value * 10 for value in range(100, 0, -1)])
+    assert profiler.percentiles() == (500, 950, 990)
+    assert profiler.percentiles("draw", (0, 1, 100)) == (10, 10, 1000)
+    assert profiler.percentiles("flush") == (0, 0, 0)
+
+
+def test_percentiles_of_one_frame_and_of_none(clock):
+    profiler = FrameProfiler()
+    assert profiler.percentiles() == (0, 0, 0)
+    assert profiler.fps() == 0.0
+    record(profiler, clock, [700])
+    assert profiler.percentiles() == (700, 700, 700)
+
+
+def test_the_ring_keeps_only_the_latest_frames(clock):
+    profiler = FrameProfiler(size=10)
+    record(profiler, clock, [5000] * 15 + list(range(1, 11)))
+    assert profiler.frames == 25
+    assert sorted(profiler.column("frame")) == list(range(1, 11))
+    assert [row[profiler.columns["frame"]] for row in profiler.rows()] == list(range(1, 11))
+    assert profiler.percentiles(points=(50, 100)) == (5, 10)
+
+
+def test_laps_in_one_frame_add_up(clock):
+    profiler = FrameProfiler()
+    profiler.begin_frame()
+    for _ in range(3):
+        start = clock.now
+        clock.now += 100
+        profiler.lap("update_ball", start)
+    profiler.end_frame()
+    assert list(profiler.column("update_ball")) == [300]
+    assert list(profiler.column("frame")) == [300]
+
+
+def test_summary_fps_and_dumps(clock, tmp_path):
+    profiler = FrameProfiler()
+    record(profiler, clock, [2_000_000] * 4)
+    # A frame starts every 2 ms + 1 us
+    assert profiler.fps() == pytest.approx(1e9 / 2_001_000)
+    summary = profiler.summary()
+    assert summary["draw"] == {"mean_ms": 2.0, "p50_ms": 2.0, "p95_ms": 2.0, "p99_ms": 2.0, "max_ms": 2.0}
+    assert summary["flush"]["max_ms"] == 0.0
+
+    profiler.dump(str(tmp_path / "frames.csv"))
+    lines = (tmp_path / "frames.csv").read_text().splitlines()
+    assert lines[0].startswith("start_ns,update_player_ns") and len(lines) == 5
+    profiler.dump(str(tmp_path / "frames.json"))
+    data = json.loads((tmp_path / "frames.json").read_text())
+    assert data["summary"] == summary and len(data["frames"]) == 4
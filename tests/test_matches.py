@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+import app as app_module
+from matches import MAX_BATCH_POINTS, MAX_NAME_LENGTH, MatchStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MatchStore(shard_count=4)
+    monkeypatch.setattr(app_module, "match_store", lambda: store)
+    return store
+
+
+@pytest.fixture
+def client(store):
+    return app_module.app.test_client()
+
+
+def create(client, **body):
+    response = client.post('/matches', json=body)
+    assert response.status_code == 201
+    return json.loads(response.data)
+
+
+def test_create_and_read_a_match(client, store):
+    match = create(client, player1="Ann", player2="Bo", format="best-of-5")
+    assert match["players"] == ["Ann", "Bo"] and match["format"] == "best-of-5"
+    assert (match["points"], match["version"], match["game_over"]) == ([0, 0], 0, False)
+    assert json.loads(client.get(f"/matches/{match['id']}").data) == match
+    assert len(store) == 1
+
+
+def test_single_points_and_batches(client):
+    match_id = create(client)["id"]
+    score = json.loads(client.post(f"/matches/{match_id}/points", json={"winner": 1}).data)
+    assert score["display"] == "15 - 0" and score["version"] == 1
+    score = json.loads(client.post(f"/matches/{match_id}/points", json={"points": [1, 1, 1]}).data)
+    assert score["games"] == [1, 0] and score["points_played"] == 4
+
+
+def test_points_after_match_point_are_not_scored(client):
+    match_id = create(client, format="match-tiebreak")["id"]
+    score = json.loads(client.post(f"/matches/{match_id}/points", json={"points": [1] * 1000}).data)
+    assert score["game_over"] and score["winner"] == "Player 1"
+    assert score["points_played"] < 1000
+
+
+@pytest.mark.parametrize("body", [
+    {"format": "nope"},
+    {"format": [1]},
+    {"format": {"sets": 3}},
+    {"player1": ""},
+    {"player2": "x" * (MAX_NAME_LENGTH + 1)},
+    {"player1": 7},
+])
+def test_bad_matches_are_rejected(client, store, body):
+    response = client.post('/matches', json=body)
+    assert response.status_code == 400 and "error" in response.get_json()
+    assert len(store) == 0
+
+
+@pytest.mark.parametrize("body", [{"winner": 3}, {"winner": "1"}, {"points": [1, 0]},
+                                  {"points": "12"}, {"points": [1, True]}, {}])
+def test_bad_points_are_rejected(client, body):
+    match_id = create(client)["id"]
+    response = client.post(f"/matches/{match_id}/points", json=body)
+    assert response.status_code == 400
+    assert json.loads(client.get(f"/matches/{match_id}").data)["points_played"] == 0
+
+
+def test_too_many_points_is_413(client):
+    match_id = create(client)["id"]
+    response = client.post(f"/matches/{match_id}/points", json={"points": [1] * (MAX_BATCH_POINTS + 1)})
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("path", ['/matches', '/matches/{id}/points'])
+def test_bodies_must_be_json_objects(client, path):
+    match_id = create(client)["id"]
+    response = client.post(path.format(id=match_id), json=["Ann", "Bo"])
+    assert response.status_code == 400
+
+
+def test_unknown_and_deleted_matches_are_404(client):
+    match_id = create(client)["id"]
+    assert client.delete(f"/matches/{match_id}").status_code == 204
+    assert client.get(f"/matches/{match_id}").status_code == 404
+    assert client.post(f"/matches/{match_id}/points", json={"winner": 1}).status_code == 404
+    assert client.delete(f"/matches/{match_id}").status_code == 404
@@ -0,0 +1,67 @@
+import pytest
+
+from scenarios import smash_returns
+from tennis_engine import (
+    PARTICLE_CAPACITY, PARTICLE_LIFE, PARTICLES_PER_SMASH, FLOAT_FIELDS, INT_FIELDS, Particles,
+    TennisEngine, Trail,
+)
+
+
+def test_adds_past_capacity_are_dropped():
+    particles = Particles(capacity=3)
+    assert all(particles.add(i, i, 1.0, 0) for i in range(3))
+    assert not particles.add(9, 9, 1.0, 1)
+    assert len(particles) == 3 and [x for x, _, _, _ in particles] == [0, 1, 2]
+
+
+def test_expired_particles_are_swap_removed():
+    particles = Particles(capacity=8)
+    for i, life in enumerate((0.1, 0.3, 0.1, 0.3, 0.2)):
+        particles.add(i, 10 * i, life, i % 2)
+    particles.age(0.1)
+    # Slot 0 takes the last particle, then slot 2 the new last one
+    assert [(x, y, color) for x, y, _, color in particles] == [(4, 40, 0), (1, 10, 1), (3, 30, 1)]
+    assert [life for _, _, life, _ in particles] == pytest.approx([0.1, 0.2, 0.2])
+    assert particles.next_expiry == pytest.approx(0.2)
+    # Nothing is due before next_expiry, so aging up to it removes nothing
+    particles.age(0.05)
+    assert len(particles) == 3
+    particles.age(0.05)
+    assert [x for x, _, _, _ in particles] == [3, 1]
+
+
+def test_the_clock_restarts_once_every_particle_is_gone():
+    particles = Particles()
+    particles.add(0, 0, PARTICLE_LIFE, 0)
+    for _ in range(30):
+        particles.age(1 / 60)
+    assert len(particles) == 0 and particles.clock == 0.0
+    particles.add(1, 1, 0.5, 1)
+    assert list(particles) == [(1, 1, 0.5, 1)]
+
+
+def test_a_full_particle_store_does_not_change_the_match():
+    def play(capacity):
+        engine = TennisEngine(seed=11)
+        engine.state.smash_effects = Particles(capacity)
+        smashes = 0
+        for tick in range(3000):
+            # Charge and swing into the ball often enough to smash
+            for event in engine.step(1 << (tick // 40 % 4)):
+                smashes += event[0] == "smash"
+        s = engine.state
+        return smashes, tuple(getattr(s, name) for name in FLOAT_FIELDS + INT_FIELDS), len(s.smash_effects)
+
+    smashes, full, live = play(PARTICLE_CAPACITY)
+    assert smashes > 0 and live <= PARTICLE_CAPACITY
+    assert play(0)[:2] == (smashes, full)
+    assert play(PARTICLES_PER_SMASH)[:2] == (smashes, full)
+
+
+def test_trail_keeps_the_latest_points_oldest_first():
+    trail = Trail(capacity=3)
+    trail.extend([(i, -i) for i in range(5)])
+    assert list(trail) == [(2, -2), (3, -3), (4, -4)]
+    assert trail[0] == (2, -2) and trail[2] == (4, -4) and len(trail) == 3
+    trail.clear()
+    assert list(trail) == []
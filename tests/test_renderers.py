@@ -0,0 +1,47 @@
+from canvas_renderer import CanvasRenderer
+from renderers import NullRenderer, RecordingCanvas, RecordingRenderer
+from scenarios import draw_rally
+from tennis_engine import PARTICLE_CAPACITY, TennisEngine
+from view_model import ViewModel
+
+
+def test_recording_renderer_draws_what_the_canvas_shows():
+    _, recorded = draw_rally(RecordingRenderer, frames=600, seed=1)
+    _, shown = draw_rally(CanvasRenderer, frames=600, seed=1)
+    # Two paddles and the ball at least
+    assert len(recorded) == 600 and min(recorded) >= 3
+    assert recorded == shown
+
+
+def test_null_renderer_draws_nothing():
+    canvas = RecordingCanvas()
+    renderer = NullRenderer(canvas, ViewModel())
+    state = TennisEngine(seed=0).state
+    renderer.show()
+    renderer.draw(state)
+    renderer.smash("Player", 2.0, 100, 200)
+    assert not canvas.calls and not canvas.items
+
+
+def test_messages_go_with_the_next_frame():
+    renderer = RecordingRenderer(keep=2)
+    state = TennisEngine(seed=0).state
+    renderer.draw(state)
+    renderer.smash("Player", 2.0, 100, 200)
+    renderer.draw(state)
+    renderer.draw(state)
+    assert len(renderer.frames) == 2
+    assert renderer.frames[0][0] == ("smash", "Player", 2.0, 100, 200)
+    assert renderer.counts(0)["smash"] == 1 and renderer.counts()["smash"] == 0
+    assert renderer.shapes(0) == renderer.shapes()
+
+
+def test_canvas_draws_particles_past_the_pool_size():
+    view = ViewModel()
+    renderer = CanvasRenderer(RecordingCanvas(), view)
+    state = TennisEngine(seed=0).state
+    count = PARTICLE_CAPACITY + 12
+    state.smash_effects = [(100 + i, 100, 0.5, 0) for i in range(count)]
+    renderer.draw(state)
+    view.flush()
+    assert renderer.particles.visible == len(renderer.particles.items) == count
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from replay import HEADER, MatchRandom, ReplayError, ReplayReader, ReplayWriter
+from tennis_engine import FLOAT_FIELDS, INT_FIELDS, TennisEngine, UP, DOWN, LEFT, RIGHT
+
+FIELDS = FLOAT_FIELDS + INT_FIELDS + ("game_over", "winner")
+MOVES = [0, UP, DOWN, LEFT, RIGHT, UP | RIGHT, DOWN | LEFT]
+
+
+def fields(state):
+    return tuple(getattr(state, name) for name in FIELDS)
+
+
+def record(path, ticks=2000, seed=1, cpu_manual=False, keyframe_interval=300):
+    """Records ``ticks`` of random play; returns the live state fields by tick."""
+    rng = random.Random(seed)
+    engine = TennisEngine(rng=MatchRandom(seed))
+    states = {0: fields(engine.state)}
+    with ReplayWriter(path, engine, cpu_manual=cpu_manual, keyframe_interval=keyframe_interval) as writer:
+        for _ in range(ticks):
+            if engine.state.game_over:
+                break
+            writer.step(rng.choice(MOVES), rng.choice(MOVES))
+            states[engine.state.tick] = fields(engine.state)
+    return states
+
+
+@pytest.mark.parametrize("cpu_manual", [False, True])
+def test_replay_reproduces_the_match(tmp_path, cpu_manual):
+    path = tmp_path / "match.atr"
+    states = record(path, cpu_manual=cpu_manual)
+    with ReplayReader(path) as reader:
+        assert reader.cpu_manual == cpu_manual
+        assert reader.ticks == max(states) and len(reader.keyframes) > 1
+        engine, inputs = reader.engine_at(0)
+        assert fields(engine.state) == states[0]
+        for pair in inputs:
+            engine.step(pair[0], pair[1] if cpu_manual else None)
+            assert fields(engine.state) == states[engine.state.tick]
+        assert engine.state.tick == reader.ticks
+        assert [tick for tick, _ in reader.play(1000)] == list(range(1001, reader.ticks + 1))
+
+
+def test_seeking_matches_the_live_match(tmp_path):
+    path = tmp_path / "match.atr"
+    states = record(path)
+    with ReplayReader(path) as reader:
+        for tick in (0, 1, 299, 300, 301, 1234, reader.ticks):
+            assert fields(reader.state_at(tick)) == states[tick], tick
+        with pytest.raises(ReplayError, match="outside"):
+            reader.state_at(reader.ticks + 1)
+
+
+def test_a_truncated_tail_is_ignored(tmp_path):
+    path = tmp_path / "match.atr"
+    states = record(path)
+    data = path.read_bytes()
+    with ReplayReader(path) as reader:
+        last_keyframe = reader.keyframes[-1]
+    # Cut into the last keyframe: the stream ends at the record before it
+    path.write_bytes(data[:last_keyframe[1] + 10])
+    with ReplayReader(path) as reader:
+        assert reader.keyframes[-1][0] < last_keyframe[0]
+        assert fields(reader.state_at(reader.ticks)) == states[reader.ticks]
+    # Cut mid-record
+    path.write_bytes(data[:-1])
+    with ReplayReader(path) as reader:
+        assert fields(reader.state_at(reader.ticks)) == states[reader.ticks]
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"", "not a replay"),
+    (b"XXXX\x02" + bytes(HEADER.size), "not a replay"),
+    (b"ATRP\x01" + bytes(HEADER.size), "version 1"),
+])
+def test_bad_files_are_rejected(tmp_path, data, message):
+    path = tmp_path / "bad.atr"
+    path.write_bytes(data or b"A")
+    with pytest.raises(ReplayError, match=message):
+        ReplayReader(path)
+
+
+def test_a_file_without_keyframes_is_rejected(tmp_path):
+    path = tmp_path / "match.atr"
+    record(path, ticks=10)
+    path.write_bytes(path.read_bytes()[:HEADER.size + 3])
+    with pytest.raises(ReplayError, match="no keyframes"):
+        ReplayReader(path)
+
+
+def test_writer_needs_a_match_random(tmp_path):
+    with pytest.raises(ReplayError, match="MatchRandom"):
+        ReplayWriter(tmp_path / "match.atr", TennisEngine(seed=1))
+
+
+def test_match_random_state_round_trips():
+    rng = MatchRandom("seed")
+    rng.random()
+    state = rng.getstate()
+    first = [rng.random(), rng.randrange(1000), rng.getrandbits(100)]
+    rng.setstate(state)
+    assert [rng.random(), rng.randrange(1000), rng.getrandbits(100)] == first
+    assert 0 <= first[0] < 1 and first[2] < 1 << 100
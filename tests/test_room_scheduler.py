@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch_engine import BatchEngine, ROW_FIELDS
+from room_scheduler import RoomScheduler
+from tennis_engine import UP
+
+
+def test_paused_and_finished_matches_do_not_move():
+    batch = BatchEngine(64, seed=2)
+    batch.paused[::3] = True
+    batch.game_over[1::3] = True
+    frozen = ~batch.paused & ~batch.game_over
+    before = {name: getattr(batch, name).copy() for name in ROW_FIELDS}
+    for _ in range(200):
+        scored, smashed = batch.step(UP)
+        assert not scored[~frozen].any() and not smashed[~frozen].any()
+    for name in ROW_FIELDS:
+        assert (getattr(batch, name)[~frozen] == before[name][~frozen]).all(), name
+    assert (batch.ball_x[frozen] != before["ball_x"][frozen]).any()
+
+
+def test_an_all_paused_batch_returns_no_events():
+    batch = BatchEngine(8, seed=0)
+    batch.paused[:] = True
+    scored, smashed = batch.step()
+    assert scored.shape == smashed.shape == (8,) and not scored.any() and not smashed.any()
+
+
+def test_lag_is_recorded_per_room():
+    scheduler = RoomScheduler(tick_rate=60, group_size=4, seed=0)
+    live = scheduler.add_room("live")
+    paused = scheduler.add_room("paused")
+    scheduler.set_paused("paused", True)
+    # The group was due when the rooms were added; serve it 50 ms late
+    time.sleep(0.05)
+    assert scheduler.tick_due() >= 1
+    assert live.max_lag >= 0.05 and live.max_lag >= live.lag
+    assert paused.lag == paused.max_lag == 0.0
+
+
+def test_groups_with_no_live_rooms_leave_the_heap():
+    scheduler = RoomScheduler(tick_rate=60, group_size=4, seed=0)
+    scheduler.add_room("a")
+    scheduler.set_paused("a", True)
+    scheduler.tick_due(time.monotonic() + 1)
+    assert not scheduler.heap
+    scheduler.set_paused("a", False)
+    assert len(scheduler.heap) == 1
+
+
+def test_events_reach_on_event():
+    events = []
+    scheduler = RoomScheduler(tick_rate=60, group_size=2, seed=0,
+                              on_event=lambda room, event: events.append((room.id, event[0])))
+    scheduler.add_room("a")
+    now = time.monotonic()
+    for tick in range(60 * 60):
+        scheduler.tick_due(now + tick / 60)
+        if ("a", "point") in events:
+            break
+    assert ("a", "point") in events
+    assert scheduler.rooms["a"].state().player_score + scheduler.rooms["a"].state().cpu_score == 1
@@ -0,0 +1,118 @@
+import pytest
+
+import app as app_module
+from rooms import RoomManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    # A manager whose rooms only tick when a test calls tick()
+    manager = RoomManager()
+    manager.start = lambda: None
+    monkeypatch.setattr(app_module, "room_manager", lambda: manager)
+    return manager
+
+
+@pytest.fixture
+def client(manager):
+    return app_module.app.test_client()
+
+
+def create(client, mode="cpu"):
+    response = client.post('/rooms', json={'mode': mode})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_create_and_join_a_pvp_room(client, manager):
+    room = create(client, 'pvp')
+    assert room['side'] == 'left'
+    joined = client.post(f"/rooms/{room['room']}/join")
+    assert joined.status_code == 200 and joined.get_json()['side'] == 'right'
+    assert client.post(f"/rooms/{room['room']}/join").status_code == 409
+    assert manager.get(room['room']).ready
+
+
+def test_unknown_rooms_and_modes(client):
+    assert client.post('/rooms', json={'mode': 'solo'}).status_code == 400
+    assert client.post('/rooms/nope/join').status_code == 404
+    assert client.get('/rooms/nope/state').status_code == 404
+
+
+def test_inputs_reach_the_engine(client, manager):
+    room = create(client)
+    response = client.post(f"/rooms/{room['room']}/input", json={'player': room['player'], 'inputs': 9})
+    assert response.status_code == 204
+    assert manager.get(room['room']).inputs['left'] == 9
+
+
+@pytest.mark.parametrize("body, status", [
+    ({'player': 5, 'inputs': 1}, 400),
+    ({'player': 'not-a-player', 'inputs': 1}, 403),
+    ({'player': 'ünïcode', 'inputs': 1}, 403),
+    ({'inputs': 1}, 403),
+])
+def test_bad_players_are_rejected(client, body, status):
+    room = create(client)
+    assert client.post(f"/rooms/{room['room']}/input", json=body).status_code == status
+
+
+@pytest.mark.parametrize("inputs", ["x", 16, -1, 1.0, None, [1]])
+def test_bad_inputs_are_rejected(client, manager, inputs):
+    room = create(client)
+    response = client.post(f"/rooms/{room['room']}/input", json={'player': room['player'], 'inputs': inputs})
+    assert response.status_code == 400
+    assert manager.get(room['room']).inputs['left'] == 0
+
+
+@pytest.mark.parametrize("path", ['/rooms', '/rooms/{room}/input', '/rooms/{room}/pause'])
+def test_bodies_must_be_json_objects(client, path):
+    room = create(client)
+    response = client.post(path.format(room=room['room']), json=[1, 2])
+    assert response.status_code == 400
+    assert 'JSON object' in response.get_json()['error']
+
+
+def test_pause_stops_ticking(client, manager):
+    room_id = create(client)['room']
+    player = manager.get(room_id).seats['left']
+    assert client.post(f'/rooms/{room_id}/pause', json={'player': player}).status_code == 204
+    manager.tick()
+    room = manager.get(room_id)
+    assert room.paused and room.version == 0
+
+
+def test_state_long_poll_returns_newer_versions(client, manager):
+    room_id = create(client)['room']
+    manager.tick()
+    state = client.get(f'/rooms/{room_id}/state?since=-1').get_json()
+    assert state['version'] == 1 and state['ready'] and not state['paused']
+    assert state['player']['score'] == 0 and state['tick'] == 1
+
+
+def test_snapshot_route_sends_the_version(client, manager):
+    room_id = create(client)['room']
+    manager.tick()
+    response = client.get(f'/rooms/{room_id}/snapshot?since=0')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/octet-stream'
+    assert response.headers['X-Room-Version'] == '1' and response.data
+
+
+def test_closing_a_room_wakes_waiters(manager):
+    room = manager.create('cpu', seed=1)
+    room.close()
+    assert room.wait_for_version(room.version, timeout=5)
+    assert room.finished
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"inputs": 3}', (3, None)),
+    ('{"ack": 7, "inputs": 1}', (1, 7)),
+    ('{"inputs": "2", "ack": 1.5}', (None, None)),
+    ('[1]', (None, None)),
+    ('not json', (None, None)),
+    (b'{"ack": 4}', (None, 4)),
+])
+def test_socket_messages(text, expected):
+    assert app_module.socket_message(text) == expected
@@ -0,0 +1,144 @@
+import random
+
+import pytest
+
+import tennis_game
+from scenarios import HISTORY_BYTES_PER_POINT, SIMULATION_CASES, long_matches, simulated_win_rate
+from tennis_game import TennisGame
+from win_probability import WinProbability
+
+
+@pytest.mark.parametrize("match_format, probabilities, score", SIMULATION_CASES)
+def test_win_probability_matches_simulation(match_format, probabilities, score):
+    # A tenth of the benchmark's matches; the limit is in standard errors
+    simulated, exact, sigma = simulated_win_rate(match_format, probabilities, score, simulations=2000)
+    assert 0 < exact < 1 and sigma < 4
+
+
+@pytest.mark.parametrize("match_format", ["classic", "best-of-3", "best-of-5", "match-tiebreak"])
+def test_even_players_are_even(match_format):
+    assert WinProbability(0.5, match_format=match_format).lookup(0, 0, 0, 0, 0, 0)[3] == pytest.approx(0.5)
+
+
+def test_finished_and_one_point_positions():
+    model = WinProbability(0.6, 0.6)
+    assert model.lookup(0, 0, 0, 0, 2, 0)[3] == 1.0
+    assert model.lookup(0, 0, 0, 0, 0, 2)[3] == 0.0
+    # 40-0 on serve: the game is lost only by losing three points first
+    assert model.game(3, 0, 1) > 0.6 and model.game(0, 3, 1) < 0.6
+    assert model.lookup(3, 3, 0, 0, 0, 0)[1] == pytest.approx(0.36 / (0.36 + 0.16))
+
+
+@pytest.fixture(scope="module")
+def long_games():
+    return long_matches(matches=4, seed=1)
+
+
+def test_history_fits_its_budget(long_games):
+    games, bytes_per_point = long_games
+    assert len(games) == 4 and bytes_per_point <= HISTORY_BYTES_PER_POINT
+
+
+def test_history_replays_one_legal_point_at_a_time(long_games):
+    for game in long_games[0]:
+        table = game.table
+        final = game.state
+        end = game.points_played
+        game.rewind(0)
+        assert game.state == table.initial()
+        for _ in range(end):
+            previous = game.state
+            assert game.redo()
+            assert game.state in (table.next[2 * previous], table.next[2 * previous + 1])
+        assert not game.redo() and game.state == final and game.game_over
+
+
+def test_new_point_after_undo_drops_the_redo_tail():
+    game = TennisGame()
+    for player in (1, 1, 2):
+        game.advance(player)
+    game.undo()
+    game.undo()
+    assert game.can_redo
+    game.advance(2)
+    assert not game.can_redo
+    assert (game.points_played, game.player1_points, game.player2_points) == (2, 1, 1)
+
+
+def test_advance_leaves_a_finished_match_alone():
+    game = TennisGame()
+    while not game.game_over:
+        game.advance(1)
+    state, played = game.state, game.points_played
+    assert game.advance(2) == 0
+    assert (game.state, game.points_played, game.can_redo) == (state, played, False)
+
+
+@pytest.mark.parametrize("player", [0, 3, -1, "1", None])
+def test_only_players_1_and_2_can_score(player):
+    game = TennisGame()
+    with pytest.raises(ValueError):
+        game.advance(player)
+    with pytest.raises(ValueError):
+        game.point_won_by(player)
+    assert (game.points_played, game.get_score_display(), game.server) == (0, "0 - 0", 1)
+
+
+def test_apply_points_array_matches_point_by_point():
+    rng = random.Random(4)
+    points = bytes(rng.choice((1, 2)) for _ in range(400))
+    heard = []
+    game = TennisGame()
+    game.subscribe(lambda events, player, number: heard.append((events, number)))
+    stream = game.apply_points_array(points)
+
+    single = TennisGame()
+    expected = []
+    single.subscribe(lambda events, player, number: expected.append((events, number)))
+    for player in points[:stream.applied]:
+        single.point_won_by(player)
+    assert game.game_over and stream.applied < len(points)
+    assert (game.state, game.points_played) == (single.state, single.points_played)
+    assert heard == expected and list(stream.games) == [number for _, number in expected]
+    assert list(stream.matches) == [stream.applied - 1]
+    # The match is over, so nothing more is scored
+    assert game.apply_points_array(b"\x01").applied == 0
+
+
+@pytest.mark.parametrize("points", [b"\x01\x00", b"12", b"\x01\x03", bytearray(b"\x02\x02\x05")])
+def test_apply_points_array_rejects_other_winners(points):
+    game = TennisGame()
+    with pytest.raises(ValueError):
+        game.apply_points_array(points)
+    assert game.points_played == 0
+
+
+def test_apply_points_array_takes_numpy_arrays():
+    np = pytest.importorskip("numpy")
+    game = TennisGame()
+    assert game.apply_points_array(np.array([1, 1, 1, 1], dtype=np.int64)).games.tolist() == [3]
+    with pytest.raises(ValueError):
+        game.apply_points_array(np.array([1, 2, 0]))
+    assert game.points_played == 4
+
+
+def test_apply_points_array_keeps_the_redo_tail_until_a_point_is_scored():
+    game = TennisGame()
+    game.apply_points_array(b"\x01\x01\x02")
+    game.undo()
+    game.undo()
+    assert game.apply_points_array(b"").applied == 0
+    assert game.can_redo
+    game.apply_points_array(b"\x02")
+    assert not game.can_redo
+    assert (game.points_played, game.player1_points, game.player2_points) == (2, 1, 1)
+
+
+def test_batch_command_line(tmp_path, capsys):
+    path = tmp_path / "points.txt"
+    path.write_bytes(b"1111\n\n2 2 2 2\n")
+    tennis_game.main(["--batch", str(path), "--format", "no-ad"])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2 and lines[0].startswith("match 1: 4 points, 1 games")
+    with pytest.raises(SystemExit):
+        tennis_game.main(["--batch", str(path), "--format", "best-of-7"])
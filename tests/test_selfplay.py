@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import selfplay
+from selfplay import SelfPlay
+
+RUN = dict(population=3, elite=1, points=20, seed=7, workers=2)
+
+
+def test_a_resumed_run_carries_on_as_if_never_stopped(tmp_path):
+    whole = SelfPlay(**RUN)
+    whole.run(2)
+
+    checkpoint = str(tmp_path / "run.json")
+    first = SelfPlay(checkpoint=checkpoint, **RUN)
+    first.run(1)
+    resumed = SelfPlay(checkpoint=checkpoint, **RUN)
+    assert resumed.generation == 1 and resumed.history == first.history
+    assert resumed.population == first.population
+    resumed.run(2)
+
+    assert len(whole.history) == 2 and resumed.history == whole.history
+    assert resumed.population == whole.population and resumed.best == whole.best
+    assert json.loads((tmp_path / "run.json").read_text())["generation"] == 2
+    assert not (tmp_path / "run.json.tmp").exists()
+
+
+def test_checkpoints_from_another_version_are_refused(tmp_path):
+    checkpoint = tmp_path / "run.json"
+    SelfPlay(checkpoint=str(checkpoint), **RUN).save()
+    data = json.loads(checkpoint.read_text())
+    data["version"] += 1
+    checkpoint.write_text(json.dumps(data))
+    with pytest.raises(ValueError, match="version"):
+        SelfPlay(checkpoint=str(checkpoint), **RUN)
+
+
+def test_command_line_options():
+    args = selfplay.parse_args([])
+    assert (args.generations, args.population, args.points, args.workers) == (10, 8, 1000, None)
+    assert (args.checkpoint, args.seed, args.opponent, args.target_win_rate) == (None, 0, "normal", None)
+    args = selfplay.parse_args(["--checkpoint", "run.json", "--opponent", "hard", "--target-win-rate", "0.5"])
+    assert (args.checkpoint, args.opponent, args.target_win_rate) == ("run.json", "hard", 0.5)
+    with pytest.raises(SystemExit):
+        selfplay.parse_args(["--opponent", "impossible"])
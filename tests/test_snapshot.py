@@ -0,0 +1,122 @@
+import pytest
+
+from snapshot import (
+    ALL_FIELDS, FIELDS, HEADER, NO_BASE, POSITION_SCALE, SnapshotDecoder, SnapshotEncoder,
+    SnapshotError, quantise,
+)
+from tennis_engine import TennisEngine, UP, RIGHT
+
+
+def header(data):
+    return HEADER.unpack_from(data, 0)
+
+
+@pytest.fixture
+def engine():
+    engine = TennisEngine(seed=3)
+    for _ in range(30):
+        engine.step(UP | RIGHT)
+    return engine
+
+
+def test_keyframe_round_trip(engine):
+    encoder = SnapshotEncoder()
+    encoder.update(engine.state)
+    data = encoder.encode()
+    version, flags, tick, base, mask = header(data)
+    assert (tick, base, mask) == (engine.state.tick, NO_BASE, ALL_FIELDS)
+
+    state = SnapshotDecoder().decode(data)
+    assert state.tick == engine.state.tick
+    assert (state.game_over, state.winner) == (engine.state.game_over, engine.state.winner)
+    assert state.player_score == engine.state.player_score
+    for name in ("player_x", "player_y", "cpu_y", "ball_x", "ball_y", "ball_dx"):
+        assert getattr(state, name) == pytest.approx(getattr(engine.state, name), abs=1 / POSITION_SCALE)
+
+
+def test_deltas_carry_only_what_changed(engine):
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder()
+    encoder.update(engine.state)
+    keyframe = encoder.encode()
+    decoder.decode(keyframe)
+    acked = decoder.ack
+
+    engine.step(0)
+    encoder.update(engine.state)
+    delta = encoder.encode(acked)
+    _, _, tick, base, mask = header(delta)
+    assert base == acked and mask != ALL_FIELDS and len(delta) < len(keyframe)
+    # Scores did not change, so their bits are clear
+    names = [name for name, _, _ in FIELDS]
+    assert not mask >> names.index("player_score") & 1
+
+    state = decoder.decode(delta)
+    assert decoder.ack == tick
+    assert quantise(state)[1] == quantise(engine.state)[1]
+
+
+def test_clients_on_the_same_ack_share_one_buffer(engine):
+    encoder = SnapshotEncoder()
+    encoder.update(engine.state)
+    first = engine.state.tick
+    engine.step(0)
+    encoder.update(engine.state)
+    assert encoder.encode(first) is encoder.encode(first)
+    assert encoder.encode() is encoder.encode(None)
+
+
+@pytest.mark.parametrize("ack", [None, 12345])
+def test_unknown_or_missing_acks_get_a_keyframe(engine, ack):
+    encoder = SnapshotEncoder()
+    encoder.update(engine.state)
+    assert header(encoder.encode(ack))[3:] == (NO_BASE, ALL_FIELDS)
+
+
+def test_acks_older_than_the_history_get_a_keyframe(engine):
+    encoder = SnapshotEncoder(history=4)
+    encoder.update(engine.state)
+    oldest = engine.state.tick
+    for _ in range(4):
+        engine.step(0)
+        encoder.update(engine.state)
+    assert oldest not in encoder.snapshots
+    assert header(encoder.encode(oldest))[3] == NO_BASE
+
+
+def test_a_new_game_drops_old_snapshots(engine):
+    encoder = SnapshotEncoder()
+    encoder.update(engine.state)
+    old = engine.state.tick
+    engine.reset()
+    engine.step(0)
+    encoder.update(engine.state)
+    assert list(encoder.snapshots) == [engine.state.tick]
+    assert header(encoder.encode(old))[3] == NO_BASE
+
+
+def test_decoder_rebuilds_the_trail(engine):
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder()
+    for _ in range(3):
+        engine.step(0)
+        encoder.update(engine.state)
+        state = decoder.decode(encoder.encode(decoder.ack))
+    assert len(state.ball_trail) == 2
+
+
+def test_decoder_rejects_bad_snapshots(engine):
+    encoder = SnapshotEncoder()
+    encoder.update(engine.state)
+    data = encoder.encode()
+    decoder = SnapshotDecoder()
+    with pytest.raises(SnapshotError, match="header"):
+        decoder.decode(data[:HEADER.size - 1])
+    with pytest.raises(SnapshotError, match="truncated"):
+        decoder.decode(data[:HEADER.size + 4])
+    with pytest.raises(SnapshotError, match="version"):
+        decoder.decode(bytes([99]) + data[1:])
+    engine.step(0)
+    encoder.update(engine.state)
+    with pytest.raises(SnapshotError, match="unknown tick"):
+        decoder.decode(encoder.encode(header(data)[2]))
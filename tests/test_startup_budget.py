@@ -0,0 +1,47 @@
+import sys
+
+import pytest
+
+import startup
+from scenarios import cold_imports
+
+pytest.importorskip("flask")
+
+
+@pytest.fixture(scope="module")
+def wsgi_imports():
+    return cold_imports(runs=3)
+
+
+def test_wsgi_defers_heavy_modules(wsgi_imports):
+    assert wsgi_imports[2] == []
+
+
+def test_wsgi_import_fits_the_time_budget(wsgi_imports):
+    assert wsgi_imports[0] <= startup.IMPORT_TIME_BUDGET
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="peak_rss reads Linux units")
+def test_wsgi_import_fits_the_memory_budget(wsgi_imports):
+    assert 0 < wsgi_imports[1] <= startup.IMPORT_MEMORY_BUDGET
+
+
+def test_app_defers_heavy_modules():
+    # app.py itself, not only wsgi.py, builds nothing heavy at import
+    _, _, loaded = startup.measure_import("app")
+    assert loaded == []
+
+
+def test_import_profiler_records_nested_imports(monkeypatch):
+    # Fresh copies of json for the profiler; monkeypatch puts the
+    # originals back
+    for name in ("json", "json.decoder", "json.scanner"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    profiler = startup.ImportProfiler().install()
+    try:
+        import json  # noqa: F401
+    finally:
+        profiler.uninstall()
+    depths = {name: depth for name, depth, _ in profiler.imports}
+    assert depths["json"] == 0 and depths["json.decoder"] > 0
+    assert all(seconds >= 0 for _, _, seconds in profiler.imports)
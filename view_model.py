@@ -0,0 +1,84 @@
+_MISSING = object()
+
+
+class ViewModel:
+    """Batches widget and canvas updates and applies only real changes.
+
+    ``config``, ``itemconfig`` and ``coords`` record the wanted values.
+    The first change in a frame schedules ``flush`` with ``after_idle``
+    (or call ``flush`` yourself when there is no root). A flush compares
+    each value with what was last applied and makes at most one Tk call
+    per widget or canvas item.
+
+    ``frame_calls`` and ``frame_skipped`` hold the Tk calls made and
+    avoided by the last flush. ``tk_calls`` is the running total.
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        self.pending = {}
+        self.applied = {}
+        self.scheduled = False
+        self.tk_calls = 0
+        self.frame_calls = 0
+        self.frame_skipped = 0
+
+    def config(self, widget, **options):
+        self._merge(("config", widget), options)
+
+    def itemconfig(self, canvas, item, **options):
+        self._merge(("itemconfig", canvas, item), options)
+
+    def coords(self, canvas, item, *coords):
+        self.pending[("coords", canvas, item)] = coords
+        self._schedule()
+
+    def _merge(self, key, options):
+        wanted = self.pending.get(key)
+        if wanted is None:
+            self.pending[key] = dict(options)
+        else:
+            wanted.update(options)
+        self._schedule()
+
+    def _schedule(self):
+        if not self.scheduled and self.root is not None:
+            self.scheduled = True
+            self.root.after_idle(self.flush)
+
+    def flush(self):
+        self.scheduled = False
+        pending = self.pending
+        self.pending = {}
+        applied = self.applied
+        calls = 0
+        skipped = 0
+
+        for key, wanted in pending.items():
+            kind = key[0]
+            if kind == "coords":
+                if applied.get(key) == wanted:
+                    skipped += 1
+                    continue
+                key[1].coords(key[2], *wanted)
+                applied[key] = wanted
+                calls += 1
+                continue
+
+            current = applied.setdefault(key, {})
+            changed = {option: value for option, value in wanted.items()
+                       if current.get(option, _MISSING) != value}
+            if not changed:
+                skipped += 1
+                continue
+            if kind == "config":
+                key[1].config(**changed)
+            else:
+                key[1].itemconfig(key[2], **changed)
+            current.update(changed)
+            calls += 1
+
+        self.frame_calls = calls
+        self.frame_skipped = skipped
+        self.tk_calls += calls
+        return calls
@@ -0,0 +1,229 @@
+"""
+Exact win probabilities for ``TennisGame`` scores.
+
+Points are independent: player 1 wins a point on their own serve with
+probability ``p1`` and player 2 wins a point on theirs with ``p2``
+(leave ``p2`` out and ``p1`` is simply player 1's chance of winning any
+point). The server alternates every game and, in tiebreaks, every two
+points. Games, sets and the match follow a ``scoring.MatchFormat``.
+
+The probabilities come from a memoised dynamic program over the point,
+game, set and match chains. Deuce, long tiebreaks and advantage sets
+loop forever, so their tied states are solved in closed form: from a
+tie, whoever wins two points (or games) in a row first wins. ``p1`` and
+``p2`` may also be NumPy arrays, which evaluates many probability pairs
+in one pass.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # only needed for array-valued probabilities
+    np = None
+
+from scoring import (
+    DEFAULT_FORMAT, compile_format, get_format, in_match_tiebreak, in_tiebreak, tiebreak_server,
+)
+
+POINTS_TO_WIN = 4
+
+
+def _share(x, y):
+    # x / (x + y): the chance x happens first when x and y repeat forever
+    total = x + y
+    if np is not None and isinstance(total, np.ndarray):
+        return np.divide(x, total, out=np.full_like(total, 0.5), where=total > 0)
+    return x / total if total > 0 else 0.5
+
+
+def _fold(a, b, limit):
+    # Scores past limit-limit only matter by their difference
+    if a >= limit and b >= limit:
+        lead = a - b
+        if -2 < lead < 2:
+            return limit + max(lead, 0), limit + max(-lead, 0)
+    return a, b
+
+
+class WinProbability:
+    """Win probabilities for player 1 from any score of ``match_format``.
+
+    ``lookup`` returns ``(point, game, set, match)`` for a raw score;
+    ``probabilities`` does the same for a ``TennisGame`` (or anything
+    with its ``playerN_points/games/sets`` and ``server`` attributes).
+    Results are cached by score, so repeated lookups are a dict hit.
+    """
+
+    def __init__(self, p1, p2=None, match_format=DEFAULT_FORMAT):
+        if np is not None and not np.isscalar(p1):
+            p1 = np.asarray(p1, dtype=np.float64)
+            p2 = 1 - p1 if p2 is None else np.asarray(p2, dtype=np.float64)
+        elif p2 is None:
+            p2 = 1 - p1
+        self.p1 = p1
+        self.p2 = p2
+        self.format = get_format(match_format)
+        self.sets_to_win = self.format.sets_to_win
+        self._games = {}
+        self._tiebreaks = {}
+        self._sets = {}
+        self._matches = {}
+        self._lookups = {}
+
+    def point(self, server):
+        # Player 1's chance of winning a point served by ``server``
+        return self.p1 if server == 1 else 1 - self.p2
+
+    def game(self, a, b, server):
+        """Player 1 wins a service game from ``a``-``b`` points."""
+        if a >= POINTS_TO_WIN and (a - b >= 2 or self.format.no_ad):
+            return 1.0
+        if b >= POINTS_TO_WIN and (b - a >= 2 or self.format.no_ad):
+            return 0.0
+        if not self.format.no_ad:
+            a, b = _fold(a, b, POINTS_TO_WIN - 1)
+        key = (a, b, server)
+        result = self._games.get(key)
+        if result is None:
+            p = self.point(server)
+            if a == b == POINTS_TO_WIN - 1 and not self.format.no_ad:
+                result = _share(p * p, (1 - p) * (1 - p))
+            else:
+                result = p * self.game(a + 1, b, server) + (1 - p) * self.game(a, b + 1, server)
+            self._games[key] = result
+        return result
+
+    def tiebreak(self, a, b, starter, target):
+        """Player 1 wins a tiebreak to ``target`` from ``a``-``b``."""
+        if a >= target and a - b >= 2:
+            return 1.0
+        if b >= target and b - a >= 2:
+            return 0.0
+        key = (a, b, starter, target)
+        result = self._tiebreaks.get(key)
+        if result is None:
+            p = self.point(tiebreak_server(starter, a, b))
+            if a == b and a >= target - 1:
+                # The next two points are served one by each player
+                q = self.point(tiebreak_server(starter, a + 1, b))
+                result = _share(p * q, (1 - p) * (1 - q))
+            else:
+                result = (p * self.tiebreak(a + 1, b, starter, target)
+                          + (1 - p) * self.tiebreak(a, b + 1, starter, target))
+            self._tiebreaks[key] = result
+        return result
+
+    def set_outcomes(self, g1, g2, server):
+        """Chances of ``(player 1 wins, next set served by 1), (player 1
+        wins, served by 2), (player 2 wins, served by 1), (player 2 wins,
+        served by 2)`` from ``g1``-``g2`` games, ``server`` to serve."""
+        fmt = self.format
+        tiebreak_at = fmt.tiebreak_at
+        if g1 >= fmt.games_per_set and (g1 - g2 >= 2 or (tiebreak_at is not None and g1 > g2 == tiebreak_at)):
+            return (1.0, 0.0, 0.0, 0.0) if server == 1 else (0.0, 1.0, 0.0, 0.0)
+        if g2 >= fmt.games_per_set and (g2 - g1 >= 2 or (tiebreak_at is not None and g2 > g1 == tiebreak_at)):
+            return (0.0, 0.0, 1.0, 0.0) if server == 1 else (0.0, 0.0, 0.0, 1.0)
+        if tiebreak_at is None:
+            g1, g2 = _fold(g1, g2, fmt.games_per_set - 1)
+        key = (g1, g2, server)
+        result = self._sets.get(key)
+        if result is None:
+            other = 3 - server
+            if tiebreak_at is not None and g1 == g2 == tiebreak_at:
+                win = self.tiebreak(0, 0, server, fmt.tiebreak_points)
+                result = (0.0, win, 0.0, 1 - win) if server == 1 else (win, 0.0, 1 - win, 0.0)
+            elif tiebreak_at is None and g1 == g2 == fmt.games_per_set - 1:
+                # Two games bring a tie back with the same server, so
+                # whoever wins two in a row first takes the set
+                first = self.game(0, 0, server)
+                second = self.game(0, 0, other)
+                win = _share(first * second, (1 - first) * (1 - second))
+                result = (win, 0.0, 1 - win, 0.0) if server == 1 else (0.0, win, 0.0, 1 - win)
+            else:
+                first = self.game(0, 0, server)
+                won = self.set_outcomes(g1 + 1, g2, other)
+                lost = self.set_outcomes(g1, g2 + 1, other)
+                result = tuple(first * w + (1 - first) * l for w, l in zip(won, lost))
+            self._sets[key] = result
+        return result
+
+    def match(self, s1, s2, server):
+        """Player 1 wins the match from ``s1``-``s2`` sets, at the start of a set."""
+        if s1 >= self.sets_to_win:
+            return 1.0
+        if s2 >= self.sets_to_win:
+            return 0.0
+        key = (s1, s2, server)
+        result = self._matches.get(key)
+        if result is None:
+            if in_match_tiebreak(self.format, s1, s2):
+                result = self.tiebreak(0, 0, server, self.format.match_tiebreak_points)
+            else:
+                result = self._after_set(s1, s2, self.set_outcomes(0, 0, server))
+            self._matches[key] = result
+        return result
+
+    def _after_set(self, s1, s2, outcomes):
+        won_1, won_2, lost_1, lost_2 = outcomes
+        return (won_1 * self.match(s1 + 1, s2, 1) + won_2 * self.match(s1 + 1, s2, 2)
+                + lost_1 * self.match(s1, s2 + 1, 1) + lost_2 * self.match(s1, s2 + 1, 2))
+
+    def lookup(self, a, b, g1, g2, s1, s2, server=1):
+        """``(point, game, set, match)`` win chances for player 1 with
+        ``server`` serving the current game (or starting its tiebreak)."""
+        key = (a, b, g1, g2, s1, s2, server)
+        result = self._lookups.get(key)
+        if result is None:
+            result = self._lookups[key] = self._solve(a, b, g1, g2, s1, s2, server)
+        return result
+
+    def _solve(self, a, b, g1, g2, s1, s2, server):
+        fmt = self.format
+        if s1 >= self.sets_to_win or s2 >= self.sets_to_win:
+            match = 1.0 if s1 > s2 else 0.0
+            return self.point(server), match, match, match
+
+        if in_match_tiebreak(fmt, s1, s2):
+            # The deciding set is a single match tiebreak
+            point = self.point(tiebreak_server(server, a, b))
+            game = self.tiebreak(a, b, server, fmt.match_tiebreak_points)
+            return point, game, game, game
+        if in_tiebreak(fmt, g1, g2, s1, s2):
+            point = self.point(tiebreak_server(server, a, b))
+            game = self.tiebreak(a, b, server, fmt.tiebreak_points)
+        else:
+            point = self.point(server)
+            game = self.game(a, b, server)
+        if a == b == 0:
+            # Also covers a set that has just been won
+            outcomes = self.set_outcomes(g1, g2, server)
+        else:
+            won = self.set_outcomes(g1 + 1, g2, 3 - server)
+            lost = self.set_outcomes(g1, g2 + 1, 3 - server)
+            outcomes = tuple(game * w + (1 - game) * l for w, l in zip(won, lost))
+        return point, game, outcomes[0] + outcomes[1], self._after_set(s1, s2, outcomes)
+
+    def probabilities(self, game):
+        """``lookup`` for a ``TennisGame``, as a dict."""
+        point, game_win, set_win, match_win = self.lookup(
+            game.player1_points, game.player2_points, game.player1_games, game.player2_games,
+            game.player1_sets, game.player2_sets, getattr(game, 'server', 1))
+        return {'point': point, 'game': game_win, 'set': set_win, 'match': match_win}
+
+    def batch(self, scores):
+        """Match win chances for many ``(a, b, g1, g2, s1, s2[, server])`` scores."""
+        lookup = self.lookup
+        return [lookup(*score)[3] for score in scores]
+
+    def warm(self):
+        # Fills the cache for every score the format can reach
+        table = compile_format(self.format)
+        for state in range(table.size):
+            self.lookup(*table.score(state))
+        return self
+
+
+def match_win_probabilities(p1, p2=None, score=(0, 0, 0, 0, 0, 0), server=1,
+                            match_format=DEFAULT_FORMAT):
+    """Match win chance for player 1 at ``score`` for arrays of ``p1``/``p2``."""
+    return WinProbability(p1, p2, match_format).lookup(*score, server)[3]
+
@@ -1,4 +1,16 @@
+import os
+
+# STARTUP_PROFILE=1 prints how long each import took to stderr (see startup.py)
+profiler = None
+if os.environ.get("STARTUP_PROFILE"):
+    from startup import ImportProfiler
+    profiler = ImportProfiler().install()
+
 from app import app
 
+if profiler is not None:
+    profiler.uninstall()
+    profiler.report()
+
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    app.run()